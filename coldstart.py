@@ -0,0 +1,135 @@
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import logging
+
+from loadtest import prepare_environment, seed_store
+
+# Kaltstart-Benchmark: Importzeit je Modul, das main.py lädt (jeweils in einem frischen
+# Interpreter), und Zeit bis zum ersten vollständigen Rendern der App (streamlit AppTest)
+# gegen einen lokalen Objektspeicher. Schwere Module dürfen erst beim Rendern geladen werden.
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+MAIN_SCRIPT = os.path.join(APP_DIR, "main.py")
+HEAVY_MODULES = ["scipy.stats", "scipy.sparse", "statsmodels", "plotly.express", "plotly.graph_objects", "duckdb", "sklearn"]
+
+def app_imports(path=MAIN_SCRIPT):
+    """(Modul, Name) der Importe aus src, in der Reihenfolge von main.py."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    return [(node.module, alias.name) for node in tree.body if isinstance(node, ast.ImportFrom)
+            and (node.module or "").startswith("src.") for alias in node.names]
+
+def _run_child(code, root):
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [APP_DIR, os.environ.get("PYTHONPATH")]))}
+    return subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=root, env=env,
+                          capture_output=True, text=True, check=True)
+
+def loaded_heavy_modules(module, root):
+    """Schwere Module nach dem Import von module in einem frischen Interpreter."""
+    result = _run_child(f"import sys, json\nimport {module}\n"
+                        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))", root)
+    return result, json.loads(result.stdout.strip().splitlines()[-1])
+
+def measure_import(module, root, baseline=()):
+    """Kumulierte Importzeit in Sekunden und die dabei zusätzlich zu baseline geladenen schweren Module."""
+    result, heavy = loaded_heavy_modules(module, root)
+    seconds = 0.0
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if line.startswith("import time:") and len(parts) == 3 and parts[2].strip() == module:
+            seconds = int(parts[1]) / 1e6
+    return seconds, [m for m in heavy if m not in baseline]
+
+# Läuft im frischen Interpreter: Importe wie main.py, Funktionen mit Zeitmessung umhüllt, dann AppTest
+_RENDER_CHILD = """
+import importlib, json, sys, time
+started = time.perf_counter()
+imports = {imports!r}
+modules = {{module: importlib.import_module(module) for module, _ in imports}}
+imported = time.perf_counter() - started
+seconds = {{}}
+
+def timed(label, fn):
+    def wrapper(*args, **kwargs):
+        begin = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            seconds[label] = seconds.get(label, 0.0) + time.perf_counter() - begin
+    return wrapper
+
+for module, name in imports:
+    value = getattr(modules[module], name)
+    if callable(value) and not isinstance(value, type):
+        setattr(modules[module], name, timed(name, value))
+
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file({main!r}, default_timeout=600)
+app.run()
+print(json.dumps({{
+    'import': imported,
+    'first_render': time.perf_counter() - started,
+    'functions': seconds,
+    'heavy_after_render': [m for m in {heavy!r} if m in sys.modules],
+    'exceptions': [exception.message for exception in app.exception],
+}}))
+"""
+
+def measure_first_render(root):
+    """Importzeit, Zeit bis zum ersten Rendern und Laufzeit je aufgerufener Funktion aus main.py."""
+    code = _RENDER_CHILD.format(imports=app_imports(), heavy=HEAVY_MODULES, main=MAIN_SCRIPT)
+    return json.loads(_run_child(code, root).stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Kaltstart-Benchmark: Importzeiten und Zeit bis zum ersten Rendern")
+    parser.add_argument("--skus", type=int, default=300, help="Anzahl synthetischer SKUs")
+    parser.add_argument("--days", type=int, default=180, help="Anzahl Tage Verkaufshistorie")
+    parser.add_argument("--root", default=None, help="Verzeichnis des lokalen Objektspeichers (Standard: temporär)")
+    parser.add_argument("--max-import-seconds", type=float, default=None,
+                        help="Budget für die Importe von main.py; darüber endet der Benchmark mit Exit-Code 1")
+    parser.add_argument("--max-render-seconds", type=float, default=None,
+                        help="Budget bis zum ersten Rendern; darüber endet der Benchmark mit Exit-Code 1")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    root = os.path.abspath(args.root or tempfile.mkdtemp(prefix="coldstart-"))
+    # Die Billbee-Zugangsdaten werden beim Import gelesen, aufgerufen wird die API nicht
+    prepare_environment(root, billbee_url="http://127.0.0.1:9/api/v1")
+    seed_store(args.skus, args.days)
+    print(f"Lokaler Objektspeicher: {root}")
+
+    # streamlit selbst bindet plotly.graph_objects (als leichten Platzhalter) ein, das zählt nicht zur App
+    _, baseline = loaded_heavy_modules("streamlit", root)
+    print(f"\n  {'Modul':<28} {'Import (s)':>10}  Schwere Module")
+    failures = []
+    for module in dict.fromkeys(module for module, _ in app_imports()):
+        seconds, heavy = measure_import(module, root, baseline)
+        print(f"  {module:<28} {seconds:>10.3f}  {', '.join(heavy) or '-'}")
+        if heavy:
+            failures.append(f"{module} lädt beim Import {', '.join(heavy)}")
+
+    render = measure_first_render(root)
+    print(f"\nImporte von main.py: {render['import']:.2f} s, erstes Rendern abgeschlossen nach {render['first_render']:.2f} s")
+    print(f"  {'Funktion':<28} {'Sekunden':>10}")
+    for name, seconds in sorted(render['functions'].items(), key=lambda item: -item[1]):
+        print(f"  {name:<28} {seconds:>10.3f}")
+    print(f"Beim Rendern geladen: {', '.join(render['heavy_after_render']) or '-'}")
+    # Bricht das Rendern ab, fehlen die restlichen Tabs in der gemessenen Zeit
+    failures += [f"Fehler beim Rendern: {message}" for message in render['exceptions']]
+
+    if args.max_import_seconds is not None and render['import'] > args.max_import_seconds:
+        failures.append(f"Importe {render['import']:.2f} s über dem Budget von {args.max_import_seconds:.2f} s")
+    if args.max_render_seconds is not None and render['first_render'] > args.max_render_seconds:
+        failures.append(f"Erstes Rendern {render['first_render']:.2f} s über dem Budget von {args.max_render_seconds:.2f} s")
+    for failure in failures:
+        print(f"\n{failure}")
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
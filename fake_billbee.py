@@ -0,0 +1,242 @@
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Lokaler Ersatz für den Billbee-Endpunkt /api/v1/orders: erzeugt reproduzierbare Bestellungen
+# je Tag, blättert wie Billbee (page, pageSize, Paging) und kann Latenz und das Rate-Limit
+# (429 mit Retry-After) nachbilden. Für Benchmarks und Tests der Ingest-Strecke ohne Live-API.
+
+MAX_PAGE_SIZE = 250
+PLATFORMS = ["Shopify", "Amazon", "eBay", "Kaufland"]
+# Billbee-Bestellstatus: überwiegend versendet/abgeschlossen, einzelne gelöscht (6) oder storniert (8)
+ORDER_STATES = [(4, 0.55), (7, 0.25), (3, 0.12), (2, 0.04), (8, 0.03), (6, 0.01)]
+CITIES = [("10115", "Berlin"), ("20095", "Hamburg"), ("80331", "München"), ("50667", "Köln"), ("04109", "Leipzig")]
+
+def _catalog():
+    from src.sku_names import SKU_NAMES
+    from src.bill_of_materials import BILL_OF_MATERIALS
+    return sorted(SKU_NAMES.items()) + [(sku, f"Set {sku}") for sku in sorted(BILL_OF_MATERIALS)]
+
+class OrderGenerator:
+    """Reproduzierbare Billbee-Bestellungen je Tag (gleicher seed und Tag ergeben dieselben Bestellungen)."""
+
+    def __init__(self, orders_per_day=500, seed=0):
+        self.orders_per_day = orders_per_day
+        self.seed = seed
+        self.catalog = _catalog()
+        # Wenige Artikel machen den Großteil des Absatzes aus
+        self.weights = [1 / (rank + 1) for rank in range(len(self.catalog))]
+        self.orders_for_day = lru_cache(maxsize=64)(self._orders_for_day)
+
+    def _orders_for_day(self, day):
+        rng = random.Random(f"{self.seed}-{day.isoformat()}")
+        count = max(0, int(rng.gauss(self.orders_per_day, math.sqrt(self.orders_per_day))))
+        states, state_weights = zip(*ORDER_STATES)
+        orders = []
+        for number in range(count):
+            order_id = day.toordinal() * 100000 + number
+            ordered_at = datetime.combine(day, datetime.min.time()) + timedelta(seconds=rng.randrange(86400))
+            items = []
+            for position in range(rng.choice([1, 1, 1, 2, 2, 3])):
+                sku, title = rng.choices(self.catalog, self.weights)[0]
+                quantity = rng.choice([1, 1, 1, 2, 3])
+                price = round(rng.uniform(4.9, 49.9), 2)
+                items.append({
+                    "BillbeeId": order_id * 10 + position,
+                    "TransactionId": f"T{order_id}-{position}",
+                    "Product": {"Id": None, "Title": title, "SKU": sku, "EAN": None, "Weight": rng.randrange(200, 3000)},
+                    "Quantity": float(quantity),
+                    "TotalPrice": round(price * quantity, 2),
+                    "TaxAmount": round(price * quantity * 0.19 / 1.19, 2),
+                    "TaxIndex": 1,
+                    "Discount": 0.0,
+                    "Attributes": [],
+                    "GetPriceFromArticleIfAny": False,
+                    "IsCoupon": False,
+                    "ShippingProfileId": None,
+                    "DontAdjustStock": False,
+                    "UnrebatedTotalPrice": round(price * quantity, 2),
+                    "SerialNumber": None,
+                })
+            zip_code, city = rng.choice(CITIES)
+            address = {
+                "BillbeeId": order_id, "FirstName": "Max", "LastName": f"Kunde{number}", "Company": None,
+                "Street": "Musterstraße", "HouseNumber": str(rng.randrange(1, 200)), "Zip": zip_code, "City": city,
+                "CountryISO2": "DE", "Country": "Deutschland", "Email": f"kunde{order_id}@example.org", "Phone": None,
+            }
+            total = round(sum(item["TotalPrice"] for item in items) + 4.9, 2)
+            orders.append({
+                "BillbeeOrderId": order_id,
+                "Id": str(order_id),
+                "OrderNumber": f"B{order_id}",
+                "State": rng.choices(states, state_weights)[0],
+                "VatMode": 0,
+                "CreatedAt": ordered_at.isoformat(),
+                "OrderDate": ordered_at.isoformat(),
+                "LastModifiedAt": (ordered_at + timedelta(hours=rng.randrange(1, 48))).isoformat(),
+                "ShippedAt": None,
+                "PayedAt": ordered_at.isoformat(),
+                "Seller": {"Platform": "Billbee", "BillbeeShopName": rng.choice(PLATFORMS), "BillbeeShopId": 1},
+                "Buyer": {"Platform": None, "BillbeeShopName": None, "Id": None, "Email": address["Email"]},
+                "InvoiceAddress": address,
+                "ShippingAddress": address,
+                "PaymentMethod": rng.choice([1, 3, 22, 31]),
+                "ShippingCost": 4.9,
+                "TotalCost": total,
+                "AdjustmentCost": 0.0,
+                "Currency": "EUR",
+                "OrderItems": items,
+                "Tags": [],
+                "Comments": [],
+            })
+        return orders
+
+    def orders_between(self, start, end, field="OrderDate"):
+        """Bestellungen mit start <= field < end; LastModifiedAt liegt bis zu zwei Tage nach dem Bestelltag."""
+        first = start.date() - (timedelta(days=2) if field == "LastModifiedAt" else timedelta(0))
+        days = (end.date() - first).days + 1
+        orders = []
+        for offset in range(max(days, 0)):
+            orders.extend(order for order in self.orders_for_day(first + timedelta(days=offset))
+                          if start <= datetime.fromisoformat(order[field]) < end)
+        return orders
+
+class RateLimiter:
+    """Token-Bucket: rate Anfragen pro Sekunde, Spitzen bis burst; None bedeutet unbegrenzt."""
+
+    def __init__(self, rate=None, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """0, wenn die Anfrage erlaubt ist, sonst die Wartezeit in Sekunden bis zum nächsten Token."""
+        if not self.rate:
+            return 0
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+class FakeBillbeeServer(ThreadingHTTPServer):
+    """HTTP-Server mit dem Billbee-Endpunkt /api/v1/orders; stats zählt Anfragen, 429-Antworten, Bestellungen und Bytes."""
+
+    daemon_threads = True
+
+    def __init__(self, address, generator, latency=0.0, rate=None, burst=1):
+        super().__init__(address, _Handler)
+        self.generator = generator
+        self.latency = latency
+        self.limiter = RateLimiter(rate, burst)
+        self.stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "rate_limited": 0, "orders": 0, "bytes": 0}
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/api/v1"
+
+    def count(self, **increments):
+        with self.stats_lock:
+            for key, value in increments.items():
+                self.stats[key] += value
+
+    def start(self):
+        """Startet den Server in einem Hintergrund-Thread."""
+        threading.Thread(target=self.serve_forever, name="fake-billbee", daemon=True).start()
+        return self
+
+def _parse_time(value):
+    return datetime.fromisoformat(value) if "T" in value else datetime.combine(date.fromisoformat(value), datetime.min.time())
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, headers=None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+        self.server.count(bytes=len(payload))
+
+    def do_GET(self):
+        server = self.server
+        server.count(requests=1)
+        url = urlparse(self.path)
+        if url.path.rstrip("/") != "/api/v1/orders":
+            return self._send(404, {"ErrorMessage": "Not found", "ErrorCode": 404, "Data": None})
+        if not self.headers.get("X-Billbee-Api-Key") or not self.headers.get("Authorization"):
+            return self._send(401, {"ErrorMessage": "Unauthorized", "ErrorCode": 401, "Data": None})
+        wait = server.limiter.acquire()
+        if wait:
+            server.count(rate_limited=1)
+            # Billbee nennt ganze Sekunden; hier genauer, damit Benchmarks nicht unnötig warten
+            return self._send(429, {"ErrorMessage": "Too many requests", "ErrorCode": 429, "Data": None},
+                              {"Retry-After": f"{wait:.3f}"})
+        if server.latency:
+            time.sleep(server.latency)
+
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            if "modifiedAtMin" in params:
+                field, start, end = "LastModifiedAt", params["modifiedAtMin"], params.get("modifiedAtMax")
+            else:
+                field, start, end = "OrderDate", params.get("minOrderDate"), params.get("maxOrderDate")
+            start = _parse_time(start) if start else datetime.combine(date.today() - timedelta(days=30), datetime.min.time())
+            end = _parse_time(end) if end else datetime.now()
+            page = max(int(params.get("page", 1)), 1)
+            page_size = min(max(int(params.get("pageSize", 50)), 1), MAX_PAGE_SIZE)
+        except ValueError as e:
+            return self._send(400, {"ErrorMessage": str(e), "ErrorCode": 400, "Data": None})
+
+        orders = server.generator.orders_between(start, end, field)
+        total_pages = max(math.ceil(len(orders) / page_size), 1)
+        data = orders[(page - 1) * page_size:page * page_size]
+        server.count(orders=len(data))
+        self._send(200, {
+            "Paging": {"Page": page, "TotalPages": total_pages, "TotalRows": len(orders), "PageSize": page_size},
+            "ErrorMessage": None,
+            "ErrorCode": 0,
+            "ErrorDescription": None,
+            "Data": data,
+        })
+
+def main():
+    parser = argparse.ArgumentParser(description="Lokaler Ersatzserver für den Billbee-Endpunkt /orders")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--orders-per-day", type=int, default=500, help="Mittlere Zahl an Bestellungen je Tag")
+    parser.add_argument("--latency", type=float, default=0.0, help="Zusätzliche Antwortzeit je Anfrage in Sekunden")
+    parser.add_argument("--rate", type=float, default=None, help="Erlaubte Anfragen pro Sekunde (Billbee: 2), sonst 429")
+    parser.add_argument("--burst", type=int, default=1, help="Anfragen, die ohne Wartezeit aufeinander folgen dürfen")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = FakeBillbeeServer((args.host, args.port), OrderGenerator(args.orders_per_day, args.seed),
+                               args.latency, args.rate, args.burst)
+    print(f"Billbee-Ersatz unter {server.base_url} (BASE_URL in [billbee] der Secrets)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
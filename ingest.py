@@ -0,0 +1,79 @@
+import argparse
+import logging
+import pandas as pd
+from datetime import datetime
+from src.raw_archive import replay_archive
+from src.delta_sync import sync_changed_orders
+from src.sales_store import (deduplicate_sales_store, rebuild_sales_state, SALES_STATES, SALES_MANIFEST,
+                             SALES_PREFIX)
+from src.inventory_management import INVENTORY_FILES, INVENTORY_PREFIX
+from src.manifest import vacuum_manifest
+from src.compaction import compact_sales_store
+from src.anomaly_detection import record_anomalies, ANOMALY_MANIFEST, ANOMALY_PREFIX
+from src.artifacts import ARTIFACT_MANIFEST, ARTIFACT_PREFIX
+from src.precompute import precompute_artifacts
+
+logging.basicConfig(level=logging.INFO)
+
+def parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest-Werkzeuge für die Verkaufsdaten")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    replay = commands.add_parser("replay", help="Archivierte Billbee-Rohdaten ohne API-Aufrufe neu verarbeiten")
+    replay.add_argument("--start", type=parse_date, required=True, help="Erster Tag (YYYY-MM-DD)")
+    replay.add_argument("--end", type=parse_date, required=True, help="Letzter Tag (YYYY-MM-DD)")
+    replay.add_argument("--workers", type=int, default=None, help="Anzahl der Prozesse (Standard: alle Kerne)")
+    replay.add_argument("--precompute", action="store_true", help="Anschließend die Auswertungen vorberechnen")
+
+    sync = commands.add_parser("sync", help="Nur seit dem letzten Abgleich geänderte Bestellungen übernehmen")
+    sync.add_argument("--precompute", action="store_true", help="Anschließend die Auswertungen vorberechnen")
+    commands.add_parser("dedupe", help="Doppelt gespeicherte Bestellpositionen aus dem Bestand entfernen "
+                        "(nur Zeilen mit Bestell-IDs; die aus der früheren CSV übernommene Historie bleibt unverändert)")
+    commands.add_parser("compact", help="Abgeschlossene Monate und Jahre zu größeren Dateien zusammenfassen")
+    commands.add_parser("rebuild-state", help="Trendzustand und Plattformwürfel aus den gespeicherten Verkäufen neu aufbauen")
+    anomalies = commands.add_parser("anomalies", help="Tage eines Zeitraums erneut auf auffällige Verkaufsmengen prüfen")
+    anomalies.add_argument("--start", type=parse_date, required=True, help="Erster Tag (YYYY-MM-DD)")
+    anomalies.add_argument("--end", type=parse_date, required=True, help="Letzter Tag (YYYY-MM-DD)")
+
+    commands.add_parser("precompute", help="Zusammenfassungen, Ranglisten, Monatssummen und Detailanalyse als Artefakte vorberechnen")
+    commands.add_parser("vacuum", help="Nicht mehr referenzierte Datenobjekte und alte Manifest-Generationen löschen")
+
+    args = parser.parse_args()
+    if args.command == "replay":
+        days = replay_archive(args.start, args.end, args.workers)
+        print(f"{days} Tage neu verarbeitet.")
+    elif args.command == "sync":
+        changed_orders, changed_days = sync_changed_orders()
+        print(f"{changed_orders} geänderte Bestellungen an {changed_days} Tagen abgeglichen.")
+    elif args.command == "dedupe":
+        removed, unkeyed = deduplicate_sales_store()
+        print(f"{removed} doppelte Bestellpositionen entfernt.")
+        if unkeyed:
+            print(f"{unkeyed} Zeilen ohne Bestell-IDs (frühere CSV-Historie) wurden nicht geprüft.")
+    elif args.command == "compact":
+        merged_files, duplicates = compact_sales_store()
+        print(f"{merged_files} Dateien zusammengefasst, {duplicates} doppelte Bestellpositionen entfernt.")
+    elif args.command == "rebuild-state":
+        for key in SALES_STATES:
+            state = rebuild_sales_state(key)
+            print(f"{key} für {len(state.skus)} SKUs neu aufgebaut.")
+    elif args.command == "anomalies":
+        found = record_anomalies(pd.date_range(args.start, args.end).date)
+        print(f"{len(found)} Auffälligkeiten gefunden.")
+    elif args.command == "vacuum":
+        removed = vacuum_manifest(SALES_MANIFEST, SALES_PREFIX)
+        removed += vacuum_manifest(ANOMALY_MANIFEST, ANOMALY_PREFIX)
+        removed += vacuum_manifest(ARTIFACT_MANIFEST, ARTIFACT_PREFIX)
+        for name in INVENTORY_FILES:
+            removed += vacuum_manifest(name, f"{INVENTORY_PREFIX}/{name}")
+        print(f"{removed} Objekte gelöscht.")
+
+    if args.command == "precompute" or getattr(args, "precompute", False):
+        stored = precompute_artifacts()
+        print(f"{len(stored)} Artefakte vorberechnet.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+import logging
+from collections import Counter
+from datetime import date, timedelta
+
+from fake_billbee import FakeBillbeeServer, OrderGenerator
+from loadtest import prepare_environment, BUCKET_NAME
+
+# Ingest-Benchmark: Backfill über N Tage (BillbeeAPI.get_orders -> process_orders -> save_to_s3)
+# gegen den lokalen Billbee-Ersatz und einen lokalen Objektspeicher. Gemessen werden Durchsatz,
+# API-Aufrufe, geschriebene Bytes und die Zeit je Verarbeitungsschritt.
+
+# Datei, in der update_data den zuletzt importierten Tag festhält
+LAST_IMPORT_FILE = "last_import_date.txt"
+
+class IngestProbe:
+    """Misst die Schritte von update_data und die Schreibzugriffe auf den lokalen Objektspeicher."""
+
+    STEPS = {'get_orders': "API-Abruf", 'archive_raw_orders': "Rohdaten-Archiv", 'process_orders': "Verarbeitung",
+             'save_to_s3': "Speichern", 'check_new_days': "Auffälligkeiten"}
+
+    def __init__(self):
+        self.seconds = Counter()
+        self.rows = 0
+        self.objects = 0
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self._restore = []
+
+    def _timed(self, name, fn):
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.seconds[name] += time.perf_counter() - started
+        return wrapper
+
+    def _patch(self, owner, name, value):
+        self._restore.append((owner, name, owner.__dict__.get(name)))
+        setattr(owner, name, value)
+
+    def __enter__(self):
+        import src.s3_operations as ops
+        from fsspec.implementations.local import LocalFileSystem
+
+        for name in ('archive_raw_orders', 'save_to_s3', 'check_new_days'):
+            self._patch(ops, name, self._timed(name, getattr(ops, name)))
+        process = self._timed('process_orders', ops.process_orders)
+
+        def counting_process(orders_data):
+            frame = process(orders_data)
+            self.rows += len(frame)
+            return frame
+        self._patch(ops, 'process_orders', counting_process)
+        self._patch(ops.billbee_api, 'get_orders', self._timed('get_orders', ops.billbee_api.get_orders))
+
+        original_open = LocalFileSystem._open
+        probe = self
+
+        def counting_open(fs, path, mode="rb", *args, **kwargs):
+            f = original_open(fs, path, mode, *args, **kwargs)
+            if 'w' in mode or 'a' in mode:
+                write = f.write
+
+                def counting_write(data):
+                    with probe.lock:
+                        probe.bytes += len(data)
+                    return write(data)
+                f.write = counting_write
+                with probe.lock:
+                    probe.objects += 1
+            return f
+        self._patch(LocalFileSystem, '_open', counting_open)
+        return self
+
+    def __exit__(self, *exc):
+        for owner, name, value in reversed(self._restore):
+            if value is None:
+                delattr(owner, name)
+            else:
+                setattr(owner, name, value)
+
+def run_backfill(days):
+    """Importiert die letzten days Tage bis gestern wie der Import-Knopf der App; liefert Laufzeit und Messwerte."""
+    from src.s3_utils import get_s3_fs
+    from src.s3_operations import update_data
+
+    yesterday = date.today() - timedelta(days=1)
+    with get_s3_fs().open(f"{BUCKET_NAME}/{LAST_IMPORT_FILE}", 'w') as f:
+        f.write((yesterday - timedelta(days=days - 1)).strftime("%Y-%m-%d"))
+    with IngestProbe() as probe:
+        started = time.perf_counter()
+        update_data()
+        elapsed = time.perf_counter() - started
+    return elapsed, probe
+
+def print_report(days, elapsed, probe, server):
+    stats = server.stats
+    print(f"\nBackfill über {days} Tage: {elapsed:.2f} s")
+    print(f"  Bestellungen:      {stats['orders']} ({stats['orders'] / elapsed:.0f}/s), {probe.rows} Positionen gespeichert")
+    print(f"  API-Aufrufe:       {stats['requests']} (davon {stats['rate_limited']} mit 429), "
+          f"{stats['bytes'] / 1e6:.2f} MB empfangen")
+    print(f"  Objektspeicher:    {probe.bytes / 1e6:.2f} MB in {probe.objects} Schreibvorgängen")
+    print(f"  {'Schritt':<20} {'Sekunden':>9} {'Anteil':>7}")
+    for name, label in IngestProbe.STEPS.items():
+        seconds = probe.seconds[name]
+        print(f"  {label:<20} {seconds:>9.2f} {seconds / elapsed:>7.1%}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest-Benchmark gegen einen lokalen Billbee-Ersatz und Objektspeicher")
+    parser.add_argument("--days", type=int, default=30, help="Anzahl der Tage im Backfill")
+    parser.add_argument("--orders-per-day", type=int, default=500, help="Mittlere Zahl an Bestellungen je Tag")
+    parser.add_argument("--latency", type=float, default=0.0, help="Zusätzliche Antwortzeit je API-Anfrage in Sekunden")
+    parser.add_argument("--rate", type=float, default=None, help="Erlaubte API-Anfragen pro Sekunde (Billbee: 2)")
+    parser.add_argument("--burst", type=int, default=1, help="Anfragen, die ohne Wartezeit aufeinander folgen dürfen")
+    parser.add_argument("--root", default=None, help="Verzeichnis des lokalen Objektspeichers (Standard: temporär)")
+    parser.add_argument("--min-orders-per-second", type=float, default=None,
+                        help="Mindestdurchsatz; darunter endet der Benchmark mit Exit-Code 1")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    server = FakeBillbeeServer(("127.0.0.1", 0), OrderGenerator(args.orders_per_day), args.latency,
+                               args.rate, args.burst).start()
+    root = os.path.abspath(args.root or tempfile.mkdtemp(prefix="ingestbench-"))
+    prepare_environment(root, server.base_url)
+    print(f"Lokaler Objektspeicher: {root}, Billbee-Ersatz: {server.base_url}")
+
+    elapsed, probe = run_backfill(args.days)
+    server.shutdown()
+    print_report(args.days, elapsed, probe, server)
+
+    throughput = server.stats['orders'] / elapsed
+    if args.min_orders_per_second is not None and throughput < args.min_orders_per_second:
+        print(f"\nDurchsatz {throughput:.0f}/s liegt unter {args.min_orders_per_second:.0f}/s.")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import argparse
+import os
+import tempfile
+import threading
+import time
+import logging
+import numpy as np
+import pandas as pd
+from datetime import date, timedelta
+
+# Lasttest: N Sitzungen öffnen gleichzeitig das Dashboard gegen einen lokalen Objektspeicher.
+# Verglichen wird der Lauf mit und ohne Zusammenfassen gleichzeitiger Aufrufe (Single-Flight).
+
+BUCKET_NAME = "loadtest"
+
+def prepare_environment(root, billbee_url=None):
+    """Richtet den lokalen Objektspeicher und passende Secrets ein, bevor die App-Module geladen werden.
+
+    Mit billbee_url zeigen die Billbee-Zugangsdaten auf einen lokalen Ersatzserver (fake_billbee.py).
+    """
+    from src.s3_utils import LOCAL_STORAGE_ENV
+    os.environ[LOCAL_STORAGE_ENV] = root
+    os.makedirs(os.path.join(root, BUCKET_NAME), exist_ok=True)
+    os.makedirs(os.path.join(root, ".streamlit"), exist_ok=True)
+    with open(os.path.join(root, ".streamlit", "secrets.toml"), "w") as f:
+        f.write(f'[aws]\nAWS_ACCESS_KEY_ID = ""\nAWS_SECRET_ACCESS_KEY = ""\nAWS_DEFAULT_REGION = ""\n'
+                f'S3_BUCKET_NAME = "{BUCKET_NAME}"\n')
+        if billbee_url:
+            f.write(f'\n[billbee]\nAPI_KEY = "bench"\nUSERNAME = "bench"\nPASSWORD = "bench"\nBASE_URL = "{billbee_url}"\n')
+    os.chdir(root)
+
+def seed_store(n_skus, n_days, seed=0):
+    """Schreibt synthetische Verkäufe, Anfangsbestand und Anlieferungen."""
+    from src.sales_store import write_sales_batch
+    from src.inventory_management import save_initial_inventory, save_supplier_deliveries
+
+    rng = np.random.default_rng(seed)
+    skus = [f"LT{i:05d}" for i in range(n_skus)]
+    rates = rng.gamma(1.5, 2.0, size=n_skus)
+    platforms = np.array(["Shopify", "Amazon", "eBay"])
+    today = date.today()
+    frames = {}
+    order_id = 0
+    for offset in range(n_days, 0, -1):
+        day = today - timedelta(days=offset)
+        quantity = rng.poisson(rates)
+        sold = np.flatnonzero(quantity)
+        frames[day] = pd.DataFrame({
+            'Date': day,
+            'SKU': np.array(skus, dtype=object)[sold],
+            'Quantity': quantity[sold],
+            'Platform': rng.choice(platforms, len(sold)),
+            'OrderId': [str(order_id + i) for i in range(len(sold))],
+            'OrderItemId': '1',
+        })
+        order_id += len(sold)
+    write_sales_batch(frames)
+
+    save_initial_inventory(pd.DataFrame({'SKU': skus, 'InitialQuantity': rng.integers(0, 500, n_skus),
+                                         'Date': today - timedelta(days=n_days)}))
+    save_supplier_deliveries(pd.DataFrame({'SKU': skus[::3], 'SupplierDelivery': 100,
+                                           'Date': today + timedelta(days=14), 'Status': 'Bestellt'}))
+
+def open_dashboard(with_analysis):
+    """Die Aufrufe, die eine Sitzung beim Öffnen der Übersicht und der Auswertungs-Tabs ausführt."""
+    from src.s3_operations import get_summary_data, get_daily_sales_data, get_period_comparison, get_platform_shares
+    from src.anomaly_detection import load_anomalies
+
+    load_anomalies(date.today() - timedelta(days=7))
+    get_daily_sales_data(days=31)
+    get_platform_shares(30)
+    get_summary_data()
+    get_period_comparison(30)
+    if with_analysis:
+        from src.detail_analysis_tab import load_detail_analysis
+        load_detail_analysis(date(2024, 2, 1))
+
+def run_sessions(n_sessions, with_analysis, coalescing):
+    """Startet n_sessions Sitzungen gleichzeitig; liefert Laufzeit, Objekt-Lesezugriffe und Single-Flight-Zähler."""
+    from src.single_flight import single_flight
+    from fsspec.implementations.local import LocalFileSystem
+    import src.sales_store as sales_store
+    from src.result_cache import result_cache
+
+    reads = {'count': 0}
+    lock = threading.Lock()
+    original_open = LocalFileSystem._open
+
+    def counting_open(self, path, mode="rb", *args, **kwargs):
+        if 'r' in mode:
+            with lock:
+                reads['count'] += 1
+        return original_open(self, path, mode, *args, **kwargs)
+
+    single_flight.enabled = coalescing
+    single_flight.reset_stats()
+    sales_store._state_cache.clear()
+    # Jeder Lauf beginnt ohne zwischengespeicherte Ergebnisse
+    result_cache.clear()
+    barrier = threading.Barrier(n_sessions)
+    errors = []
+
+    def session():
+        barrier.wait()
+        try:
+            open_dashboard(with_analysis)
+        except Exception as e:
+            errors.append(e)
+
+    LocalFileSystem._open = counting_open
+    try:
+        threads = [threading.Thread(target=session, name=f"session-{i}") for i in range(n_sessions)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        LocalFileSystem._open = original_open
+        single_flight.enabled = True
+    if errors:
+        raise errors[0]
+    return elapsed, reads['count'], single_flight.summary()
+
+def print_report(label, elapsed, reads, stats):
+    print(f"\n{label}: {elapsed:.2f} s, {reads} Objekt-Lesezugriffe")
+    print(f"  {'Funktion':<60} {'Aufrufe':>8} {'Berechnet':>10} {'Geteilt':>8}")
+    for name, counts in stats.items():
+        print(f"  {name:<60} {counts['calls']:>8} {counts['executions']:>10} {counts['shared']:>8}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Lasttest gleichzeitiger Dashboard-Sitzungen gegen einen lokalen Objektspeicher")
+    parser.add_argument("--sessions", type=int, default=8, help="Anzahl gleichzeitiger Sitzungen")
+    parser.add_argument("--skus", type=int, default=500, help="Anzahl synthetischer SKUs")
+    parser.add_argument("--days", type=int, default=180, help="Anzahl Tage Verkaufshistorie")
+    parser.add_argument("--analysis", action="store_true", help="Auch die Detailanalyse (Prognosen, SKU-Analysen) laden")
+    parser.add_argument("--root", default=None, help="Verzeichnis des lokalen Objektspeichers (Standard: temporär)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    root = os.path.abspath(args.root or tempfile.mkdtemp(prefix="loadtest-"))
+    prepare_environment(root)
+    print(f"Lokaler Objektspeicher: {root}")
+    seed_store(args.skus, args.days)
+    # Abgeleitete Zustände einmal aufbauen, damit beide Läufe vom selben Stand ausgehen
+    open_dashboard(False)
+
+    for label, coalescing in (("Ohne Single-Flight", False), ("Mit Single-Flight", True)):
+        print_report(label, *run_sessions(args.sessions, args.analysis, coalescing))
+
+if __name__ == "__main__":
+    main()
@@ -2,40 +2,58 @@ import streamlit as st
 from src.overview_tab import overview_tab
 from src.detail_analysis_tab import detail_analysis_tab
 from src.deliveries_tab import deliveries_tab
-from src.data_fetcher import fetch_and_save_missing_data
+from src.data_fetcher import fetch_and_save_missing_data, sync_changed_orders_ui
 from src.winners_tab import winners_tab
 from src.trending_tab import trending_tab
 from src.losing_tab import losing_tab
+from src.query_tab import query_tab
+from src.compaction import start_background_compaction
+from src.s3_operations import get_platform_names
+from src.performance_panel import performance_panel
+from src.sku_hierarchy import LEVELS
 
 import warnings
 warnings.filterwarnings("ignore", category=FutureWarning)
 
 st.set_page_config(layout="wide")
+start_background_compaction()
 st.title("Procurement App - Original SKU Analysis")
 
-tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["Übersicht", "Detailanalyse", "Anlieferungen", "Winners", "Trending", "Losing"])
+# Plattformfilter für die Verkaufsauswertungen; ohne Auswahl gelten alle Plattformen
+platforms = st.sidebar.multiselect("Plattformen", get_platform_names()) or None
+# Ebene der SKU-Hierarchie für Zusammenfassung, Trends und Periodenvergleiche
+level = st.sidebar.selectbox("Ebene", list(LEVELS), format_func=LEVELS.get)
+
+tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs(["Übersicht", "Detailanalyse", "Anlieferungen", "Winners", "Trending", "Losing", "SQL-Abfrage"])
 
 with tab1:
-    overview_tab()
+    overview_tab(platforms, level)
 
 with tab2:
-    detail_analysis_tab()
+    detail_analysis_tab(platforms)
 
 with tab3:
     deliveries_tab()
 
 with tab4:
-    winners_tab()
+    winners_tab(platforms, level)
 
 with tab5:
-    trending_tab()
+    trending_tab(platforms, level)
 
 with tab6:
-    losing_tab()
+    losing_tab(platforms, level)
+
+with tab7:
+    query_tab()
 
 # Sidebar
 st.sidebar.info("This app manages inventory and analyzes sales data using original SKUs.")
 
 overwrite_data = st.sidebar.checkbox("Overwrite existing data")
 if st.sidebar.button("Fetch and Save Missing Data"):
-    fetch_and_save_missing_data(overwrite_data)
\ No newline at end of file
+    fetch_and_save_missing_data(overwrite_data)
+if st.sidebar.button("Geänderte Bestellungen abgleichen"):
+    sync_changed_orders_ui()
+
+performance_panel()
\ No newline at end of file
@@ -0,0 +1,136 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import logging
+from datetime import timedelta
+from numpy.lib.stride_tricks import sliding_window_view
+from src.s3_utils import get_s3_fs
+from src.manifest import read_manifest, commit_manifest, new_object_path
+from src.sales_store import load_platform_cube
+
+logger = logging.getLogger(__name__)
+
+# Auffällige Tagesmengen je SKU liegen als kleine CSV unter anomalies/, das gleichnamige
+# Manifest verweist auf die gültige Version
+ANOMALY_MANIFEST = "anomalies"
+ANOMALY_PREFIX = "anomalies"
+ANOMALY_COLUMNS = ['Date', 'SKU', 'Quantity', 'Expected', 'Score', 'Kind']
+# Vergleichszeitraum vor dem bewerteten Tag (acht volle Wochen)
+BASELINE_DAYS = 56
+# Zähldaten streuen nach oben stärker als nach unten, Spitzen brauchen daher einen höheren Wert
+SPIKE_THRESHOLD = 5.0
+DROP_THRESHOLD = -3.5
+# Untergrenze der robusten Streuung, damit seltene Verkäufe nicht als Ausreißer gelten
+MIN_SCALE = 1.0
+# Einbrüche nur bei SKUs mit nennenswertem Absatz, Spitzen erst ab dieser Menge
+MIN_EXPECTED_FOR_DROP = 2.0
+MIN_QUANTITY_FOR_SPIKE = 5
+SPIKE, DROP = 'Spitze', 'Einbruch'
+
+def score_days(values, dates, target_positions, baseline_days=BASELINE_DAYS):
+    """Robuste, wochentagsbereinigte z-Werte für die Zieltage aller SKUs in einem Durchgang.
+
+    values hat die Form (SKUs, Tage). Je Zieltag bilden die baseline_days Tage davor die
+    Vergleichsbasis: Wochentagsfaktoren je SKU gleichen das Wochenmuster aus, danach
+    werden Median und MAD der bereinigten Basis mit dem bereinigten Zielwert verglichen.
+    Liefert (z-Werte, erwartete Mengen), beide (SKUs, Zieltage).
+    """
+    target_positions = np.asarray(target_positions, dtype=np.int64)
+    windows = sliding_window_view(values, baseline_days, axis=1)[:, target_positions - baseline_days]
+    weekdays = np.asarray(dates.dayofweek)
+    window_weekdays = sliding_window_view(weekdays, baseline_days)[target_positions - baseline_days]
+
+    # Mittelwert je Wochentag im Vergleichszeitraum, geglättet gegen leere Wochentage
+    one_hot = window_weekdays[:, :, None] == np.arange(7)
+    weekday_mean = np.einsum('stw,twk->stk', windows, one_hot) / one_hot.sum(axis=1)
+    factors = (weekday_mean + 1.0) / (windows.mean(axis=2, keepdims=True) + 1.0)
+
+    day_factors = np.take_along_axis(factors, np.broadcast_to(window_weekdays, windows.shape), axis=2)
+    adjusted = windows / day_factors
+    median = np.median(adjusted, axis=2)
+    # Bei Zähldaten ist die Streuung mindestens die Poisson-Streuung des Medians
+    mad = 1.4826 * np.median(np.abs(adjusted - median[:, :, None]), axis=2)
+    scale = np.maximum(np.maximum(mad, np.sqrt(median)), MIN_SCALE)
+
+    target_factor = factors[:, np.arange(len(target_positions)), weekdays[target_positions]]
+    expected = median * target_factor
+    scores = (values[:, target_positions] / target_factor - median) / scale
+    return scores, expected
+
+def detect_anomalies(matrix, target_dates, baseline_days=BASELINE_DAYS):
+    """Bewertet die Zieltage aller SKUs der Matrix und liefert die auffälligen Tage."""
+    positions = matrix.dates.get_indexer(pd.to_datetime(list(target_dates)))
+    positions = np.sort(positions[positions >= baseline_days])
+    if len(matrix.skus) == 0 or len(positions) == 0:
+        return pd.DataFrame(columns=ANOMALY_COLUMNS)
+
+    scores, expected = score_days(matrix.values, matrix.dates, positions, baseline_days)
+    quantity = matrix.values[:, positions]
+    spike = (scores >= SPIKE_THRESHOLD) & (quantity >= MIN_QUANTITY_FOR_SPIKE)
+    drop = (scores <= DROP_THRESHOLD) & (expected >= MIN_EXPECTED_FOR_DROP)
+    rows, cols = np.nonzero(spike | drop)
+    return pd.DataFrame({
+        'Date': matrix.dates[positions[cols]].date,
+        'SKU': matrix.skus[rows],
+        'Quantity': quantity[rows, cols],
+        'Expected': np.round(expected[rows, cols], 2),
+        'Score': np.round(scores[rows, cols], 2),
+        'Kind': np.where(spike[rows, cols], SPIKE, DROP),
+    }, columns=ANOMALY_COLUMNS)
+
+def _read_anomalies(s3, manifest):
+    path = manifest['objects'].get('data')
+    if path is None:
+        return pd.DataFrame(columns=ANOMALY_COLUMNS)
+    with s3.open(path, 'r') as f:
+        anomalies = pd.read_csv(f, dtype={'SKU': str})
+    anomalies['Date'] = pd.to_datetime(anomalies['Date']).dt.date
+    return anomalies
+
+def record_anomalies(dates, s3=None, bucket_name=None):
+    """Bewertet frisch importierte Tage und ersetzt deren Einträge in der Auffälligkeitstabelle.
+
+    Grundlage ist der Plattformwürfel, die Verkaufsdaten werden dafür nicht gelesen.
+    Liefert die gefundenen Auffälligkeiten.
+    """
+    dates = sorted({pd.Timestamp(date).date() for date in dates})
+    if not dates:
+        return pd.DataFrame(columns=ANOMALY_COLUMNS)
+    s3 = s3 or get_s3_fs()
+    bucket_name = bucket_name or st.secrets['aws']['S3_BUCKET_NAME']
+
+    matrix = load_platform_cube(s3, bucket_name).daily_matrix(dates[0] - timedelta(days=BASELINE_DAYS), dates[-1])
+    found = detect_anomalies(matrix, dates)
+
+    def update(manifest):
+        anomalies = _read_anomalies(s3, manifest)
+        anomalies = pd.concat([anomalies[~anomalies['Date'].isin(dates)], found], ignore_index=True)
+        path = new_object_path(bucket_name, ANOMALY_PREFIX, 'anomalies', '.csv')
+        with s3.open(path, 'w') as f:
+            anomalies.sort_values(['Date', 'SKU']).to_csv(f, index=False)
+        return {'data': path}
+
+    commit_manifest(ANOMALY_MANIFEST, update, s3, bucket_name)
+    logger.info(f"{len(found)} Auffälligkeiten an {len(dates)} Tagen gefunden.")
+    return found
+
+def check_new_days(dates, s3=None, bucket_name=None):
+    """Wie record_anomalies, ein Fehler bricht den Import aber nicht ab."""
+    try:
+        return record_anomalies(dates, s3, bucket_name)
+    except Exception as e:
+        logger.error(f"Fehler bei der Prüfung auf Auffälligkeiten: {str(e)}")
+        return pd.DataFrame(columns=ANOMALY_COLUMNS)
+
+def load_anomalies(since=None):
+    """Gespeicherte Auffälligkeiten, optional ab einem Datum, neueste zuerst."""
+    try:
+        s3 = get_s3_fs()
+        bucket_name = st.secrets['aws']['S3_BUCKET_NAME']
+        anomalies = _read_anomalies(s3, read_manifest(ANOMALY_MANIFEST, s3, bucket_name))
+        if since is not None:
+            anomalies = anomalies[anomalies['Date'] >= since]
+        return anomalies.sort_values(['Date', 'Score'], ascending=[False, False], ignore_index=True)
+    except Exception as e:
+        logger.error(f"Fehler beim Laden der Auffälligkeiten: {str(e)}")
+        return pd.DataFrame(columns=ANOMALY_COLUMNS)
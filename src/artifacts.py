@@ -0,0 +1,55 @@
+import streamlit as st
+import pandas as pd
+import logging
+from src.s3_utils import get_s3_fs
+from src.manifest import read_manifest, commit_manifest, new_object_path
+
+logger = logging.getLogger(__name__)
+
+# Vorberechnete Auswertungen liegen als Parquet unter artifacts/, das Manifest "artifacts"
+# verweist je Name auf die neueste Fassung. Der Dateiname enthält die Kennung des Stands
+# (Datenversion, ggf. Bestandsversion und Stichtag), für den sie berechnet wurde.
+ARTIFACT_MANIFEST = "artifacts"
+ARTIFACT_PREFIX = "artifacts"
+
+def artifact_tag(*parts):
+    """Kennung eines Stands aus seinen Teilen; None, wenn sich ein Teil nicht ermitteln lässt."""
+    if any(part is None for part in parts):
+        return None
+    return "_".join(f"{part:%Y%m%d}" if hasattr(part, 'strftime') else str(part) for part in parts)
+
+def _stem(name, tag):
+    return f"{name}.{tag}"
+
+def write_artifacts(artifacts, s3=None, bucket_name=None):
+    """Schreibt Artefakte (Name -> (Kennung, DataFrame)) und übernimmt sie in einem Manifest-Commit."""
+    s3 = s3 or get_s3_fs()
+    bucket_name = bucket_name or st.secrets['aws']['S3_BUCKET_NAME']
+    paths = {}
+    for name, (tag, frame) in artifacts.items():
+        path = new_object_path(bucket_name, ARTIFACT_PREFIX, _stem(name, tag), '.parquet')
+        with s3.open(path, 'wb') as f:
+            frame.to_parquet(f, index=False)
+        paths[name] = path
+    commit_manifest(ARTIFACT_MANIFEST, lambda manifest: {**manifest['objects'], **paths}, s3, bucket_name)
+    logger.info(f"{len(paths)} Artefakte gespeichert.")
+    return paths
+
+def read_artifact(name, tag, s3=None, bucket_name=None):
+    """Liest ein Artefakt, sofern es für den Stand tag berechnet wurde, sonst None.
+
+    Auch Lesefehler liefern None, der Aufrufer rechnet dann selbst.
+    """
+    if tag is None:
+        return None
+    try:
+        s3 = s3 or get_s3_fs()
+        bucket_name = bucket_name or st.secrets['aws']['S3_BUCKET_NAME']
+        path = read_manifest(ARTIFACT_MANIFEST, s3, bucket_name)['objects'].get(name)
+        if path is None or not path.rsplit('/', 1)[-1].startswith(_stem(name, tag) + '.'):
+            return None
+        with s3.open(path, 'rb') as f:
+            return pd.read_parquet(f)
+    except Exception as e:
+        logger.error(f"Fehler beim Lesen des Artefakts {name}: {str(e)}")
+        return None
@@ -0,0 +1,106 @@
+import pandas as pd
+import numpy as np
+from src.daily_matrix import DailyMatrix
+from src.trend_state import TrendState, RING_DAYS
+from src.sku_registry import normalize_sku
+
+# Stückliste der Sets: Set-SKU -> {Komponenten-SKU: Stück je Set}. SKUs ohne Eintrag
+# sind Einzelartikel und stehen für sich selbst.
+BILL_OF_MATERIALS = {
+    '8000': {'80524-44': 1, '80523-20': 1},   # Cannabis-Dünger-Set: Grow + Bloom
+    '8001': {'80538-2': 1, '80523-22': 1},    # Sativa-Dünger-Set
+    '8002': {'80539-1': 1, '80523-21': 1},    # Hybrid-Dünger-Set
+    '8003': {'80538-1': 1, '80537-1': 1},     # Autoflower-Dünger-Set
+    '8004': {'80539-2': 1, '80537-2': 1},     # Indica-Dünger-Set
+}
+
+def bom_pairs(skus, bom=None):
+    """(Komponente, SKU, Stück) für alle SKUs; Einzelartikel bilden sich mit Stück 1 auf sich selbst ab."""
+    bom = BILL_OF_MATERIALS if bom is None else bom
+    rows = []
+    for sku in pd.unique(pd.Series(list(skus), dtype=object).astype(str)):
+        components = bom.get(normalize_sku(sku))
+        if components is None:
+            rows.append((sku, sku, 1))
+        else:
+            rows.extend((normalize_sku(component), sku, quantity) for component, quantity in components.items())
+    return pd.DataFrame(rows, columns=['Component', 'SKU', 'Units'])
+
+def expansion_matrix(skus, bom=None):
+    """Dünnbesetzte Matrix (Komponenten × SKUs) und die sortierten Komponenten.
+
+    Multipliziert mit einer SKU×Tag-Matrix ergibt sie den Komponentenbedarf je Tag.
+    """
+    from scipy import sparse
+
+    skus = pd.Index(list(skus), dtype=object).astype(str)
+    pairs = bom_pairs(skus, bom)
+    components = pd.Index(sorted(pairs['Component'].unique()), dtype=object)
+    matrix = sparse.csr_matrix(
+        (pairs['Units'].to_numpy(np.float64), (components.get_indexer(pairs['Component']), skus.get_indexer(pairs['SKU']))),
+        shape=(len(components), len(skus)))
+    return matrix, components
+
+def expand_daily_matrix(matrix, bom=None):
+    """Komponentenbedarf aller SKUs und Tage als ein Sparse-Matrix-Produkt."""
+    expansion, components = expansion_matrix(matrix.skus, bom)
+    return DailyMatrix(np.asarray(expansion @ matrix.values), components, matrix.dates)
+
+def daily_rows(matrix):
+    """Tageszeilen (Date, SKU, Quantity) der von null verschiedenen Einträge einer SKU×Tag-Matrix."""
+    rows, cols = np.nonzero(matrix.values)
+    return pd.DataFrame({
+        'Date': matrix.dates[cols],
+        'SKU': matrix.skus[rows].astype(str),
+        'Quantity': matrix.values[rows, cols],
+    })
+
+def expand_sales(sales, bom=None):
+    """Verkaufszeilen auf Komponentenebene: jede Set-Zeile wird zu einer Zeile je Komponente."""
+    if sales.empty:
+        return sales
+    pairs = bom_pairs(sales['SKU'], bom)
+    expanded = pd.merge(sales.assign(SKU=sales['SKU'].astype(str)), pairs, on='SKU')
+    expanded['Quantity'] = expanded['Quantity'] * expanded['Units']
+    return expanded.drop(columns=['SKU', 'Units']).rename(columns={'Component': 'SKU'})
+
+def expand_trend_state(state, bom=None):
+    """Trendzustand auf Komponentenebene, ohne die Verkaufsdaten zu lesen.
+
+    Jede Set-Zeile wird zu einer Zeile je Komponente: Zeilenzahlen und Tagessummen
+    werden übernommen, Mengen mit der Stückzahl gewichtet. Das Kurzfristfenster einer
+    Komponente endet an ihrem spätesten Verkaufstag und liegt damit in den Ringpuffern
+    aller beteiligten SKUs.
+    """
+    expansion, components = expansion_matrix(state.skus, bom)
+    units = expansion.astype(np.int64)
+    present = units.copy()
+    present.data[:] = 1
+    arrays = {field: np.asarray(present @ getattr(state, field)).astype(np.int64) for field in ('n', 'sx', 'sxx')}
+    arrays.update({field: np.asarray(units @ getattr(state, field)).astype(np.int64) for field in ('sy', 'sxy')})
+
+    links = units.tocoo()
+    last_day = np.full(len(components), -1, dtype=np.int64)
+    np.maximum.at(last_day, links.row, state.last_day[links.col])
+    stale = np.zeros(len(components), dtype=bool)
+    np.logical_or.at(stale, links.row, state.stale[links.col])
+
+    # Ringeinträge (SKU, Tag) den Komponenten zuordnen und je Komponente und Tag zusammenfassen
+    ring_row, ring_slot = np.nonzero(state.ring_day >= 0)
+    entries = pd.DataFrame({'col': ring_row, 'Day': state.ring_day[ring_row, ring_slot],
+                            'Count': state.ring_count[ring_row, ring_slot], 'Qty': state.ring_qty[ring_row, ring_slot]})
+    entries = pd.merge(pd.DataFrame({'row': links.row, 'col': links.col, 'Units': links.data}), entries, on='col')
+    entries['Qty'] = entries['Qty'] * entries['Units']
+    entries = entries.groupby(['row', 'Day'], as_index=False)[['Count', 'Qty']].sum()
+    entries = entries[entries['Day'] >= last_day[entries['row'].to_numpy()] - (RING_DAYS - 1)]
+
+    ring_day = np.full((len(components), RING_DAYS), -1, dtype=np.int64)
+    ring_count = np.zeros((len(components), RING_DAYS), dtype=np.int64)
+    ring_qty = np.zeros((len(components), RING_DAYS), dtype=np.int64)
+    row, day = entries['row'].to_numpy(), entries['Day'].to_numpy(np.int64)
+    ring_day[row, day % RING_DAYS] = day
+    ring_count[row, day % RING_DAYS] = entries['Count'].to_numpy(np.int64)
+    ring_qty[row, day % RING_DAYS] = entries['Qty'].to_numpy(np.int64)
+
+    arrays.update(last_day=last_day, ring_day=ring_day, ring_count=ring_count, ring_qty=ring_qty, stale=stale)
+    return TrendState(components.tolist(), arrays)
@@ -1,3 +1,4 @@
+import time
 import requests
 import streamlit as st
 import logging
@@ -6,30 +7,64 @@ logger = logging.getLogger(__name__)
 
 class BillbeeAPI:
     BASE_URL = "https://api.billbee.io/api/v1"
+    PAGE_SIZE = 250  # Max page size
+    MAX_RETRIES = 5  # Wiederholungen einer Seite nach 429 (Rate-Limit)
 
     def __init__(self):
         self.api_key = st.secrets["billbee"]["API_KEY"]
         self.username = st.secrets["billbee"]["USERNAME"]
         self.password = st.secrets["billbee"]["PASSWORD"]
+        # Abweichender Endpunkt, etwa der lokale Ersatzserver aus fake_billbee.py
+        self.base_url = st.secrets["billbee"].get("BASE_URL", self.BASE_URL)
 
-    def get_orders(self, start_date, end_date):
-        endpoint = f"{self.BASE_URL}/orders"
+    def _get_page(self, endpoint, headers, params):
+        """Eine Seite abfragen; bei 429 wird nach Retry-After (Sekunden) erneut gefragt."""
+        for attempt in range(self.MAX_RETRIES + 1):
+            response = requests.get(endpoint, headers=headers, params=params, auth=(self.username, self.password))
+            if response.status_code != 429 or attempt == self.MAX_RETRIES:
+                response.raise_for_status()
+                return response.json()
+            wait = float(response.headers.get("Retry-After") or 1)
+            logger.warning(f"Billbee-Rate-Limit erreicht, neuer Versuch in {wait:.2f} s.")
+            time.sleep(wait)
+
+    def _get_all_pages(self, params):
+        """Fragt /orders Seite für Seite ab und fasst alle Bestellungen in einer Antwort zusammen."""
+        endpoint = f"{self.base_url}/orders"
         headers = {
             "X-Billbee-Api-Key": self.api_key,
             "Content-Type": "application/json"
         }
+        orders = []
+        page = 1
+        while True:
+            data = self._get_page(endpoint, headers, {**params, "page": page, "pageSize": self.PAGE_SIZE})
+            orders.extend(data.get("Data") or [])
+            total_pages = (data.get("Paging") or {}).get("TotalPages") or 1
+            if page >= total_pages:
+                return {"Data": orders, "Paging": {"TotalRows": len(orders), "TotalPages": total_pages}}
+            page += 1
+
+    def get_orders(self, start_date, end_date, raise_errors=False):
         params = {
             "minOrderDate": start_date.isoformat(),
             "maxOrderDate": end_date.isoformat(),
-            "pageSize": 250  # Max page size
         }
         
         try:
-            response = requests.get(endpoint, headers=headers, params=params, auth=(self.username, self.password))
-            response.raise_for_status()
-            return response.json()
+            return self._get_all_pages(params)
         except requests.RequestException as e:
             logger.error(f"Error querying Billbee API: {str(e)}")
+            if raise_errors:
+                raise
             return {"Data": []}  # Return empty data instead of raising
 
-billbee_api = BillbeeAPI()
\ No newline at end of file
+    def get_orders_modified_since(self, modified_since, modified_until):
+        """Alle Bestellungen, die im Zeitraum angelegt oder geändert wurden (Fehler werden weitergereicht)."""
+        params = {
+            "modifiedAtMin": modified_since.isoformat(),
+            "modifiedAtMax": modified_until.isoformat(),
+        }
+        return self._get_all_pages(params)
+
+billbee_api = BillbeeAPI()
@@ -0,0 +1,147 @@
+import pandas as pd
+import logging
+import threading
+import time
+from datetime import date, timedelta
+from src.s3_utils import get_s3_fs
+from src.manifest import commit_manifest
+from src.sales_store import (SALES_MANIFEST, get_bucket_name, ensure_sales_store, list_partitions, partitions_from_manifest,
+                             day_key, month_key, year_key, period_dates, read_partition, write_new_partition, row_keys,
+                             carry_sales_states)
+
+logger = logging.getLogger(__name__)
+
+# Zeilen je Row Group in verdichteten Dateien; da nach SKU sortiert wird, kann ein
+# SKU-Filter über die Statistiken der Row Groups ganze Blöcke überspringen
+COMPACTED_ROW_GROUP_ROWS = 64_000
+COMPACTION_INTERVAL = timedelta(hours=6)
+
+_compaction_thread = None
+_compaction_lock = threading.Lock()
+
+def complete_months(partitions):
+    """Monate mit Monatspartition oder lückenlosen Tagespartitionen."""
+    days_per_month = {}
+    for day in partitions['day']:
+        month = pd.Period(day, freq='M')
+        days_per_month[month] = days_per_month.get(month, 0) + 1
+    return set(partitions['month']) | {month for month, count in days_per_month.items() if count == month.days_in_month}
+
+def compaction_targets(partitions, today=None):
+    """Abgeschlossene Zeiträume, deren Partitionen sich zusammenfassen lassen.
+
+    Verdichtet werden nur vollständig abgerufene Zeiträume, da eine Monats- oder
+    Jahrespartition den ganzen Zeitraum als abgerufen kennzeichnet: abgeschlossene
+    Jahre, deren zwölf Monate vollständig sind (oder die bereits verdichtet sind und neue
+    Tagespartitionen erhalten haben), und sonst abgeschlossene, vollständige Monate mit
+    Tagespartitionen.
+    """
+    today = today or date.today()
+    current_month = pd.Period(today, freq='M')
+    current_year = pd.Period(today, freq='Y')
+    complete = complete_months(partitions)
+
+    years = {pd.Period(day, freq='Y') for day in partitions['day']}
+    years |= {month.asfreq('Y') for month in partitions['month']}
+    targets = [('year', year) for year in sorted(years) if year < current_year and (
+        year in partitions['year'] or all(month in complete for month in pd.period_range(year.start_time, year.end_time, freq='M')))]
+
+    compacted_years = {year for _, year in targets} | set(partitions['year'])
+    months = {pd.Period(day, freq='M') for day in partitions['day']}
+    targets += [('month', month) for month in sorted(months)
+                if month < current_month and month in complete and month.asfreq('Y') not in compacted_years]
+    return targets
+
+def _merge_rows(parts):
+    """Fasst Teilstände zusammen; je (OrderId, OrderItemId) gewinnt die zuletzt übergebene Zeile.
+
+    Liefert (zusammengefasste Zeilen, entfernte Duplikate).
+    """
+    merged = pd.concat(parts, ignore_index=True)
+    keys = row_keys(merged)
+    duplicate = keys.notna() & keys.duplicated(keep='last')
+    return merged[~duplicate], merged[duplicate]
+
+def compact_period(kind, period, s3=None, bucket_name=None):
+    """Verdichtet einen abgeschlossenen Monat oder ein abgeschlossenes Jahr in eine Datei.
+
+    Die vorhandene verdichtete Datei, enthaltene Monatsdateien und Tagesdateien werden
+    gelesen, Tage mit eigener Datei ersetzen die älteren Zeilen, doppelte Bestellpositionen
+    entfallen. Die neue Datei und das Entfernen der Quellen werden in einem Manifest-Commit
+    übernommen. Liefert (Anzahl zusammengefasster Dateien, entfernte Duplikate).
+    """
+    s3 = s3 or get_s3_fs()
+    bucket_name = bucket_name or get_bucket_name()
+    first, last = period_dates(period)
+    key = year_key(period) if kind == 'year' else month_key(period)
+    result = (0, 0)
+
+    def update(manifest):
+        nonlocal result
+        partitions = partitions_from_manifest(manifest)
+        days = {day: path for day, path in partitions['day'].items() if first <= day <= last}
+        if kind == 'year':
+            coarse = {month_key(month): path for month, path in partitions['month'].items() if month.asfreq('Y') == period}
+            if period in partitions['year']:
+                coarse[key] = partitions['year'][period]
+            if not days and len(coarse) <= 1 and key in coarse:
+                return None
+        else:
+            coarse = {key: partitions['month'][period]} if period in partitions['month'] else {}
+            if not days:
+                return None
+
+        parts = []
+        for path in coarse.values():
+            data = read_partition(s3, path)
+            parts.append(data[~data['Date'].isin(days)])
+        parts += [read_partition(s3, path) for _, path in sorted(days.items())]
+        merged, duplicates = _merge_rows(parts)
+
+        objects = dict(manifest['objects'])
+        for source in list(coarse) + [day_key(day) for day in days]:
+            objects.pop(source, None)
+        objects[key] = write_new_partition(s3, bucket_name, key, merged, COMPACTED_ROW_GROUP_ROWS)
+        if not duplicates.empty:
+            carry_sales_states(s3, bucket_name, objects, duplicates, None)
+        result = (len(coarse) + len(days), len(duplicates))
+        return objects
+
+    commit_manifest(SALES_MANIFEST, update, s3, bucket_name)
+    if result[0]:
+        logger.info(f"{key}: {result[0]} Dateien zusammengefasst, {result[1]} doppelte Bestellpositionen entfernt.")
+    return result
+
+def compact_sales_store(s3=None, bucket_name=None, today=None):
+    """Verdichtet alle abgeschlossenen Monate und Jahre, je Zeitraum ein Manifest-Commit.
+
+    Liefert (Anzahl zusammengefasster Dateien, entfernte Duplikate).
+    """
+    s3 = s3 or get_s3_fs()
+    bucket_name = bucket_name or get_bucket_name()
+    ensure_sales_store(s3, bucket_name)
+
+    merged_files, duplicates = 0, 0
+    for kind, period in compaction_targets(list_partitions(s3, bucket_name), today):
+        files, removed = compact_period(kind, period, s3, bucket_name)
+        merged_files += files
+        duplicates += removed
+    logger.info(f"Verdichtung abgeschlossen: {merged_files} Dateien zusammengefasst, {duplicates} Duplikate entfernt.")
+    return merged_files, duplicates
+
+def _compaction_loop(interval):
+    while True:
+        try:
+            compact_sales_store()
+        except Exception as e:
+            logger.error(f"Fehler bei der Verdichtung der Verkaufsdaten: {str(e)}")
+        time.sleep(interval.total_seconds())
+
+def start_background_compaction(interval=COMPACTION_INTERVAL):
+    """Startet die Verdichtung einmal je Prozess in einem Hintergrund-Thread."""
+    global _compaction_thread
+    with _compaction_lock:
+        if _compaction_thread is None or not _compaction_thread.is_alive():
+            _compaction_thread = threading.Thread(target=_compaction_loop, args=(interval,), name="sales-compaction", daemon=True)
+            _compaction_thread.start()
+    return _compaction_thread
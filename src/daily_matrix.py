@@ -0,0 +1,41 @@
+import pandas as pd
+import numpy as np
+from collections import namedtuple
+from src.sku_registry import sku_registry
+
+# Ausgerichtete SKU×Tag-Matrix: values[i, j] ist die Verkaufsmenge von skus[i] am Tag dates[j]
+DailyMatrix = namedtuple('DailyMatrix', ['values', 'skus', 'dates'])
+
+def empty_daily_matrix():
+    return DailyMatrix(np.zeros((0, 0)), pd.Index([], dtype=object), pd.DatetimeIndex([]))
+
+def build_daily_matrix(all_data, start_date=None, end_date=None):
+    """Erstellt die SKU×Tag-Mengenmatrix für alle SKUs in einem Durchgang."""
+    if all_data.empty:
+        return empty_daily_matrix()
+
+    dates = pd.to_datetime(all_data['Date']).dt.normalize()
+    start = pd.Timestamp(start_date).normalize() if start_date is not None else dates.min()
+    end = pd.Timestamp(end_date).normalize() if end_date is not None else dates.max()
+    date_index = pd.date_range(start=start, end=end, freq='D')
+
+    mask = ((dates >= start) & (dates <= end)).to_numpy()
+    if not mask.any() or len(date_index) == 0:
+        return DailyMatrix(np.zeros((0, len(date_index))), pd.Index([], dtype=object), date_index)
+
+    if 'SKUCode' in all_data.columns:
+        sku_codes, code_index = pd.factorize(all_data['SKUCode'].to_numpy()[mask], sort=True)
+        sku_index = sku_registry.decode(code_index)
+    else:
+        sku_codes, sku_index = pd.factorize(all_data['SKU'].astype(str).to_numpy()[mask], sort=True)
+    day_pos = (dates[mask] - start).dt.days.to_numpy()
+    quantities = all_data['Quantity'].to_numpy(dtype='float64')[mask]
+
+    n_skus, n_days = len(sku_index), len(date_index)
+    flat = np.bincount(sku_codes * n_days + day_pos, weights=quantities, minlength=n_skus * n_days)
+    return DailyMatrix(flat.reshape(n_skus, n_days), pd.Index(sku_index, dtype=object), date_index)
+
+def sku_series(matrix, sku):
+    """Gibt die tägliche Verkaufsreihe einer SKU als DataFrame mit Date und Quantity zurück."""
+    row = matrix.skus.get_loc(sku)
+    return pd.DataFrame({'Date': matrix.dates, 'Quantity': matrix.values[row]})
@@ -1,6 +1,7 @@
 import streamlit as st
 from datetime import datetime, timedelta
 from src.s3_operations import get_missing_dates, update_data
+from src.delta_sync import sync_changed_orders
 
 def fetch_and_save_missing_data(overwrite_data):
     today = datetime.now().date()
@@ -19,4 +20,16 @@ def fetch_and_save_missing_data(overwrite_data):
         st.success(f"Data fetched and saved successfully for {total_dates} dates!")
         st.rerun()  # Add this line to rerun the app
     else:
-        st.info("No missing data to fetch.")
\ No newline at end of file
+        st.info("No missing data to fetch.")
+
+def sync_changed_orders_ui():
+    try:
+        changed_orders, changed_days = sync_changed_orders()
+    except Exception as e:
+        st.error(f"Fehler beim Abgleich der geänderten Bestellungen: {str(e)}")
+        return
+    if changed_days:
+        st.success(f"{changed_orders} geänderte Bestellungen an {changed_days} Tagen abgeglichen.")
+        st.rerun()
+    else:
+        st.info("Keine geänderten Bestellungen seit dem letzten Abgleich.")
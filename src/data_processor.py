@@ -1,24 +1,52 @@
 import pandas as pd
+import gzip
+import json
 from datetime import datetime
 
+ORDER_COLUMNS = ['SKU', 'Quantity', 'Platform', 'OrderId', 'OrderItemId', 'OrderDate']
+
+# Billbee-Bestellstatus 6 (gelöscht) und 8 (storniert) zählen nicht als Verkauf
+CANCELLED_ORDER_STATES = {6, 8}
+
+def order_key(order):
+    return order.get('BillbeeOrderId') or order.get('Id')
+
+def is_cancelled(order):
+    return order.get('State') in CANCELLED_ORDER_STATES
+
+def order_day(order):
+    order_date = order.get('OrderDate')
+    return pd.Timestamp(str(order_date)[:10]).date() if order_date else None
+
 def process_orders(orders_data):
     orders = orders_data.get('Data', [])
     if not orders:
-        return pd.DataFrame(columns=['SKU', 'Quantity', 'Platform'])
+        return pd.DataFrame(columns=ORDER_COLUMNS)
 
     processed_data = []
     
     for order in orders:
+        if is_cancelled(order):
+            continue
         order_items = order.get('OrderItems', [])
         platform = order.get('Seller', {}).get('BillbeeShopName', 'Unknown')
-        for item in order_items:
+        order_id = order_key(order)
+        ordered_on = order_day(order)
+        for position, item in enumerate(order_items):
             sku = item.get('Product', {}).get('SKU')
             quantity = int(item.get('Quantity', 0))
             if sku:
                 processed_data.append({
                     'SKU': sku,
                     'Quantity': quantity,
-                    'Platform': platform
+                    'Platform': platform,
+                    'OrderId': None if order_id is None else str(order_id),
+                    'OrderItemId': str(item.get('BillbeeId') or position),
+                    'OrderDate': ordered_on
                 })
     
-    return pd.DataFrame(processed_data)
\ No newline at end of file
+    return pd.DataFrame(processed_data, columns=ORDER_COLUMNS)
+
+def process_archived_orders(payload):
+    """Entpackt eine archivierte Billbee-Antwort (gzip-JSON) und verarbeitet sie wie process_orders."""
+    return process_orders(json.loads(gzip.decompress(payload)))
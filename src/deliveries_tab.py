@@ -1,19 +1,24 @@
 import streamlit as st
 import pandas as pd
-from src.inventory_management import load_supplier_deliveries, save_supplier_deliveries, update_supplier_delivery
+from src.inventory_management import (load_supplier_deliveries_snapshot, save_supplier_deliveries, update_supplier_delivery,
+                                      validate_delivery_import, import_supplier_deliveries)
+from src.manifest import ManifestConflict
+from src.sku_registry import normalize_sku
+from src.s3_operations import get_data_version
+from src.what_if import build_delivery_baseline, what_if
 
 def deliveries_tab():
     st.subheader("Anlieferungen")
     
     # Load existing deliveries
-    deliveries = load_supplier_deliveries()
+    deliveries, generation = load_supplier_deliveries_snapshot()
     
     if not deliveries.empty:
         # Convert Date column to datetime if it's not already
         deliveries['Date'] = pd.to_datetime(deliveries['Date'])
         
-        # Convert SKU to integer
-        deliveries['SKU'] = deliveries['SKU'].astype(int)
+        # SKUs are already normalized by the loader; the integer code is internal only
+        deliveries = deliveries.drop(columns=['SKUCode'])
         
         # Create an editable dataframe
         edited_df = st.data_editor(
@@ -28,6 +33,9 @@ def deliveries_tab():
             hide_index=True,
             num_rows="dynamic"
         )
+
+        if st.checkbox("Auswirkungen vor dem Speichern anzeigen (What-if)", value=True):
+            show_what_if(deliveries, edited_df, generation)
         
         # Always show the "Änderungen speichern" button
         if st.button("Änderungen speichern"):
@@ -36,10 +44,14 @@ def deliveries_tab():
                 edited_df = edited_df[~edited_df['Delete']]
                 edited_df = edited_df.drop(columns=['Delete'])
             
-            # Save the updated dataframe
-            save_supplier_deliveries(edited_df)
-            st.success("Änderungen wurden erfolgreich gespeichert.")
-            st.rerun()
+            # Save the updated dataframe, unless someone else saved since it was loaded
+            try:
+                save_supplier_deliveries(edited_df, expected_generation=generation)
+            except ManifestConflict:
+                st.warning("Die Anlieferungen wurden zwischenzeitlich geändert. Bitte die Änderungen auf dem neuen Stand wiederholen.")
+            else:
+                st.success("Änderungen wurden erfolgreich gespeichert.")
+                st.rerun()
     else:
         st.info("Keine Anlieferungen verfügbar.")
 
@@ -47,7 +59,7 @@ def deliveries_tab():
     st.subheader("Neue Lieferung hinzufügen")
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-        new_sku = st.number_input("SKU", min_value=1, step=1)
+        new_sku = normalize_sku(st.text_input("SKU"))
     with col2:
         new_quantity = st.number_input("Liefermenge", min_value=0, step=1)
     with col3:
@@ -55,7 +67,76 @@ def deliveries_tab():
     with col4:
         new_status = st.selectbox("Status", ["Bestellt", "Bestätigt", "Angeliefert"])
 
-    if st.button("Neue Lieferung hinzufügen"):
+    if st.button("Neue Lieferung hinzufügen") and new_sku:
         update_supplier_delivery(new_sku, new_quantity, new_date, new_status)
         st.success(f"Neue Lieferung für SKU {new_sku} wurde hinzugefügt.")
-        st.rerun()
\ No newline at end of file
+        st.rerun()
+
+    bulk_import_section()
+
+def read_order_file(uploaded):
+    if uploaded.name.lower().endswith('.xlsx'):
+        return pd.read_excel(uploaded)
+    return pd.read_csv(uploaded, sep=None, engine='python')
+
+def bulk_import_section():
+    """Import einer ganzen Bestellliste: eine Prüfung, ein Schreibvorgang."""
+    st.subheader("Bestellliste importieren")
+    st.caption("CSV oder Excel (.xlsx) mit den Spalten SKU, Liefermenge, Datum und optional Status (Standard: Bestellt). "
+               "Vorhandene Lieferungen derselben SKU am selben Datum werden ersetzt.")
+    uploaded = st.file_uploader("Bestellliste", type=['csv', 'xlsx'])
+    allow_unknown = st.checkbox("SKUs ohne Stammdaten zulassen")
+    if uploaded is None:
+        return
+
+    try:
+        orders = read_order_file(uploaded)
+        valid, errors = validate_delivery_import(orders, allow_unknown)
+    except Exception as e:
+        st.error(f"Die Datei konnte nicht gelesen werden: {str(e)}")
+        return
+
+    if not errors.empty:
+        st.error(f"{len(errors)} Zeilen sind fehlerhaft, es wird nichts importiert.")
+        st.dataframe(errors, hide_index=True)
+        return
+    st.write(f"{len(valid)} gültige Zeilen:")
+    st.dataframe(valid, hide_index=True)
+    if st.button("Bestellliste importieren"):
+        imported, _ = import_supplier_deliveries(orders, allow_unknown)
+        st.success(f"{imported} Lieferzeilen importiert.")
+        st.rerun()
+
+def get_delivery_baseline(generation):
+    """What-if-Grundlage der Sitzung; neu geladen nur bei neuen Verkaufsdaten oder gespeicherten Anlieferungen."""
+    key = (get_data_version(), generation)
+    cached = st.session_state.get('delivery_baseline')
+    if cached is None or cached[0] != key:
+        with st.spinner("Lade Verkaufsgrundlage für die What-if-Rechnung..."):
+            cached = (key, build_delivery_baseline())
+        st.session_state['delivery_baseline'] = cached
+    return cached[1]
+
+def show_what_if(deliveries, edited_df, generation):
+    """Zeigt geplante Lieferungen, Reichweite und Stock-out-Datum der bearbeiteten SKUs vor und nach der Änderung."""
+    impact = what_if(get_delivery_baseline(generation), deliveries, edited_df)
+    if impact.empty:
+        st.caption("Keine ungespeicherten Änderungen.")
+        return
+
+    st.write("Auswirkungen der ungespeicherten Änderungen:")
+    st.dataframe(impact.style.format({
+        'PlannedDeliveries': '{:.0f}',
+        'PlannedDeliveries_new': '{:.0f}',
+        'AdjustedInventoryDaysWithDeliveries': '{:.1f}',
+        'AdjustedInventoryDaysWithDeliveries_new': '{:.1f}',
+        'ExpectedStockoutDate': lambda d: d.strftime('%Y-%m-%d') if pd.notna(d) else '',
+        'ExpectedStockoutDate_new': lambda d: d.strftime('%Y-%m-%d') if pd.notna(d) else '',
+    }), hide_index=True, column_config={
+        'PlannedDeliveries': "Geplant",
+        'PlannedDeliveries_new': "Geplant (neu)",
+        'AdjustedInventoryDaysWithDeliveries': "Reichweite mit Lieferungen",
+        'AdjustedInventoryDaysWithDeliveries_new': "Reichweite mit Lieferungen (neu)",
+        'ExpectedStockoutDate': "Stock-out",
+        'ExpectedStockoutDate_new': "Stock-out (neu)",
+    })
@@ -0,0 +1,83 @@
+import streamlit as st
+import logging
+from datetime import datetime, timedelta, timezone
+from src.s3_utils import get_s3_fs
+from src.billbee_api import billbee_api
+from src.data_processor import process_orders, order_key, order_day
+from src.raw_archive import archive_raw_orders, list_archived_dates, load_raw_orders
+from src.sales_store import write_sales_batch, list_partitions, covered_dates
+from src.anomaly_detection import check_new_days
+
+logger = logging.getLogger(__name__)
+
+SYNC_WATERMARK_FILE = "last_sync_watermark.txt"
+# Ohne Wasserzeichen werden die Änderungen der letzten Tage abgeglichen
+INITIAL_SYNC_DAYS = 2
+
+def load_sync_watermark(s3, bucket_name):
+    path = f"{bucket_name}/{SYNC_WATERMARK_FILE}"
+    if not s3.exists(path):
+        return None
+    with s3.open(path, 'r') as f:
+        return datetime.fromisoformat(f.read().strip())
+
+def save_sync_watermark(s3, bucket_name, watermark):
+    # Ein einzelnes PUT ist atomar; das Wasserzeichen wird erst nach allen Partitionen geschrieben
+    with s3.open(f"{bucket_name}/{SYNC_WATERMARK_FILE}", 'w') as f:
+        f.write(watermark.isoformat())
+
+def merge_changed_orders(orders_data, changed_orders):
+    """Ersetzt bzw. ergänzt Bestellungen eines Tages anhand der Billbee-Bestell-ID.
+
+    Stornierte Bestellungen bleiben mit ihrem neuen Status erhalten und werden von
+    process_orders übersprungen.
+    """
+    merged = {order_key(order): order for order in orders_data.get('Data') or []}
+    for order in changed_orders:
+        merged[order_key(order)] = order
+    return {'Data': list(merged.values())}
+
+def sync_changed_orders():
+    """Gleicht nur die seit dem letzten Wasserzeichen geänderten Bestellungen ab.
+
+    Betroffen sind nur bereits importierte Tage, an denen geänderte Bestellungen angelegt wurden: deren
+    Rohdaten werden aktualisiert, neu verarbeitet und gesammelt geschrieben. Liefert
+    (Anzahl geänderter Bestellungen, Anzahl betroffener Tage).
+    """
+    s3 = get_s3_fs()
+    bucket_name = st.secrets['aws']['S3_BUCKET_NAME']
+
+    sync_time = datetime.now(timezone.utc).replace(microsecond=0)
+    watermark = load_sync_watermark(s3, bucket_name) or sync_time - timedelta(days=INITIAL_SYNC_DAYS)
+
+    changed = billbee_api.get_orders_modified_since(watermark, sync_time).get('Data') or []
+    changes_by_day = {}
+    for order in changed:
+        day = order_day(order)
+        if day is None:
+            logger.warning(f"Bestellung {order_key(order)} ohne Bestelldatum wird übersprungen.")
+            continue
+        changes_by_day.setdefault(day, []).append(order)
+
+    # Noch nicht importierte Tage übernimmt der reguläre Import vollständig
+    imported = covered_dates(list_partitions(s3, bucket_name))
+    archived = list_archived_dates(s3, bucket_name)
+    frames = {}
+    for day, day_changes in sorted(changes_by_day.items()):
+        if day not in imported:
+            continue
+        if day in archived:
+            orders_data = load_raw_orders(day, s3, bucket_name)
+        else:
+            # Für Tage ohne Rohdatenarchiv wird der Tag einmal vollständig geholt
+            orders_data = billbee_api.get_orders(day, day + timedelta(days=1), raise_errors=True)
+        orders_data = merge_changed_orders(orders_data, day_changes)
+        archive_raw_orders(day, orders_data, s3, bucket_name)
+        frames[day] = process_orders(orders_data)
+
+    if frames:
+        write_sales_batch(frames, s3, bucket_name)
+        check_new_days(frames, s3, bucket_name)
+    save_sync_watermark(s3, bucket_name, sync_time)
+    logger.info(f"{len(changed)} geänderte Bestellungen an {len(frames)} Tagen abgeglichen.")
+    return len(changed), len(frames)
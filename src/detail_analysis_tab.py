@@ -1,19 +1,61 @@
 import streamlit as st
-import plotly.express as px
-from datetime import datetime, timedelta
-from src.s3_operations import get_all_data_since_date, get_summary_data
-from src.trend_analysis import analyze_all_skus
+from datetime import date, datetime, timedelta
+from src.s3_operations import get_sales_data, get_summary_data, get_data_version
+from src.parallel_analysis import analyze_all_skus_with_pool
+from src.single_flight import coalesce, freeze
+from src.result_cache import cached
+from src.forecasting import load_or_create_forecasts
+from src.trend_analysis import analysis_from_tables
+from src.artifacts import artifact_tag, read_artifact
+from src.sales_snapshot import load_sales_snapshot
 from src.sku_names import SKU_NAMES
 import pandas as pd
 
-def detail_analysis_tab():
+# Beginn des Analysezeitraums der Detailanalyse
+DETAIL_START_DATE = date(2024, 2, 1)
+
+@cached(lambda start_date, platforms=None: (start_date, freeze(platforms)), get_data_version, copy=None)
+@coalesce(lambda start_date, platforms=None: (start_date, freeze(platforms)), copy=None)
+def load_detail_analysis(start_date, platforms=None):
+    """Prognosen und SKU-Analysen ab start_date; None, wenn keine Verkäufe vorliegen.
+
+    Ohne Plattformfilter stammen sie aus den vorberechneten Artefakten, sonst bzw. bei
+    veraltetem Artefakt wird live gerechnet. Gleichzeitig geöffnete Sitzungen teilen sich
+    eine Berechnung, das Ergebnis bleibt bis zur nächsten Datenversion im Ergebnis-Cache.
+    Alle Sitzungen erhalten dasselbe Ergebnis ohne Kopie, es darf nicht verändert werden.
+    """
+    if not platforms:
+        tag = artifact_tag(get_data_version())
+        history = read_artifact(analysis_artifact(start_date, 'history'), tag)
+        forecasts = read_artifact(analysis_artifact(start_date, 'forecast'), tag)
+        if history is not None and forecasts is not None:
+            return analysis_from_tables(history, forecasts)
+    return compute_detail_analysis(start_date, platforms)
+
+def analysis_artifact(start_date, table):
+    return f"analysis-{start_date:%Y%m%d}-{table}"
+
+def compute_detail_analysis(start_date, platforms=None):
+    """Berechnet Prognosen und SKU-Analysen ab start_date aus den Verkaufsdaten.
+
+    Ohne Plattformfilter dienen die Tageszeilen des lokalen Snapshots als Eingabe.
+    """
+    snapshot = load_sales_snapshot() if not platforms else None
+    if snapshot is not None:
+        all_data = snapshot.daily_rows(start_date)[['Date', 'SKU', 'Quantity']]
+    else:
+        all_data = get_sales_data(start_date, platforms=platforms, columns=['Date', 'SKU', 'Quantity'])
+    if all_data.empty:
+        return None
+    forecasts = load_or_create_forecasts(all_data, start_date, platforms=platforms)
+    return analyze_all_skus_with_pool(all_data, forecasts)
+
+def detail_analysis_tab(platforms=None):
     st.subheader("Detailanalyse und Prognose")
 
-    start_date = datetime(2024, 2, 1).date()
-    all_data = get_all_data_since_date(start_date)
+    analysis_results = load_detail_analysis(DETAIL_START_DATE, platforms)
 
-    if not all_data.empty:
-        analysis_results = analyze_all_skus(all_data)
+    if analysis_results is not None:
         summary_data = get_summary_data()
         
         if summary_data is not None and not summary_data.empty:
@@ -49,14 +91,15 @@ def detail_analysis_tab():
         st.info("Keine Daten für die Detailanalyse verfügbar.")
 
 def display_all_products_analysis(analysis_results):
+    import plotly.express as px
+
     st.write("Analyse für alle Produkte")
 
     # Combine data from all SKUs
     combined_data = pd.DataFrame()
     for sku, result in analysis_results.items():
         if 'smoothed_data' in result and not result['smoothed_data'].empty:
-            result['smoothed_data']['SKU'] = sku
-            combined_data = pd.concat([combined_data, result['smoothed_data']])
+            combined_data = pd.concat([combined_data, result['smoothed_data'].assign(SKU=sku)])
 
     if not combined_data.empty:
         # Calculate and display total sales for the last 12 months
@@ -83,19 +126,21 @@ def display_all_products_analysis(analysis_results):
         st.warning("Nicht genügend Daten für die Erstellung eines Diagramms.")
 
 def display_single_product_analysis(selected_sku, sku_result):
+    import plotly.express as px
+
     st.write(f"Trend für SKU {selected_sku}: {sku_result['overall_trend']:.4f} Einheiten pro Tag")
 
     # Calculate total sales for the last 12 months
     today = datetime.now().date()
     one_year_ago = today - timedelta(days=365)
-    sku_result['smoothed_data']['Date'] = pd.to_datetime(sku_result['smoothed_data']['Date']).dt.date
-    last_12_months_data = sku_result['smoothed_data'][sku_result['smoothed_data']['Date'] > one_year_ago]
+    smoothed_data = sku_result['smoothed_data'].assign(Date=pd.to_datetime(sku_result['smoothed_data']['Date']).dt.date)
+    last_12_months_data = smoothed_data[smoothed_data['Date'] > one_year_ago]
     total_last_12_months = last_12_months_data['Quantity'].sum()
 
     st.write(f"Gesamtverkaufsmenge der letzten 12 Monate: {int(total_last_12_months)}")
 
-    if 'smoothed_data' in sku_result and not sku_result['smoothed_data'].empty:
-        fig = px.line(sku_result['smoothed_data'], x='Date', y='SmoothQuantity', title=f'Historische Daten und Prognose für SKU {selected_sku}')
+    if not smoothed_data.empty:
+        fig = px.line(smoothed_data, x='Date', y='SmoothQuantity', title=f'Historische Daten und Prognose für SKU {selected_sku}')
         
         if 'forecast' in sku_result and not sku_result['forecast'].empty:
             fig.add_scatter(x=sku_result['forecast']['Date'], y=sku_result['forecast']['Forecast'], mode='lines', name='Prognose')
@@ -108,7 +153,7 @@ def display_single_product_analysis(selected_sku, sku_result):
     else:
         st.warning("Nicht genügend Daten für die Erstellung eines Diagramms.")
 
-    monthly_data = sku_result['smoothed_data'].copy()
+    monthly_data = smoothed_data.copy()
     monthly_data['Date'] = pd.to_datetime(monthly_data['Date'])
     monthly_data = monthly_data.set_index('Date').resample('ME')['Quantity'].sum().reset_index()
     monthly_data['Month'] = monthly_data['Date'].dt.strftime('%Y-%m')
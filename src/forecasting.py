@@ -0,0 +1,172 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import itertools
+import hashlib
+import logging
+from src.s3_utils import get_s3_fs
+from src.s3_operations import get_data_version
+from src.daily_matrix import build_daily_matrix
+from src.trend_analysis import create_forecast
+
+logger = logging.getLogger(__name__)
+
+FORECAST_PREFIX = "forecasts"
+SEASON_LENGTH = 7
+MIN_HISTORY_DAYS = 2 * SEASON_LENGTH
+
+# Parametergitter für die Modellauswahl pro SKU (alpha, beta, gamma, phi)
+PARAMETER_GRID = {
+    'alpha': (0.05, 0.15, 0.3, 0.5),
+    'beta': (0.02, 0.1),
+    'gamma': (0.05, 0.2),
+    'phi': (0.8, 0.95),
+}
+BAND_QUANTILES = (0.025, 0.975)
+
+def _run_smoothing(values, alpha, beta, gamma, phi, keep_errors=False):
+    """Führt die Glättung für alle SKUs (und optional alle Gitterpunkte) gleichzeitig aus.
+
+    values hat die Form (SKUs, Tage); die Parameter werden gegen (..., SKUs) gebroadcastet.
+    """
+    first_week = values[:, :SEASON_LENGTH]
+    second_week = values[:, SEASON_LENGTH:2 * SEASON_LENGTH]
+    shape = np.broadcast_shapes(np.shape(alpha), np.shape(beta), np.shape(gamma), np.shape(phi), values.shape[:1])
+
+    level = np.broadcast_to(first_week.mean(axis=1), shape).copy()
+    trend = np.broadcast_to((second_week.mean(axis=1) - first_week.mean(axis=1)) / SEASON_LENGTH, shape).copy()
+    season = np.broadcast_to(first_week - first_week.mean(axis=1)[:, None], shape + (SEASON_LENGTH,)).copy()
+
+    sse = np.zeros(shape)
+    errors = np.zeros(shape + (values.shape[1],)) if keep_errors else None
+
+    for t in range(SEASON_LENGTH, values.shape[1]):
+        position = t % SEASON_LENGTH
+        error = values[:, t] - (level + phi * trend + season[..., position])
+        if t >= MIN_HISTORY_DAYS:
+            sse += error ** 2
+            if keep_errors:
+                errors[..., t] = error
+        level = level + phi * trend + alpha * error
+        trend = phi * trend + alpha * beta * error
+        season[..., position] += gamma * error
+
+    return level, trend, season, sse, errors
+
+def fit_exponential_smoothing(values):
+    """Wählt pro SKU die Parameter mit dem kleinsten Ein-Schritt-Fehler und liefert den Endzustand."""
+    grid = np.array(list(itertools.product(*PARAMETER_GRID.values())))
+    alpha, beta, gamma, phi = (grid[:, i][:, None] for i in range(4))
+
+    _, _, _, sse, _ = _run_smoothing(values, alpha, beta, gamma, phi)
+    best = grid[np.argmin(sse, axis=0)]
+    params = {name: best[:, i] for i, name in enumerate(PARAMETER_GRID)}
+
+    level, trend, season, _, errors = _run_smoothing(values, keep_errors=True, **params)
+    return {
+        'params': params,
+        'level': level,
+        'trend': trend,
+        'season': season,
+        'residuals': errors[:, MIN_HISTORY_DAYS:],
+    }
+
+def forecast_exponential_smoothing(values, days=60):
+    """Punktprognose und empirische Quantilbänder für alle SKUs, Form (SKUs, days)."""
+    model = fit_exponential_smoothing(values)
+    alpha, beta, phi = model['params']['alpha'], model['params']['beta'], model['params']['phi']
+
+    horizon = np.arange(1, days + 1)
+    damping = np.cumsum(phi[:, None] ** horizon[None, :], axis=1)
+    positions = (values.shape[1] + horizon - 1) % SEASON_LENGTH
+    point = model['level'][:, None] + damping * model['trend'][:, None] + model['season'][:, positions]
+
+    # Streuung wächst mit dem Horizont wie bei der gedämpften Trendglättung
+    step_weights = (alpha[:, None] * (1 + beta[:, None] * damping[:, :-1])) ** 2
+    spread = np.sqrt(1 + np.concatenate([np.zeros((len(alpha), 1)), np.cumsum(step_weights, axis=1)], axis=1))
+    lower_q, upper_q = np.quantile(model['residuals'], BAND_QUANTILES, axis=1)
+
+    forecast = np.clip(point, 0, None)
+    lower = np.clip(point + lower_q[:, None] * spread, 0, None)
+    upper = np.clip(point + upper_q[:, None] * spread, 0, None)
+    return forecast, lower, upper
+
+def create_forecasts(all_data, days=60):
+    """Erstellt die Prognosen aller SKUs aus den Verkaufsdaten als langes DataFrame."""
+    matrix = build_daily_matrix(all_data)
+    columns = ['SKU', 'Date', 'Forecast', 'LowerCI', 'UpperCI']
+    if matrix.values.shape[1] < MIN_HISTORY_DAYS + 1 or len(matrix.skus) == 0:
+        return pd.DataFrame(columns=columns)
+
+    forecast, lower, upper = forecast_exponential_smoothing(matrix.values, days)
+    future_dates = pd.date_range(start=matrix.dates[-1] + pd.Timedelta(days=1), periods=days)
+    return pd.DataFrame({
+        'SKU': np.repeat(matrix.skus.to_numpy(), days),
+        'Date': np.tile(future_dates, len(matrix.skus)),
+        'Forecast': forecast.ravel(),
+        'LowerCI': lower.ravel(),
+        'UpperCI': upper.ravel(),
+    })[columns]
+
+def _forecast_path(bucket_name, version, start_date, days, platforms=None):
+    # Prognosen für eine Plattformauswahl werden getrennt von denen aller Plattformen abgelegt
+    selection = "" if not platforms else "_" + hashlib.sha1("|".join(sorted(platforms)).encode('utf-8')).hexdigest()[:10]
+    return f"{bucket_name}/{FORECAST_PREFIX}/forecast_{version}_{pd.Timestamp(start_date):%Y%m%d}_{days}{selection}.csv"
+
+def load_or_create_forecasts(all_data, start_date, days=60, platforms=None):
+    """Liest die gespeicherten Prognosen zur aktuellen Datenversion (und Plattformauswahl) oder erstellt und speichert sie."""
+    version = get_data_version()
+    if version is None:
+        return create_forecasts(all_data, days)
+
+    try:
+        s3 = get_s3_fs()
+        bucket_name = st.secrets['aws']['S3_BUCKET_NAME']
+        full_path = _forecast_path(bucket_name, version, start_date, days, platforms)
+
+        if s3.exists(full_path):
+            with s3.open(full_path, 'r') as f:
+                forecasts = pd.read_csv(f, parse_dates=['Date'], dtype={'SKU': str})
+            return forecasts
+
+        forecasts = create_forecasts(all_data, days)
+        with s3.open(full_path, 'w') as f:
+            forecasts.to_csv(f, index=False)
+        logger.info(f"Prognosen für Datenversion {version} gespeichert.")
+        return forecasts
+    except Exception as e:
+        logger.error(f"Fehler beim Laden der Prognosen: {str(e)}")
+        return create_forecasts(all_data, days)
+
+def backtest_forecasts(all_data, horizon=28):
+    """Vergleicht die Glättungsprognose mit create_forecast auf den letzten horizon Tagen."""
+    matrix = build_daily_matrix(all_data)
+    if matrix.values.shape[1] < MIN_HISTORY_DAYS + horizon + 1:
+        return pd.DataFrame(columns=['SKU', 'MAE_Baseline', 'MAE_ExpSmoothing'])
+
+    train, actual = matrix.values[:, :-horizon], matrix.values[:, -horizon:]
+    smoothing_forecast, _, _ = forecast_exponential_smoothing(train, horizon)
+    smoothing_mae = np.abs(smoothing_forecast - actual).mean(axis=1)
+
+    baseline_mae = np.full(len(matrix.skus), np.nan)
+    train_dates = matrix.dates[:-horizon]
+    for i, sku in enumerate(matrix.skus):
+        sold = np.flatnonzero(train[i])
+        if len(sold) == 0:
+            continue
+        sku_data = pd.DataFrame({
+            'Date': train_dates[sold[0]:],
+            'SKU': sku,
+            'Quantity': train[i, sold[0]:],
+        })
+        try:
+            baseline = create_forecast(sku_data, days=horizon)
+            baseline_mae[i] = np.abs(baseline['Forecast'].to_numpy() - actual[i]).mean()
+        except Exception as e:
+            logger.error(f"Fehler im Backtest für SKU {sku}: {str(e)}")
+
+    return pd.DataFrame({
+        'SKU': matrix.skus,
+        'MAE_Baseline': baseline_mae,
+        'MAE_ExpSmoothing': smoothing_mae,
+    })
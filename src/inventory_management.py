@@ -1,90 +1,206 @@
 import pandas as pd
+import numpy as np
 import streamlit as st
 from src.s3_utils import get_s3_fs
+from src.manifest import read_manifest, commit_manifest, new_object_path
+from src.sku_registry import add_sku_codes, normalize_sku, sku_registry
 from datetime import datetime
 import logging
 
 # Fügen Sie diese Zeile am Anfang der Datei hinzu
 logger = logging.getLogger(__name__)
 
-def save_initial_inventory(df):
+# Anfangsbestand und Anlieferungen liegen als unveränderliche CSV-Objekte unter inventory/<name>/,
+# das gleichnamige Manifest verweist auf die gültige Version. Vor dem ersten Schreiben
+# gilt weiterhin die frühere CSV im Bucket-Stamm.
+INVENTORY_PREFIX = "inventory"
+INVENTORY_FILES = {
+    'initial_inventory': "initial_inventory_original_sku.csv",
+    'supplier_deliveries': "supplier_deliveries_original_sku.csv",
+}
+DELIVERY_STATUSES = ["Bestellt", "Bestätigt", "Angeliefert"]
+# Deutsche Spaltenköpfe in Bestelllisten
+IMPORT_COLUMN_NAMES = {'Artikelnummer': 'SKU', 'Liefermenge': 'SupplierDelivery', 'Menge': 'SupplierDelivery',
+                       'Datum': 'Date', 'Lieferdatum': 'Date'}
+
+def _read_inventory_table(s3, bucket_name, name, manifest):
+    full_path = manifest['objects'].get('data', f"{bucket_name}/{INVENTORY_FILES[name]}")
+    if not s3.exists(full_path):
+        return None
+    with s3.open(full_path, 'r') as f:
+        df = pd.read_csv(f)
+    df['Date'] = pd.to_datetime(df['Date']).dt.date
+    return add_sku_codes(df)
+
+def _load_inventory_snapshot(name):
     s3 = get_s3_fs()
     bucket_name = st.secrets['aws']['S3_BUCKET_NAME']
-    filename = "initial_inventory_original_sku.csv"
-    full_path = f"{bucket_name}/{filename}"
-    
-    with s3.open(full_path, 'w') as f:
-        df.to_csv(f, index=False)
+    manifest = read_manifest(name, s3, bucket_name)
+    return _read_inventory_table(s3, bucket_name, name, manifest), manifest['generation']
 
-def load_initial_inventory():
+def get_inventory_version():
+    """Kennung des Stands von Anfangsbestand und Anlieferungen (ihre Manifest-Generationen)."""
     try:
         s3 = get_s3_fs()
         bucket_name = st.secrets['aws']['S3_BUCKET_NAME']
-        filename = "initial_inventory_original_sku.csv"
-        full_path = f"{bucket_name}/{filename}"
-        
-        if s3.exists(full_path):
-            with s3.open(full_path, 'r') as f:
-                df = pd.read_csv(f)
-            df['Date'] = pd.to_datetime(df['Date']).dt.date
-            df['SKU'] = df['SKU'].apply(lambda x: str(int(float(x))))
-            return df[['SKU', 'InitialQuantity', 'Date']]
-        else:
-            return pd.DataFrame(columns=['SKU', 'InitialQuantity', 'Date'])
+        return "-".join(f"i{read_manifest(name, s3, bucket_name)['generation']}" for name in INVENTORY_FILES)
     except Exception as e:
-        st.error(f"Fehler beim Laden des Anfangsbestands: {str(e)}")
-        return pd.DataFrame(columns=['SKU', 'InitialQuantity', 'Date'])
+        logger.error(f"Fehler beim Ermitteln der Bestandsversion: {str(e)}")
+        return None
 
-def update_initial_inventory(sku, quantity, date):
-    inventory_df = load_initial_inventory()
-    
-    if sku in inventory_df['SKU'].values:
-        inventory_df.loc[inventory_df['SKU'] == sku, ['InitialQuantity', 'Date']] = [quantity, date]
-    else:
-        new_row = pd.DataFrame({'SKU': [sku], 'InitialQuantity': [quantity], 'Date': [date]})
-        inventory_df = pd.concat([inventory_df, new_row], ignore_index=True)
-    
-    save_initial_inventory(inventory_df)
-    return inventory_df
-
-def save_supplier_deliveries(df):
+def _commit_inventory_table(name, change, expected_generation=None):
+    """Schreibt change(aktueller Stand) als neue Version und übernimmt sie per Manifest-Commit.
+
+    Ohne expected_generation wird change bei einem gleichzeitigen Schreiber auf dessen
+    Stand erneut angewendet, sonst schlägt der Commit mit ManifestConflict fehl.
+    """
     s3 = get_s3_fs()
     bucket_name = st.secrets['aws']['S3_BUCKET_NAME']
-    filename = "supplier_deliveries_original_sku.csv"
-    full_path = f"{bucket_name}/{filename}"
-    
-    with s3.open(full_path, 'w') as f:
-        df.to_csv(f, index=False)
 
-def load_supplier_deliveries():
+    def update(manifest):
+        df = change(_read_inventory_table(s3, bucket_name, name, manifest))
+        full_path = new_object_path(bucket_name, f"{INVENTORY_PREFIX}/{name}", name, '.csv')
+        with s3.open(full_path, 'w') as f:
+            df.drop(columns=['SKUCode'], errors='ignore').to_csv(f, index=False)
+        return {'data': full_path}
+
+    commit_manifest(name, update, s3, bucket_name, expected_generation)
+
+def save_initial_inventory(df, expected_generation=None):
+    _commit_inventory_table('initial_inventory', lambda current: df, expected_generation)
+
+def load_initial_inventory_snapshot():
+    """Anfangsbestand zusammen mit der Manifest-Generation, auf der er beruht."""
     try:
-        s3 = get_s3_fs()
-        bucket_name = st.secrets['aws']['S3_BUCKET_NAME']
-        filename = "supplier_deliveries_original_sku.csv"
-        full_path = f"{bucket_name}/{filename}"
-        
-        if s3.exists(full_path):
-            with s3.open(full_path, 'r') as f:
-                df = pd.read_csv(f)
-            df['Date'] = pd.to_datetime(df['Date']).dt.date
-            df['SKU'] = df['SKU'].astype(str)
-            return df
+        df, generation = _load_inventory_snapshot('initial_inventory')
+        if df is not None:
+            return df[['SKU', 'InitialQuantity', 'Date', 'SKUCode']], generation
+        return pd.DataFrame(columns=['SKU', 'InitialQuantity', 'Date', 'SKUCode']), generation
+    except Exception as e:
+        st.error(f"Fehler beim Laden des Anfangsbestands: {str(e)}")
+        return pd.DataFrame(columns=['SKU', 'InitialQuantity', 'Date', 'SKUCode']), None
+
+def load_initial_inventory():
+    return load_initial_inventory_snapshot()[0]
+
+def update_initial_inventory(sku, quantity, date):
+    sku = normalize_sku(sku)
+    updated = {}
+
+    def change(inventory_df):
+        if inventory_df is None:
+            inventory_df = pd.DataFrame(columns=['SKU', 'InitialQuantity', 'Date'])
+        if sku in inventory_df['SKU'].values:
+            inventory_df.loc[inventory_df['SKU'] == sku, ['InitialQuantity', 'Date']] = [quantity, date]
         else:
-            return pd.DataFrame(columns=['SKU', 'SupplierDelivery', 'Date', 'Status'])
+            new_row = pd.DataFrame({'SKU': [sku], 'InitialQuantity': [quantity], 'Date': [date]})
+            inventory_df = pd.concat([inventory_df, new_row], ignore_index=True)
+        updated['df'] = inventory_df
+        return inventory_df
+
+    _commit_inventory_table('initial_inventory', change)
+    return updated['df']
+
+def save_supplier_deliveries(df, expected_generation=None):
+    _commit_inventory_table('supplier_deliveries', lambda current: df, expected_generation)
+
+def load_supplier_deliveries_snapshot():
+    """Anlieferungen zusammen mit der Manifest-Generation, auf der sie beruhen."""
+    try:
+        df, generation = _load_inventory_snapshot('supplier_deliveries')
+        if df is not None:
+            return df, generation
+        return pd.DataFrame(columns=['SKU', 'SupplierDelivery', 'Date', 'Status', 'SKUCode']), generation
     except Exception as e:
         logger.error(f"Fehler beim Laden der Lieferantenanlieferungen: {str(e)}")
-        return pd.DataFrame(columns=['SKU', 'SupplierDelivery', 'Date', 'Status'])
+        return pd.DataFrame(columns=['SKU', 'SupplierDelivery', 'Date', 'Status', 'SKUCode']), None
+
+def load_supplier_deliveries():
+    return load_supplier_deliveries_snapshot()[0]
+
+def _parse_import_dates(values):
+    # ISO-Daten und Excel-Datumswerte, sonst deutsches Format (TT.MM.JJJJ)
+    dates = pd.to_datetime(values, errors='coerce', format='ISO8601')
+    german = pd.to_datetime(values.astype(str).str.strip(), errors='coerce', format='%d.%m.%Y')
+    return dates.fillna(german)
+
+def validate_delivery_import(df, allow_unknown_skus=False):
+    """Prüft eine Bestellliste (SKU, Liefermenge, Datum, Status) in einem Durchgang.
+
+    SKUs werden normalisiert und gegen die SKU-Registry geprüft, Mengen müssen positive
+    ganze Zahlen, Daten gültig und Status bekannt sein; ohne Status gilt 'Bestellt'.
+    Eine (SKU, Datum)-Kombination darf nur einmal vorkommen. Liefert (gültige Zeilen,
+    fehlerhafte Zeilen mit Spalte Error und der Zeilennummer der Datei).
+    """
+    df = df.rename(columns=IMPORT_COLUMN_NAMES)
+    missing = [column for column in ['SKU', 'SupplierDelivery', 'Date'] if column not in df.columns]
+    if missing:
+        raise ValueError(f"Spalten fehlen: {', '.join(missing)}")
+    rows = pd.DataFrame({'Row': np.arange(len(df)) + 2})
+    codes = sku_registry.encode(df['SKU'])
+    rows['SKU'] = sku_registry.decode(codes)
+    quantity = pd.to_numeric(df['SupplierDelivery'], errors='coerce').to_numpy()
+    rows['SupplierDelivery'] = quantity
+    rows['Date'] = _parse_import_dates(df['Date']).dt.date.to_numpy()
+    status = df['Status'].fillna('Bestellt').astype(str).str.strip() if 'Status' in df.columns else 'Bestellt'
+    rows['Status'] = status.to_numpy() if isinstance(status, pd.Series) else status
+
+    checks = [
+        (codes < 0, "SKU fehlt"),
+        ((codes >= 0) & pd.isna(sku_registry.names(codes)) & (not allow_unknown_skus), "SKU unbekannt"),
+        (~(quantity > 0) | (np.mod(np.nan_to_num(quantity), 1) != 0), "Menge muss eine positive ganze Zahl sein"),
+        (pd.isna(rows['Date']).to_numpy(), "Datum ungültig"),
+        (~rows['Status'].isin(DELIVERY_STATUSES).to_numpy(), "Status unbekannt"),
+        (rows.duplicated(['SKU', 'Date'], keep=False).to_numpy() & (codes >= 0), "SKU und Datum mehrfach"),
+    ]
+    errors = np.full(len(rows), '', dtype=object)
+    for failed, message in checks:
+        errors = np.where(failed, np.where(errors == '', message, errors + '; ' + message), errors)
+    rows['Error'] = errors
+
+    valid = rows[rows['Error'] == ''][['SKU', 'SupplierDelivery', 'Date', 'Status']]
+    valid = valid.astype({'SupplierDelivery': 'int64'})
+    return valid.reset_index(drop=True), rows[rows['Error'] != ''].reset_index(drop=True)
+
+def import_supplier_deliveries(df, allow_unknown_skus=False):
+    """Übernimmt eine ganze Bestellliste mit einem Schreibvorgang.
+
+    Gültige Zeilen ersetzen vorhandene Lieferungen derselben SKU am selben Datum oder
+    werden ergänzt (ein Merge, ein Manifest-Commit). Liefert (Anzahl übernommener
+    Zeilen, fehlerhafte Zeilen); bei Fehlern wird nichts geschrieben.
+    """
+    valid, errors = validate_delivery_import(df, allow_unknown_skus)
+    if not errors.empty or valid.empty:
+        return 0, errors
+
+    def change(deliveries_df):
+        if deliveries_df is None:
+            deliveries_df = pd.DataFrame(columns=['SKU', 'SupplierDelivery', 'Date', 'Status'])
+        deliveries_df = deliveries_df.drop(columns=['SKUCode'], errors='ignore')
+        existing = pd.MultiIndex.from_frame(deliveries_df[['SKU', 'Date']].astype({'SKU': str}))
+        replaced = existing.isin(pd.MultiIndex.from_frame(valid[['SKU', 'Date']]))
+        return pd.concat([deliveries_df[~replaced], valid], ignore_index=True)
+
+    _commit_inventory_table('supplier_deliveries', change)
+    logger.info(f"{len(valid)} Lieferzeilen importiert.")
+    return len(valid), errors
 
 def update_supplier_delivery(sku, quantity, date, status):
-    deliveries_df = load_supplier_deliveries()
-    
-    mask = (deliveries_df['SKU'] == sku) & (deliveries_df['Date'] == date)
-    if mask.any():
-        deliveries_df.loc[mask, 'SupplierDelivery'] = quantity
-        deliveries_df.loc[mask, 'Status'] = status
-    else:
-        new_row = pd.DataFrame({'SKU': [sku], 'SupplierDelivery': [quantity], 'Date': [date], 'Status': [status]})
-        deliveries_df = pd.concat([deliveries_df, new_row], ignore_index=True)
-    
-    save_supplier_deliveries(deliveries_df)
-    return deliveries_df
\ No newline at end of file
+    sku = normalize_sku(sku)
+    updated = {}
+
+    def change(deliveries_df):
+        if deliveries_df is None:
+            deliveries_df = pd.DataFrame(columns=['SKU', 'SupplierDelivery', 'Date', 'Status'])
+        mask = (deliveries_df['SKU'] == sku) & (deliveries_df['Date'] == date)
+        if mask.any():
+            deliveries_df.loc[mask, 'SupplierDelivery'] = quantity
+            deliveries_df.loc[mask, 'Status'] = status
+        else:
+            new_row = pd.DataFrame({'SKU': [sku], 'SupplierDelivery': [quantity], 'Date': [date], 'Status': [status]})
+            deliveries_df = pd.concat([deliveries_df, new_row], ignore_index=True)
+        updated['df'] = deliveries_df
+        return deliveries_df
+
+    _commit_inventory_table('supplier_deliveries', change)
+    return updated['df']
\ No newline at end of file
@@ -0,0 +1,96 @@
+import pandas as pd
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+N_PATHS = 2000
+PATH_CHUNK = 250
+HORIZON_DAYS = 60
+HISTORY_DAYS = 90
+STOCKOUT_HORIZONS = (14, 30, 60)
+LEAD_TIME_DAYS = 14
+SERVICE_LEVEL = 0.95
+PLANNED_STATUSES = ['Bestellt', 'Bestätigt']
+
+def delivery_schedule(supplier_deliveries, skus, start_date, horizon=HORIZON_DAYS):
+    """Verteilt die geplanten Lieferungen auf eine Matrix (SKUs, Tage) ab start_date.
+
+    Überfällige Lieferungen werden am ersten Tag eingebucht, spätere als horizon ignoriert.
+    """
+    schedule = np.zeros((len(skus), horizon), dtype='float32')
+    if supplier_deliveries.empty:
+        return schedule
+
+    planned = supplier_deliveries[supplier_deliveries['Status'].isin(PLANNED_STATUSES)]
+    rows = pd.Index(skus).get_indexer(planned['SKU'].astype(str))
+    days = (pd.to_datetime(planned['Date'], errors='coerce') - pd.Timestamp(start_date)).dt.days.to_numpy(dtype='float64')
+    quantities = pd.to_numeric(planned['SupplierDelivery'], errors='coerce').fillna(0).to_numpy()
+
+    # Lieferungen ohne Datum lassen sich keinem Tag zuordnen
+    valid = (rows >= 0) & ~np.isnan(days) & (days < horizon)
+    days = np.clip(days[valid], 0, None).astype(np.int64)
+    np.add.at(schedule, (rows[valid], days), quantities[valid])
+    return schedule
+
+def simulate_stockouts(history, stock, deliveries, n_paths=N_PATHS, lead_time=LEAD_TIME_DAYS,
+                       service_level=SERVICE_LEVEL, seed=None):
+    """Simuliert Nachfragepfade für alle SKUs gleichzeitig.
+
+    history: (SKUs, Tage) historische Tagesverkäufe, aus denen Tage gezogen werden.
+    stock: (SKUs,) aktueller Bestand, deliveries: (SKUs, horizon) geplante Zugänge.
+    Liefert die Stock-out-Wahrscheinlichkeit je Tag (SKUs, horizon), den Median des
+    Stock-out-Tages (NaN, wenn in weniger als der Hälfte der Pfade) und den Meldebestand.
+    """
+    rng = np.random.default_rng(seed)
+    n_skus, horizon = deliveries.shape
+    history = np.asarray(history, dtype='float32')
+    flat_history = history.ravel()
+    row_offset = (np.arange(n_skus, dtype=np.int64) * history.shape[1])[None, :, None]
+    supply = np.asarray(stock, dtype='float32')[:, None] + np.cumsum(deliveries, axis=1)
+
+    sku_rows = np.arange(n_skus)[None, :]
+    stockout_counts = np.zeros(n_skus * (horizon + 1), dtype=np.int64)
+    stockout_days = []
+    lead_time_demand = []
+
+    for start in range(0, n_paths, PATH_CHUNK):
+        size = min(PATH_CHUNK, n_paths - start)
+        picks = rng.integers(0, history.shape[1], size=(size, n_skus, horizon), dtype=np.int32)
+        demand = np.cumsum(flat_history[row_offset + picks], axis=2)
+
+        out = (supply[None, :, :] - demand) <= 0
+        first_out = out.argmax(axis=2)
+        first_out = np.where(out[np.arange(size)[:, None], sku_rows, first_out], first_out, horizon)
+        stockout_counts += np.bincount((sku_rows * (horizon + 1) + first_out).ravel(),
+                                       minlength=n_skus * (horizon + 1))
+        stockout_days.append(first_out)
+        lead_time_demand.append(demand[:, :, min(lead_time, horizon) - 1])
+
+    # Ein einmal eingetretener Stock-out zählt für alle späteren Horizonte
+    stockout_probability = np.cumsum(stockout_counts.reshape(n_skus, horizon + 1)[:, :horizon], axis=1) / n_paths
+
+    stockout_days = np.concatenate(stockout_days)
+    median_day = np.median(stockout_days, axis=0)
+    median_day = np.where(median_day < horizon, median_day, np.nan)
+    reorder_point = np.quantile(np.concatenate(lead_time_demand), service_level, axis=0)
+
+    return stockout_probability, median_day, reorder_point
+
+def stockout_summary(matrix, stock, supplier_deliveries, start_date, history_days=HISTORY_DAYS,
+                     horizon=HORIZON_DAYS, seed=None):
+    """Erstellt die Simulationskennzahlen je SKU als DataFrame."""
+    columns = ['SKU'] + [f'StockoutProb{h}d' for h in STOCKOUT_HORIZONS] + ['ExpectedStockoutDate', 'ReorderPoint']
+    if len(matrix.skus) == 0 or matrix.values.shape[1] == 0:
+        return pd.DataFrame(columns=columns)
+
+    history = matrix.values[:, -history_days:]
+    deliveries = delivery_schedule(supplier_deliveries, matrix.skus, start_date, horizon)
+    probabilities, median_day, reorder_point = simulate_stockouts(history, stock, deliveries, seed=seed)
+
+    result = pd.DataFrame({'SKU': matrix.skus})
+    for h in STOCKOUT_HORIZONS:
+        result[f'StockoutProb{h}d'] = probabilities[:, min(h, horizon) - 1]
+    result['ExpectedStockoutDate'] = pd.Timestamp(start_date) + pd.to_timedelta(median_day, unit='D')
+    result['ReorderPoint'] = np.ceil(reorder_point)
+    return result[columns]
@@ -1,20 +1,13 @@
 import streamlit as st
-import plotly.graph_objects as go
-import plotly.express as px
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from src.s3_operations import get_all_data_since_date
-from src.sku_names import SKU_NAMES
+from src.s3_operations import get_monthly_sales
+from src.sku_hierarchy import SKU_LEVEL
 
-def long_term_sales_tab():
+def long_term_sales_tab(level=SKU_LEVEL):
     st.header("Langfristige Verkaufsanalyse")
 
-    # Lade alle Daten
-    start_date = datetime(2024, 1, 1)  # You might want to make this dynamic
-    all_data = get_all_data_since_date(start_date)
-    all_data['SKU'] = all_data['SKU'].astype(str)
-
     # Zeitraumauswahl
     time_period = st.selectbox("Zeitraum auswählen", ["Jahr", "Letzte 12 Monate"])
     
@@ -25,22 +18,21 @@ def long_term_sales_tab():
         end_date = datetime(selected_year, 12, 31)
     else:  # Letzte 12 Monate
         end_date = datetime.now().replace(day=1) - timedelta(days=1)  # Letzter Tag des Vormonats
-        start_date = end_date - timedelta(days=365)
+        start_date = (end_date.replace(day=1) - pd.DateOffset(months=11)).to_pydatetime()  # Erster Tag, zwölf volle Monate
     
-    # Filtere Daten basierend auf dem ausgewählten Zeitraum
-    filtered_data = all_data[(all_data['Date'] >= start_date) & (all_data['Date'] <= end_date)]
+    # Monatssummen des Zeitraums auf der gewählten Ebene
+    monthly_data = get_monthly_sales(start_date.date(), end_date.date(), level=level)
     
-    if filtered_data.empty:
+    if monthly_data.empty:
         st.warning("Keine Daten für den ausgewählten Zeitraum verfügbar.")
         return
 
-    # Gruppiere Daten nach Monat und SKU
-    monthly_data = filtered_data.groupby([pd.Grouper(key='Date', freq='ME'), 'SKU'])['Quantity'].sum().reset_index()
     monthly_data['Month'] = monthly_data['Date'].dt.strftime('%Y-%m')
+    names = dict(zip(monthly_data['SKU'], monthly_data['SKU_Name']))
     
     # SKU-Auswahl
-    all_skus = sorted(list(set(all_data['SKU'].unique()) & set(SKU_NAMES.keys())))
-    selected_skus = st.multiselect("SKUs auswählen", all_skus, default=all_skus[:5], format_func=lambda x: f"{x} - {SKU_NAMES.get(x, 'Unbekannt')}")
+    all_skus = sorted(sku for sku, name in names.items() if pd.notna(name))
+    selected_skus = st.multiselect("SKUs auswählen", all_skus, default=all_skus[:5], format_func=lambda x: f"{x} - {names.get(x) or 'Unbekannt'}")
     
     # Filtere Daten basierend auf ausgewählten SKUs
     filtered_monthly_data = monthly_data[monthly_data['SKU'].isin(selected_skus)]
@@ -50,6 +42,8 @@ def long_term_sales_tab():
         return
 
     # Erstelle Farbzuordnung für SKUs
+    import plotly.graph_objects as go
+    import plotly.express as px
     color_scale = px.colors.qualitative.Plotly
     color_map = {sku: color_scale[i % len(color_scale)] for i, sku in enumerate(all_skus)}
     
@@ -60,7 +54,7 @@ def long_term_sales_tab():
         fig_individual.add_trace(go.Bar(
             x=sku_data['Month'],
             y=sku_data['Quantity'],
-            name=f"{sku} - {SKU_NAMES.get(sku, 'Unbekannt')}",
+            name=f"{sku} - {names.get(sku) or 'Unbekannt'}",
             marker_color=color_map[sku]
         ))
     
@@ -118,7 +112,7 @@ def long_term_sales_tab():
     st.subheader("Tabellarische Übersicht")
     table_data = filtered_monthly_data.pivot(index='SKU', columns='Month', values='Quantity').reset_index()
     table_data['Gesamtmenge'] = table_data.sum(axis=1, numeric_only=True)
-    table_data['SKU_Name'] = table_data['SKU'].map(SKU_NAMES)
+    table_data['SKU_Name'] = table_data['SKU'].map(names)
     table_data = table_data.sort_values('Gesamtmenge', ascending=False)
     
     # Formatieren der Tabelle
@@ -1,41 +1,28 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-from src.s3_operations import get_all_data_since_date
-from src.sku_names import SKU_NAMES
-from datetime import datetime, timedelta
+from src.s3_operations import get_period_comparison
+from src.sku_hierarchy import SKU_LEVEL
 
-def losing_tab():
+def losing_tab(platforms=None, level=SKU_LEVEL):
     st.subheader("Top 20% Produkte mit höchstem Rückgang (Losing)")
 
-    # Get data for the last 60 days
-    end_date = datetime.now().date()
-    start_date = end_date - timedelta(days=60)
-    all_data = get_all_data_since_date(start_date)
+    # Sales for the last 30 days and the 30 days before that, from the platform cube
+    sales_comparison = get_period_comparison(30, platforms, level)
 
-    if all_data.empty:
+    if sales_comparison.empty:
         st.warning("Keine Daten verfügbar.")
         return
 
-    # Calculate sales for the last 30 days and the 30 days before that
-    last_30_days = all_data[all_data['Date'] > (end_date - timedelta(days=30))]
-    previous_30_days = all_data[(all_data['Date'] <= (end_date - timedelta(days=30))) & (all_data['Date'] > (end_date - timedelta(days=60)))]
-
-    last_30_days_sales = last_30_days.groupby('SKU')['Quantity'].sum().reset_index()
-    previous_30_days_sales = previous_30_days.groupby('SKU')['Quantity'].sum().reset_index()
-
-    # Merge the two periods and calculate the decrease
-    sales_comparison = pd.merge(last_30_days_sales, previous_30_days_sales, on='SKU', suffixes=('_last', '_previous'))
+    # Calculate the decrease
     sales_comparison['Decrease'] = sales_comparison['Quantity_previous'] - sales_comparison['Quantity_last']
-    sales_comparison['Decrease_Percentage'] = (sales_comparison['Decrease'] / sales_comparison['Quantity_previous']) * 100
+    # No percentage for SKUs without sales in the previous period
+    previous = sales_comparison['Quantity_previous'].where(sales_comparison['Quantity_previous'] > 0)
+    sales_comparison['Decrease_Percentage'] = (sales_comparison['Decrease'] / previous) * 100
 
     # Sort by decrease and get top 20%
     top_20_percent = sales_comparison.nlargest(int(len(sales_comparison) * 0.2), 'Decrease')
 
-    # Add SKU names
-    top_20_percent['SKU_Name'] = top_20_percent['SKU'].map(SKU_NAMES)
-
     # Create a bar chart
+    import plotly.express as px
     fig = px.bar(
         top_20_percent,
         x='SKU',
@@ -0,0 +1,153 @@
+import streamlit as st
+import pandas as pd
+import json
+import random
+import time
+import uuid
+import logging
+from datetime import datetime, timedelta, timezone
+from src.s3_utils import get_s3_fs
+
+logger = logging.getLogger(__name__)
+
+# Jeder Datenbestand (Verkäufe, Anfangsbestand, Anlieferungen) wird über ein Manifest
+# referenziert: manifests/<name>/0000000042.json verweist auf unveränderliche Objekte.
+# Eine neue Generation wird nur angelegt, wenn sie noch nicht existiert (If-None-Match),
+# sodass gleichzeitige Schreiber sich nicht überschreiben, sondern neu aufsetzen.
+MANIFEST_PREFIX = "manifests"
+MAX_COMMIT_ATTEMPTS = 8
+# Ältere Generationen und nicht mehr referenzierte Objekte bleiben so lange lesbar
+KEEP_GENERATIONS = 20
+VACUUM_GRACE = timedelta(hours=1)
+
+class ManifestConflict(Exception):
+    """Das Manifest wurde zwischenzeitlich von einem anderen Schreiber geändert."""
+
+def manifest_dir(bucket_name, name):
+    return f"{bucket_name}/{MANIFEST_PREFIX}/{name}"
+
+def generation_path(bucket_name, name, generation):
+    return f"{manifest_dir(bucket_name, name)}/{generation:010d}.json"
+
+def new_object_path(bucket_name, prefix, stem, suffix):
+    """Eindeutiger Pfad für ein unveränderliches Datenobjekt."""
+    return f"{bucket_name}/{prefix}/{stem}.{uuid.uuid4().hex[:16]}{suffix}"
+
+def list_generations(s3, bucket_name, name):
+    directory = manifest_dir(bucket_name, name)
+    if not s3.exists(directory):
+        return []
+    generations = []
+    for path in s3.ls(directory, detail=False, refresh=True):
+        stem = path.rsplit('/', 1)[-1][:-len('.json')]
+        if path.endswith('.json') and stem.isdigit():
+            generations.append(int(stem))
+    return sorted(generations)
+
+def read_manifest(name, s3=None, bucket_name=None):
+    """Liest die neueste Generation eines Manifests.
+
+    Liefert ein Dict mit 'generation' (0, solange nichts geschrieben wurde) und
+    'objects' (Schlüssel -> Objektpfad). Alle Objekte einer Generation bilden einen
+    konsistenten Stand.
+    """
+    s3 = s3 or get_s3_fs()
+    bucket_name = bucket_name or st.secrets['aws']['S3_BUCKET_NAME']
+    generations = list_generations(s3, bucket_name, name)
+    if not generations:
+        return {'generation': 0, 'objects': {}}
+    with s3.open(generation_path(bucket_name, name, generations[-1]), 'r') as f:
+        manifest = json.load(f)
+    return {'generation': generations[-1], 'objects': manifest['objects']}
+
+def _is_conflict(error):
+    # S3 meldet eine bereits existierende Generation als 412, parallele Versuche als 409
+    return isinstance(error, FileExistsError) or 'ConditionalRequestConflict' in str(error)
+
+def commit_manifest(name, update, s3=None, bucket_name=None, expected_generation=None):
+    """Schreibt eine neue Manifest-Generation per Compare-and-Swap.
+
+    update(manifest) erhält den aktuellen Stand, legt benötigte neue Objekte an und
+    liefert die neuen Objektverweise (oder None, wenn nichts zu ändern ist). Bei einem
+    Konflikt wird der neueste Stand gelesen und update erneut aufgerufen. Mit
+    expected_generation schlägt der Commit stattdessen mit ManifestConflict fehl,
+    sobald das Manifest nicht mehr dem Stand entspricht, auf dem die Änderung beruht.
+    """
+    s3 = s3 or get_s3_fs()
+    bucket_name = bucket_name or st.secrets['aws']['S3_BUCKET_NAME']
+
+    for attempt in range(MAX_COMMIT_ATTEMPTS):
+        manifest = read_manifest(name, s3, bucket_name)
+        if expected_generation is not None and manifest['generation'] != expected_generation:
+            raise ManifestConflict(
+                f"{name} wurde zwischenzeitlich geändert (Generation {manifest['generation']} statt {expected_generation}).")
+
+        objects = update(manifest)
+        if objects is None:
+            return manifest
+
+        generation = manifest['generation'] + 1
+        payload = json.dumps({
+            'generation': generation,
+            'committed_at': datetime.now(timezone.utc).isoformat(),
+            'objects': objects,
+        }, sort_keys=True).encode('utf-8')
+        try:
+            s3.pipe_file(generation_path(bucket_name, name, generation), payload, mode="create")
+            return {'generation': generation, 'objects': objects}
+        except OSError as e:
+            if not _is_conflict(e):
+                raise
+            if expected_generation is not None:
+                raise ManifestConflict(f"{name} wurde zwischenzeitlich geändert.") from e
+            delay = min(2.0, 0.05 * 2 ** attempt) * random.uniform(0.5, 1.5)
+            logger.info(f"Konflikt beim Schreiben von {name} (Generation {generation}), neuer Versuch in {delay:.2f}s.")
+            time.sleep(delay)
+
+    raise ManifestConflict(f"{name}: kein Commit nach {MAX_COMMIT_ATTEMPTS} Versuchen.")
+
+def _modified(info):
+    modified = info.get('LastModified') or info.get('mtime')
+    if isinstance(modified, (int, float)):
+        return datetime.fromtimestamp(modified, timezone.utc)
+    modified = pd.Timestamp(modified)
+    return (modified.tz_localize('UTC') if modified.tzinfo is None else modified).to_pydatetime()
+
+def vacuum_manifest(name, data_prefix, s3=None, bucket_name=None, grace=VACUUM_GRACE):
+    """Löscht alte Generationen und nicht mehr referenzierte Objekte unter data_prefix.
+
+    Objekte, die eine der letzten KEEP_GENERATIONS Generationen noch referenziert, und
+    alles, was jünger als grace ist, bleiben erhalten, damit laufende Leser ihren Stand
+    zu Ende lesen können. Liefert die Anzahl gelöschter Objekte.
+    """
+    s3 = s3 or get_s3_fs()
+    bucket_name = bucket_name or st.secrets['aws']['S3_BUCKET_NAME']
+    generations = list_generations(s3, bucket_name, name)
+    if not generations:
+        return 0
+    cutoff = datetime.now(timezone.utc) - grace
+
+    kept = generations[-KEEP_GENERATIONS:]
+    referenced = set()
+    for generation in kept:
+        with s3.open(generation_path(bucket_name, name, generation), 'r') as f:
+            referenced.update(json.load(f)['objects'].values())
+    # Verglichen wird der Schlüssel unterhalb von data_prefix, unabhängig von der Pfadform des Dateisystems
+    def object_key(path):
+        return path.rstrip('/').split(f"/{data_prefix}/", 1)[-1]
+    referenced = {object_key(path) for path in referenced}
+
+    candidates = []
+    prefix = f"{bucket_name}/{data_prefix}"
+    if s3.exists(prefix):
+        candidates += [(path, info) for path, info in s3.find(prefix, detail=True).items()
+                       if object_key(path) not in referenced]
+    for generation in generations[:-KEEP_GENERATIONS]:
+        path = generation_path(bucket_name, name, generation)
+        candidates.append((path, s3.info(path)))
+
+    stale = [path for path, info in candidates if _modified(info) < cutoff]
+    if stale:
+        s3.rm(stale)
+    logger.info(f"{len(stale)} nicht mehr benötigte Objekte von {name} gelöscht.")
+    return len(stale)
@@ -1,12 +1,27 @@
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
 from datetime import datetime, timedelta
 from src.inventory_management import update_initial_inventory as update_inventory
-from src.s3_operations import get_daily_sales_data, get_summary_data
+from src.s3_operations import get_daily_sales_data, get_summary_data, get_platform_shares, get_platform_daily_sales
 from src.sku_names import SKU_NAMES
+from src.anomaly_detection import load_anomalies, DROP
+from src.sku_hierarchy import SKU_LEVEL, label_names
+
+def overview_tab(platforms=None, level=SKU_LEVEL):
+    # Beim Import erkannte Einbrüche und Spitzen der letzten Tage
+    anomalies = load_anomalies(since=datetime.now().date() - timedelta(days=7))
+    if not anomalies.empty:
+        st.subheader("Auffälligkeiten der letzten 7 Tage")
+        anomalies['SKU_Name'] = anomalies['SKU'].map(SKU_NAMES).fillna('Unbekannt')
+        drops = (anomalies['Kind'] == DROP).sum()
+        st.warning(f"{drops} Einbrüche und {len(anomalies) - drops} Spitzen gegenüber dem üblichen Absatz.")
+        st.dataframe(anomalies[['Date', 'Kind', 'SKU', 'SKU_Name', 'Quantity', 'Expected', 'Score']].style.format({
+            'Quantity': '{:.0f}',
+            'Expected': '{:.1f}',
+            'Score': '{:.1f}'
+        }), hide_index=True)
+        st.markdown("---")
 
-def overview_tab():
     # Anfangsbestand-Verwaltung
     st.subheader("Anfangsbestand verwalten")
     col1, col2, col3 = st.columns(3)
@@ -30,7 +45,7 @@ def overview_tab():
     time_range = st.selectbox("Zeitraum auswählen", [7, 14, 30], index=2)
 
     # Hole die täglichen Verkaufsdaten
-    daily_sales = get_daily_sales_data(days=time_range + 1)  # +1 um sicherzustellen, dass wir genug Daten haben
+    daily_sales = get_daily_sales_data(days=time_range + 1, platforms=platforms, level=level)  # +1 um sicherzustellen, dass wir genug Daten haben
 
     if not daily_sales.empty:
         # Entferne den aktuellen Tag
@@ -38,11 +53,12 @@ def overview_tab():
 
         # Dropdown for SKU selection
         available_skus = daily_sales.columns.tolist()
+        names = dict(zip(available_skus, label_names(available_skus, level)))
         selected_skus = st.multiselect(
             "SKUs auswählen:",
             options=available_skus,
             default=available_skus[:5],
-            format_func=lambda x: f"{x} - {SKU_NAMES.get(x, 'Unbekannt')}"
+            format_func=lambda x: f"{x} - {names.get(x) or 'Unbekannt'}"
         )
 
         # Create a dictionary to store the selection state for each SKU
@@ -52,6 +68,7 @@ def overview_tab():
         show_sum = st.checkbox("Summe aller SKUs anzeigen", value=True)
 
         # Erstelle den Chart
+        import plotly.graph_objects as go
         fig = go.Figure()
 
         # Füge die Summe aller SKUs hinzu, wenn ausgewählt
@@ -69,7 +86,7 @@ def overview_tab():
         # Füge individuelle SKU-Linien hinzu
         for sku in daily_sales.columns:
             if sku in selected_skus:
-                sku_name = SKU_NAMES.get(sku, f"Unbekannte SKU {sku}")
+                sku_name = names.get(sku) or f"Unbekannte SKU {sku}"
                 fig.add_trace(go.Scatter(
                     x=daily_sales.index.strftime('%Y-%m-%d'),
                     y=daily_sales[sku],
@@ -91,8 +108,29 @@ def overview_tab():
 
     st.markdown("---")
 
-    # Lade die Zusammenfassungsdaten
-    summary_data = get_summary_data()
+    # Plattformanteile und -verläufe aus dem Plattformwürfel
+    st.subheader("Verkäufe nach Plattform")
+    shares = get_platform_shares(days=30, platforms=platforms)
+    if not shares.empty:
+        import plotly.express as px
+        col1, col2 = st.columns(2)
+        with col1:
+            fig = px.pie(shares, names='Platform', values='Quantity', title='Anteile der letzten 30 Tage')
+            st.plotly_chart(fig, use_container_width=True)
+        with col2:
+            platform_daily = get_platform_daily_sales(days=90, platforms=platforms)
+            weekly = platform_daily.resample('W').sum()
+            fig = px.line(weekly, x=weekly.index, y=weekly.columns, title='Wöchentliche Verkäufe der letzten 90 Tage',
+                          labels={'x': 'Woche', 'value': 'Verkaufsmenge', 'variable': 'Plattform'})
+            st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.info("Keine Plattformdaten verfügbar.")
+
+    st.markdown("---")
+
+    # Lade die Zusammenfassungsdaten; aufgelöste Sets zählen als Absatz ihrer Einzelflaschen
+    components = st.checkbox("Sets in Einzelartikel auflösen", help="Set-Verkäufe gemäß Stückliste als Bedarf der enthaltenen Einzelartikel zählen")
+    summary_data = get_summary_data(components=components, level=level)
     summary_data['SKU'] = summary_data['SKU'].astype(str)
 
     if not summary_data.empty:
@@ -102,7 +140,7 @@ def overview_tab():
         filtered_summary_data = summary_data[summary_data['Last30DaysQuantity'] > 0]
         
         # Zeige die Zusammenfassungstabelle
-        display_columns = ['SKU', 'SKU_Name', 'Last30DaysQuantity', 'AvgDailyQuantity', 'CurrentQuantity', 'PlannedDeliveries', 'InventoryDays', 'AdjustedInventoryDays', 'AdjustedInventoryDaysWithDeliveries', 'Trend']
+        display_columns = ['SKU', 'SKU_Name', 'Last30DaysQuantity', 'AvgDailyQuantity', 'StockoutDays', 'CurrentQuantity', 'PlannedDeliveries', 'InventoryDays', 'AdjustedInventoryDays', 'AdjustedInventoryDaysWithDeliveries', 'Trend', 'StockoutProb14d', 'StockoutProb30d', 'StockoutProb60d', 'ExpectedStockoutDate', 'ReorderPoint']
         
         # Only include columns that are present in the DataFrame
         available_columns = [col for col in display_columns if col in filtered_summary_data.columns]
@@ -110,12 +148,18 @@ def overview_tab():
         st.dataframe(filtered_summary_data[available_columns].style.format({
             'Last30DaysQuantity': '{:.0f}',
             'AvgDailyQuantity': '{:.2f}',
+            'StockoutDays': '{:.0f}',
             'CurrentQuantity': '{:.0f}',
             'PlannedDeliveries': '{:.0f}',
             'InventoryDays': '{:.1f}',
             'AdjustedInventoryDays': '{:.1f}',
             'AdjustedInventoryDaysWithDeliveries': '{:.1f}',
-            'Trend': '{:.2f}%'
+            'Trend': '{:.2f}%',
+            'StockoutProb14d': '{:.0%}',
+            'StockoutProb30d': '{:.0%}',
+            'StockoutProb60d': '{:.0%}',
+            'ExpectedStockoutDate': lambda d: d.strftime('%Y-%m-%d') if pd.notna(d) else '',
+            'ReorderPoint': '{:.0f}'
         }))
     
         total_quantity_sold = summary_data['Last30DaysQuantity'].sum()
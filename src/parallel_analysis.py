@@ -0,0 +1,104 @@
+import os
+import pandas as pd
+import numpy as np
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from src.daily_matrix import build_daily_matrix
+from src.trend_analysis import analyze_sku, analyze_all_skus
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 32
+# Unterhalb dieser SKU-Anzahl lohnt sich der Start der Worker-Prozesse nicht
+MIN_SKUS_FOR_POOL = 64
+
+_shared_values = None
+_shared_memory = None
+
+def get_worker_count():
+    """Anzahl der Worker aus SKU_ANALYSIS_WORKERS, sonst alle verfügbaren Kerne."""
+    configured = os.environ.get("SKU_ANALYSIS_WORKERS")
+    if configured:
+        try:
+            return max(1, int(configured))
+        except ValueError:
+            logger.warning(f"Ungültiger Wert für SKU_ANALYSIS_WORKERS: {configured!r}, es werden alle Kerne genutzt.")
+    return os.cpu_count() or 1
+
+def _attach_shared_matrix(name, shape, dtype):
+    global _shared_values, _shared_memory
+    _shared_memory = shared_memory.SharedMemory(name=name)
+    _shared_values = np.ndarray(shape, dtype=dtype, buffer=_shared_memory.buf)
+
+def _analyze_chunk(tasks, dates):
+    """Analysiert einen Block von SKUs im Worker; Fehler bleiben wie im seriellen Pfad auf die SKU begrenzt."""
+    results = []
+    for sku, row, first, last, forecast in tasks:
+        try:
+            sku_data = pd.DataFrame({
+                'Date': dates[first:last + 1],
+                'Quantity': _shared_values[row, first:last + 1].copy(),
+            })
+            result = analyze_sku(sku_data, forecast)
+            if result is not None:
+                results.append((sku, result))
+        except Exception as e:
+            logger.error(f"Error analyzing SKU {sku}: {str(e)}")
+    return results
+
+def analyze_all_skus_parallel(all_data, forecasts=None, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Verteilt analyze_sku über einen Prozess-Pool; die Tagesmatrix liegt im Shared Memory.
+
+    Liefert dieselben Ergebnisse wie der serielle Pfad in analyze_all_skus.
+    """
+    matrix = build_daily_matrix(all_data)
+    dates = pd.to_datetime(all_data['Date'])
+    first_dates = dates.groupby(all_data['SKU']).min()
+    last_dates = dates.groupby(all_data['SKU']).max()
+    forecasts_by_sku = dict(tuple(forecasts.groupby('SKU'))) if forecasts is not None else {}
+
+    tasks = []
+    for sku in all_data['SKU'].unique():
+        forecast = forecasts_by_sku.get(str(sku)) if forecasts is not None else None
+        if forecast is not None:
+            forecast = forecast.drop(columns=['SKU']).reset_index(drop=True)
+        tasks.append((
+            sku,
+            matrix.skus.get_loc(str(sku)),
+            matrix.dates.get_loc(first_dates[sku].normalize()),
+            matrix.dates.get_loc(last_dates[sku].normalize()),
+            forecast,
+        ))
+
+    values = np.ascontiguousarray(matrix.values)
+    shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+    try:
+        np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)[:] = values
+        chunks = [tasks[i:i + chunk_size] for i in range(0, len(tasks), chunk_size)]
+        results = {}
+        with ProcessPoolExecutor(max_workers=workers or get_worker_count(),
+                                 mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_attach_shared_matrix,
+                                 initargs=(shm.name, values.shape, values.dtype)) as pool:
+            for chunk_results in pool.map(_analyze_chunk, chunks, [matrix.dates] * len(chunks)):
+                results.update(chunk_results)
+    finally:
+        shm.close()
+        shm.unlink()
+
+    # Gleiche Reihenfolge wie im seriellen Pfad
+    return {sku: results[sku] for sku, *_ in tasks if sku in results}
+
+def analyze_all_skus_with_pool(all_data, forecasts=None, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Nutzt den Prozess-Pool, wenn sich das lohnt, und fällt sonst auf den seriellen Pfad zurück."""
+    workers = workers or get_worker_count()
+    if workers <= 1 or all_data.empty or all_data['SKU'].nunique() < MIN_SKUS_FOR_POOL:
+        return analyze_all_skus(all_data, forecasts)
+    try:
+        return analyze_all_skus_parallel(all_data, forecasts, workers, chunk_size)
+    except (BrokenProcessPool, OSError) as e:
+        logger.error(f"Prozess-Pool fehlgeschlagen, analysiere seriell: {str(e)}")
+        return analyze_all_skus(all_data, forecasts)
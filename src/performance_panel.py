@@ -0,0 +1,30 @@
+import streamlit as st
+import pandas as pd
+from src.result_cache import result_cache
+from src.single_flight import single_flight
+
+def _short_name(name):
+    return name.rsplit('.', 1)[-1]
+
+def performance_panel():
+    """Belegung und Zähler des Ergebnis-Caches sowie zusammengefasste gleichzeitige Aufrufe."""
+    with st.sidebar.expander("Performance"):
+        cache = result_cache.summary()
+        st.write(f"Ergebnis-Cache: {cache['entries']} Einträge, "
+                 f"{cache['bytes'] / 2**20:.1f} von {cache['budget_bytes'] / 2**20:.0f} MB "
+                 f"(Datenversion {cache['version'] or '-'})")
+        if cache['names']:
+            st.dataframe(pd.DataFrame([
+                {'Funktion': _short_name(name), 'Treffer': counts['hits'], 'Fehlzugriffe': counts['misses'],
+                 'Verdrängt': counts['evictions'], 'Verworfen': counts['invalidations'], 'MB': counts['bytes'] / 2**20}
+                for name, counts in cache['names'].items()
+            ]).style.format({'MB': '{:.1f}'}), hide_index=True)
+
+        flights = single_flight.summary()
+        if flights:
+            st.write("Gleichzeitige Aufrufe")
+            st.dataframe(pd.DataFrame([
+                {'Funktion': _short_name(name), 'Aufrufe': counts['calls'], 'Berechnet': counts['executions'],
+                 'Geteilt': counts['shared']}
+                for name, counts in flights.items()
+            ]), hide_index=True)
@@ -0,0 +1,144 @@
+import pandas as pd
+import numpy as np
+import io
+from src.sku_registry import sku_registry
+from src.daily_matrix import DailyMatrix
+from src.trend_state import HISTORY_START, day_numbers
+
+# Zeilen ohne Shop-Namen werden unter einer leeren Plattform geführt
+UNKNOWN_PLATFORM = ''
+
+class PlatformCube:
+    """Verkaufsmengen als Würfel SKU × Plattform × Tag (int32) seit HISTORY_START.
+
+    skus und platforms sind die Indexlisten der ersten beiden Achsen, die dritte Achse
+    zählt die Tage ab HISTORY_START. Änderungen werden wie beim TrendState als entfernte
+    und hinzugefügte Zeilen eingearbeitet, sodass Plattformanteile, Plattformverläufe und
+    Plattformfilter ohne die Verkaufsdaten zu lesen beantwortet werden.
+    """
+
+    COLUMNS = ['Date', 'SKU', 'Quantity', 'Platform']
+
+    def __init__(self, skus=None, platforms=None, values=None):
+        self.skus = list(skus or [])
+        self.platforms = list(platforms or [])
+        self._sku_index = {sku: i for i, sku in enumerate(self.skus)}
+        self._platform_index = {platform: i for i, platform in enumerate(self.platforms)}
+        self.values = values if values is not None else np.zeros((len(self.skus), len(self.platforms), 0), dtype=np.int32)
+
+    @staticmethod
+    def _positions(index, labels, keys):
+        new = [key for key in pd.unique(keys) if key not in index]
+        for key in new:
+            index[key] = len(labels)
+            labels.append(key)
+        return np.array([index[key] for key in keys], dtype=np.int64), len(new)
+
+    def apply(self, removed, added):
+        """Arbeitet entfernte und hinzugefügte Verkaufszeilen (Date, SKU, Quantity, Platform) ein."""
+        parts = [frame[self.COLUMNS].assign(Sign=sign)
+                 for frame, sign in ((removed, -1), (added, 1)) if frame is not None and not frame.empty]
+        if not parts:
+            return self
+        rows = pd.concat(parts, ignore_index=True)
+        rows['Day'] = day_numbers(rows['Date'])
+        rows = rows[rows['Day'] >= 0]
+        if rows.empty:
+            return self
+        rows['SKU'] = sku_registry.decode(sku_registry.encode(rows['SKU']))
+        rows['Platform'] = rows['Platform'].where(rows['Platform'].notna(), UNKNOWN_PLATFORM).astype(str)
+        rows['Qty'] = rows['Sign'] * rows['Quantity'].astype(np.int64)
+        delta = rows.groupby(['SKU', 'Platform', 'Day'], sort=False)['Qty'].sum().reset_index()
+        delta = delta[delta['Qty'] != 0]
+        if delta.empty:
+            return self
+
+        sku_pos, new_skus = self._positions(self._sku_index, self.skus, delta['SKU'].to_numpy())
+        platform_pos, new_platforms = self._positions(self._platform_index, self.platforms, delta['Platform'].to_numpy())
+        day_pos = delta['Day'].to_numpy(np.int64)
+        new_days = max(int(day_pos.max()) + 1 - self.values.shape[2], 0)
+        if new_skus or new_platforms or new_days:
+            self.values = np.pad(self.values, ((0, new_skus), (0, new_platforms), (0, new_days)))
+        np.add.at(self.values, (sku_pos, platform_pos, day_pos), delta['Qty'].to_numpy(np.int32))
+        return self
+
+    @classmethod
+    def from_sales(cls, sales):
+        """Baut den Würfel aus Verkaufszeilen (Date, SKU, Quantity, Platform) vollständig auf."""
+        return cls().apply(None, sales)
+
+    @property
+    def dates(self):
+        return pd.date_range(HISTORY_START, periods=self.values.shape[2], freq='D')
+
+    def _window(self, start_date=None, end_date=None, skus=None, platforms=None):
+        """Ausschnitt (SKUs, Plattformen, Tage) für den Zeitraum; Tage außerhalb des Würfels sind 0."""
+        start = pd.Timestamp(start_date).normalize() if start_date is not None else pd.Timestamp(HISTORY_START)
+        end = pd.Timestamp(end_date).normalize() if end_date is not None else self.dates[-1] if self.values.shape[2] else start
+        start = max(start, pd.Timestamp(HISTORY_START))
+        dates = pd.date_range(start, end, freq='D')
+
+        sku_rows = np.arange(len(self.skus))
+        if skus is not None:
+            wanted = set(sku_registry.decode(sku_registry.encode(pd.Series(list(skus), dtype=object))))
+            sku_rows = np.array([i for i, sku in enumerate(self.skus) if sku in wanted], dtype=np.int64)
+        platform_cols = np.arange(len(self.platforms))
+        if platforms is not None:
+            wanted = {str(platform) for platform in platforms}
+            platform_cols = np.array([i for i, platform in enumerate(self.platforms) if platform in wanted], dtype=np.int64)
+
+        window = np.zeros((len(sku_rows), len(platform_cols), len(dates)), dtype=np.int64)
+        first = (start - pd.Timestamp(HISTORY_START)).days
+        last = min(first + len(dates), self.values.shape[2])
+        if last > first:
+            window[:, :, :last - first] = self.values[np.ix_(sku_rows, platform_cols, np.arange(first, last))]
+        return window, sku_rows, platform_cols, dates
+
+    def daily_matrix(self, start_date=None, end_date=None, platforms=None):
+        """SKU×Tag-Matrix wie build_daily_matrix, beschränkt auf die gewählten Plattformen."""
+        window, sku_rows, _, dates = self._window(start_date, end_date, platforms=platforms)
+        values = window.sum(axis=1)
+        active = values.any(axis=1)
+        skus = pd.Index([self.skus[i] for i in sku_rows[active]], dtype=object)
+        order = np.argsort(np.asarray(skus, dtype=str), kind='stable')
+        return DailyMatrix(values[active][order].astype('float64'), skus[order], dates)
+
+    def sku_platforms(self):
+        """Plattformen je SKU mit mindestens einem Verkauf, als kommagetrennte Liste."""
+        labels = np.array(self.platforms, dtype=object)
+        sold = (self.values != 0).any(axis=2) & (labels != UNKNOWN_PLATFORM)
+        order = np.argsort(labels.astype(str))
+        return pd.DataFrame({
+            'SKU': self.skus,
+            'Platforms': [', '.join(labels[order][row[order]]) for row in sold],
+        })
+
+    def platform_shares(self, start_date=None, end_date=None, skus=None):
+        """Menge und Anteil je Plattform im Zeitraum."""
+        window, _, platform_cols, _ = self._window(start_date, end_date, skus=skus)
+        quantity = window.sum(axis=(0, 2))
+        total = quantity.sum()
+        shares = pd.DataFrame({
+            'Platform': [self.platforms[i] or 'Unbekannt' for i in platform_cols],
+            'Quantity': quantity,
+            'Share': quantity / total if total else np.zeros(len(quantity)),
+        })
+        return shares[shares['Quantity'] != 0].sort_values('Quantity', ascending=False, ignore_index=True)
+
+    def platform_daily(self, start_date=None, end_date=None, skus=None):
+        """Tägliche Menge je Plattform (Zeilen: Tage, Spalten: Plattformen)."""
+        window, _, platform_cols, dates = self._window(start_date, end_date, skus=skus)
+        series = pd.DataFrame(window.sum(axis=0).T, index=dates,
+                              columns=[self.platforms[i] or 'Unbekannt' for i in platform_cols])
+        return series.loc[:, series.any(axis=0)]
+
+    def to_bytes(self):
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, skus=np.array(self.skus, dtype=str),
+                            platforms=np.array(self.platforms, dtype=str), values=self.values)
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, payload):
+        with np.load(io.BytesIO(payload)) as data:
+            return cls(data['skus'].tolist(), data['platforms'].tolist(), data['values'])
@@ -0,0 +1,71 @@
+import logging
+import time
+from datetime import datetime
+from src.artifacts import artifact_tag, write_artifacts
+from src.s3_operations import (get_data_version, compute_summary_data, summary_artifact, summary_tag,
+                               compute_period_comparison, comparison_artifact, comparison_tag,
+                               compute_monthly_sales, monthly_artifact)
+from src.detail_analysis_tab import DETAIL_START_DATE, compute_detail_analysis, analysis_artifact
+from src.trend_analysis import analysis_tables
+from src.sku_hierarchy import LEVELS
+from src.trend_state import HISTORY_START
+from src.sales_store import SALES_STATES, load_sales_state
+
+logger = logging.getLogger(__name__)
+
+# Zeitraum in Tagen, den die Tabs für Zusammenfassung und Periodenvergleich anfordern
+PRECOMPUTE_DAYS = 30
+
+def _artifact_jobs():
+    """(Name, Kennung, Berechnung) aller vorberechneten Auswertungen.
+
+    Die Kennung wird vor der Berechnung ermittelt: ändern sich die Daten währenddessen,
+    gilt das Artefakt als veraltet und die Tabs rechnen live.
+    """
+    data_tag = artifact_tag(get_data_version())
+    jobs = []
+    for level in LEVELS:
+        for components in (False, True):
+            jobs.append((summary_artifact(PRECOMPUTE_DAYS, components, level), summary_tag(),
+                         lambda components=components, level=level: compute_summary_data(PRECOMPUTE_DAYS, components, level)))
+        jobs.append((comparison_artifact(PRECOMPUTE_DAYS, level), comparison_tag(),
+                     lambda level=level: compute_period_comparison(PRECOMPUTE_DAYS, level=level)))
+        jobs.append((monthly_artifact(level), data_tag,
+                     lambda level=level: compute_monthly_sales(HISTORY_START, datetime.now().date(), level=level)))
+    return jobs
+
+def precompute_artifacts():
+    """Berechnet Zusammenfassungen, Periodenvergleiche, Monatssummen und die Detailanalyse
+    zum aktuellen Stand und speichert sie in einem Commit als Artefakte.
+
+    Liefert {Name: Zeilen} der gespeicherten Artefakte. Leere Ergebnisse (Fehlerpfade)
+    werden nicht gespeichert, dafür rechnen die Tabs weiterhin live.
+    """
+    # Fehlende Zustände werden beim ersten Lesen aufgebaut und ändern dabei die Datenversion,
+    # das muss vor dem Ermitteln der Kennungen geschehen
+    for key in SALES_STATES:
+        load_sales_state(key)
+
+    artifacts = {}
+    for name, tag, compute in _artifact_jobs():
+        if tag is None:
+            logger.warning(f"Stand für {name} nicht ermittelbar, Artefakt übersprungen.")
+            continue
+        started = time.perf_counter()
+        frame = compute()
+        if frame.empty:
+            logger.warning(f"Artefakt {name} ist leer und wird nicht gespeichert.")
+            continue
+        artifacts[name] = (tag, frame)
+        logger.info(f"Artefakt {name} in {time.perf_counter() - started:.1f} s berechnet.")
+
+    tag = artifact_tag(get_data_version())
+    results = compute_detail_analysis(DETAIL_START_DATE) if tag is not None else None
+    if results:
+        history, forecasts = analysis_tables(results)
+        artifacts[analysis_artifact(DETAIL_START_DATE, 'history')] = (tag, history)
+        artifacts[analysis_artifact(DETAIL_START_DATE, 'forecast')] = (tag, forecasts)
+
+    if artifacts:
+        write_artifacts(artifacts)
+    return {name: len(frame) for name, (_, frame) in artifacts.items()}
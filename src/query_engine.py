@@ -0,0 +1,90 @@
+import pandas as pd
+import logging
+from src.sales_store import sales_datasets
+from src.inventory_management import load_initial_inventory, load_supplier_deliveries
+
+logger = logging.getLogger(__name__)
+
+# Tabellen und Sichten, die in Abfragen zur Verfügung stehen
+QUERY_TABLES = {
+    'sales': "Verkäufe (Date, SKU, Quantity, Platform, OrderId, OrderItemId)",
+    'daily_sales': "Tagesverkäufe je SKU (Date, SKU, Quantity)",
+    'monthly_sales': "Monatsverkäufe je SKU und Plattform (Month, SKU, Platform, Quantity)",
+    'initial_inventory': "Anfangsbestand (SKU, InitialQuantity, Date)",
+    'supplier_deliveries': "Lieferantenanlieferungen (SKU, SupplierDelivery, Date, Status)",
+}
+
+def _sql_literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+def _sales_condition(start_date, end_date, skus, hidden_dates=None):
+    conditions = []
+    if start_date is not None:
+        conditions.append(f"Date >= DATE {_sql_literal(pd.Timestamp(start_date).date())}")
+    if end_date is not None:
+        conditions.append(f"Date <= DATE {_sql_literal(pd.Timestamp(end_date).date())}")
+    if skus:
+        conditions.append(f"SKU IN ({', '.join(_sql_literal(sku) for sku in skus)})")
+    if hidden_dates:
+        conditions.append(f"Date NOT IN ({', '.join('DATE ' + _sql_literal(d) for d in hidden_dates)})")
+    return " AND ".join(conditions) if conditions else "TRUE"
+
+def create_connection(start_date=None, end_date=None, skus=None, tables=None):
+    """Öffnet eine In-Process-DuckDB mit den Verkaufs-, Bestands- und Lieferdaten.
+
+    Nur Partitionen im Zeitraum werden registriert; Spaltenauswahl und SKU-Filter
+    schiebt DuckDB bis in den Parquet-Scan durch. tables begrenzt, welche der
+    CSV-basierten Tabellen geladen werden (Standard: alle).
+    """
+    tables = set(QUERY_TABLES) if tables is None else set(tables)
+    import duckdb
+
+    con = duckdb.connect()
+
+    day_dataset, compacted_dataset, shadowed = sales_datasets(start_date, end_date)
+    con.register('sales_days', day_dataset)
+    con.register('sales_compacted', compacted_dataset)
+    con.execute(f"""
+        CREATE VIEW sales AS
+        SELECT * FROM sales_compacted WHERE {_sales_condition(start_date, end_date, skus, shadowed)}
+        UNION ALL
+        SELECT * FROM sales_days WHERE {_sales_condition(start_date, end_date, skus)}
+    """)
+    con.execute("""
+        CREATE VIEW daily_sales AS
+        SELECT Date, SKU, SUM(Quantity) AS Quantity FROM sales GROUP BY Date, SKU
+    """)
+    con.execute("""
+        CREATE VIEW monthly_sales AS
+        SELECT date_trunc('month', Date) AS Month, SKU, Platform, SUM(Quantity) AS Quantity
+        FROM sales GROUP BY Month, SKU, Platform
+    """)
+
+    if 'initial_inventory' in tables:
+        con.register('initial_inventory', load_initial_inventory().drop(columns=['SKUCode']))
+    if 'supplier_deliveries' in tables:
+        con.register('supplier_deliveries', load_supplier_deliveries().drop(columns=['SKUCode']))
+
+    # Abfragen kommen aus der App: nach dem Registrieren kein Zugriff mehr auf Dateien,
+    # Netzwerk oder Erweiterungen, und die Einstellung lässt sich nicht zurücksetzen
+    con.execute("SET enable_external_access = false")
+    con.execute("SET lock_configuration = true")
+    return con
+
+def check_query(con, sql):
+    """Lässt nur eine einzelne SELECT-Abfrage zu (ValueError sonst)."""
+    import duckdb
+
+    statements = con.extract_statements(sql)
+    if len(statements) != 1 or statements[0].type != duckdb.StatementType.SELECT:
+        raise ValueError("Nur eine einzelne SELECT-Abfrage ist erlaubt.")
+
+def run_query(sql, start_date=None, end_date=None, skus=None):
+    """Führt eine SQL-Abfrage über die Verkaufsdaten im angegebenen Zeitraum aus."""
+    referenced = {name for name in QUERY_TABLES if name in sql}
+    con = create_connection(start_date, end_date, skus, tables=referenced)
+    try:
+        check_query(con, sql)
+        return con.execute(sql).df()
+    finally:
+        con.close()
@@ -0,0 +1,41 @@
+import streamlit as st
+from datetime import datetime, timedelta
+from src.query_engine import run_query, QUERY_TABLES
+from src.sku_names import SKU_NAMES
+
+DEFAULT_QUERY = """SELECT Platform, SUM(Quantity) AS Quantity
+FROM sales
+GROUP BY Platform
+ORDER BY Quantity DESC"""
+
+def query_tab():
+    st.subheader("SQL-Abfrage")
+
+    with st.expander("Verfügbare Tabellen"):
+        for name, description in QUERY_TABLES.items():
+            st.write(f"`{name}`: {description}")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        start_date = st.date_input("Von", value=datetime.now().date() - timedelta(days=90), key="query_start")
+    with col2:
+        end_date = st.date_input("Bis", value=datetime.now().date(), key="query_end")
+
+    selected_skus = st.multiselect(
+        "SKUs (leer = alle)",
+        options=sorted(SKU_NAMES.keys()),
+        format_func=lambda x: f"{x} - {SKU_NAMES.get(x, 'Unbekannt')}",
+        key="query_skus"
+    )
+    sql = st.text_area("Abfrage", value=DEFAULT_QUERY, height=150)
+
+    if st.button("Abfrage ausführen"):
+        try:
+            result = run_query(sql, start_date, end_date, selected_skus)
+        except Exception as e:
+            st.error(f"Fehler in der Abfrage: {str(e)}")
+            return
+
+        st.write(f"{len(result)} Zeilen")
+        st.dataframe(result, hide_index=True, use_container_width=True)
+        st.download_button("Als CSV herunterladen", result.to_csv(index=False), file_name="abfrage.csv", mime="text/csv")
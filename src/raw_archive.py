@@ -0,0 +1,82 @@
+import streamlit as st
+import pandas as pd
+import gzip
+import json
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from src.s3_utils import get_s3_fs
+from src.data_processor import process_archived_orders
+from src.parallel_analysis import get_worker_count
+from src.sales_store import write_sales_batch
+
+logger = logging.getLogger(__name__)
+
+# Rohantworten der Billbee-API, eine gzip-komprimierte JSON-Datei pro Tag
+RAW_PREFIX = "raw_orders"
+
+def raw_archive_path(bucket_name, date):
+    return f"{bucket_name}/{RAW_PREFIX}/{pd.Timestamp(date):%Y-%m-%d}.json.gz"
+
+def archive_raw_orders(date, orders_data, s3=None, bucket_name=None):
+    """Legt die unveränderte API-Antwort eines Tages komprimiert ab."""
+    s3 = s3 or get_s3_fs()
+    bucket_name = bucket_name or st.secrets['aws']['S3_BUCKET_NAME']
+    payload = gzip.compress(json.dumps(orders_data, separators=(',', ':')).encode('utf-8'))
+    with s3.open(raw_archive_path(bucket_name, date), 'wb') as f:
+        f.write(payload)
+    return len(payload)
+
+def list_archived_dates(s3=None, bucket_name=None):
+    """Alle archivierten Tage als Dict Datum -> Pfad."""
+    s3 = s3 or get_s3_fs()
+    bucket_name = bucket_name or st.secrets['aws']['S3_BUCKET_NAME']
+    prefix = f"{bucket_name}/{RAW_PREFIX}"
+    if not s3.exists(prefix):
+        return {}
+
+    archived = {}
+    for path in s3.find(prefix):
+        name = path.rsplit('/', 1)[-1]
+        if name.endswith('.json.gz'):
+            try:
+                archived[pd.Timestamp(name[:-len('.json.gz')]).date()] = path
+            except ValueError:
+                continue
+    return archived
+
+def load_raw_orders(date, s3=None, bucket_name=None):
+    s3 = s3 or get_s3_fs()
+    bucket_name = bucket_name or st.secrets['aws']['S3_BUCKET_NAME']
+    with s3.open(raw_archive_path(bucket_name, date), 'rb') as f:
+        return json.loads(gzip.decompress(f.read()))
+
+def replay_archive(start_date, end_date, workers=None):
+    """Verarbeitet die archivierten Tage im Zeitraum erneut mit process_orders, ohne Billbee abzufragen.
+
+    Die Archive werden gebündelt geladen, auf Prozesse verteilt entpackt und verarbeitet
+    und anschließend in einem gesammelten Store-Update geschrieben. Liefert die Anzahl der Tage.
+    """
+    s3 = get_s3_fs()
+    bucket_name = st.secrets['aws']['S3_BUCKET_NAME']
+    start, end = pd.Timestamp(start_date).date(), pd.Timestamp(end_date).date()
+    archived = {date: path for date, path in list_archived_dates(s3, bucket_name).items() if start <= date <= end}
+    if not archived:
+        logger.warning(f"Keine archivierten Rohdaten zwischen {start} und {end}.")
+        return 0
+
+    dates = sorted(archived)
+    # Ein gebündelter, nebenläufiger Abruf; die Schlüssel werden über den Dateinamen zugeordnet
+    fetched = {path.rsplit('/', 1)[-1]: data for path, data in s3.cat([archived[date] for date in dates]).items()}
+    payloads = [fetched[archived[date].rsplit('/', 1)[-1]] for date in dates]
+
+    workers = workers or get_worker_count()
+    if workers > 1 and len(dates) > 1:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            frames = list(pool.map(process_archived_orders, payloads, chunksize=max(1, len(dates) // (4 * workers))))
+    else:
+        frames = [process_archived_orders(payload) for payload in payloads]
+
+    write_sales_batch(dict(zip(dates, frames)), s3, bucket_name)
+    logger.info(f"{len(dates)} Tage aus dem Rohdatenarchiv neu verarbeitet.")
+    return len(dates)
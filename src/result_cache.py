@@ -0,0 +1,198 @@
+import os
+import sys
+import time
+import functools
+import logging
+import threading
+import numpy as np
+import pandas as pd
+from collections import Counter, OrderedDict
+from src.single_flight import copy_result
+
+logger = logging.getLogger(__name__)
+
+# Speicherbudget des Ergebnis-Caches in MB, über RESULT_CACHE_MB einstellbar
+DEFAULT_BUDGET_MB = 512
+# Werte je object-Spalte, aus deren Größe der Speicher der ganzen Spalte geschätzt wird
+SIZE_SAMPLE = 32
+
+def _object_bytes(column):
+    """Geschätzter Speicher der Python-Objekte einer object-Spalte, hochgerechnet aus einer Stichprobe."""
+    if column.dtype != object or len(column) == 0:
+        return 0
+    values = column.to_numpy()
+    sample = values[::max(len(values) // SIZE_SAMPLE, 1)][:SIZE_SAMPLE]
+    return int(sum(sys.getsizeof(item) for item in sample) * len(values) / len(sample))
+
+def deep_size(value, _seen=None):
+    """Speicherbedarf in Bytes einschließlich enthaltener DataFrames, Arrays und Container.
+
+    Spalten werden über ihren dtype gemessen, bei object-Spalten wird der Speicher der
+    Python-Objekte geschätzt statt jeden Wert zu messen (memory_usage(deep=True) kostet
+    bei vielen kleinen DataFrames Sekunden).
+    """
+    seen = set() if _seen is None else _seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, pd.DataFrame):
+        size = value.index.nbytes + _object_bytes(value.index)
+        for position, dtype in enumerate(value.dtypes):
+            if isinstance(dtype, np.dtype) and dtype != object:
+                size += dtype.itemsize * len(value)
+            else:
+                column = value.iloc[:, position]
+                size += column.array.nbytes + _object_bytes(column)
+        return int(size)
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.nbytes) + _object_bytes(value)
+    if isinstance(value, np.ndarray):
+        return sys.getsizeof(value) + (value.nbytes if value.base is not None else 0)
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(deep_size(key, seen) + deep_size(item, seen) for key, item in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(deep_size(item, seen) for item in value)
+    return size
+
+class _Entry:
+    __slots__ = ('value', 'version', 'size', 'cost', 'priority')
+
+    def __init__(self, value, version, size, cost):
+        self.value = value
+        self.version = version
+        self.size = size
+        self.cost = cost
+        self.priority = 0.0
+
+class ResultCache:
+    """Ergebnis-Cache mit festem Speicherbudget, Einträge gehören zu einer Datenversion.
+
+    Verdrängt wird nach GreedyDual-Size: jeder Eintrag hat die Priorität L + Kosten/Größe
+    (Kosten = Rechenzeit in Sekunden, Größe = deep_size), der Eintrag mit der niedrigsten
+    Priorität fällt zuerst heraus und hebt L auf dessen Priorität an. Teure, kleine
+    Ergebnisse bleiben so länger erhalten als billige, große; bei gleichen Kosten je Byte
+    entspricht das LRU. Mit retire werden alle Einträge früherer Datenversionen verworfen.
+    stats zählt je Name 'hits', 'misses', 'evictions' und 'invalidations'.
+    """
+
+    def __init__(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self.version = None
+        self._retired = set()
+        self._entries = OrderedDict()
+        self._clock = 0.0
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = Counter()
+
+    def _priority(self, entry):
+        return self._clock + entry.cost / max(entry.size, 1)
+
+    def retire(self, version):
+        """Macht version zur aktuellen Datenversion und verwirft die Einträge aller anderen.
+
+        Liefert False für eine bereits abgelöste Version; deren Ergebnisse werden nicht
+        mehr zwischengespeichert.
+        """
+        with self._lock:
+            if version == self.version:
+                return True
+            if version in self._retired:
+                return False
+            if self.version is not None:
+                self._retired.add(self.version)
+            self.version = version
+            for key in [key for key, entry in self._entries.items() if entry.version != version]:
+                self._drop(key, 'invalidations')
+            return True
+
+    def get(self, key):
+        """(True, Wert) bei einem Treffer, sonst (False, None)."""
+        name = key[0]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats[(name, 'misses')] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            entry.priority = self._priority(entry)
+            self.stats[(name, 'hits')] += 1
+            return True, entry.value
+
+    def put(self, key, version, value, cost):
+        """Legt value ab, sofern es ins Budget passt und zur aktuellen Datenversion gehört."""
+        size = deep_size(value)
+        with self._lock:
+            if version != self.version or size > self.budget_bytes:
+                return False
+            if key in self._entries:
+                self._drop(key)
+            entry = _Entry(value, version, size, cost)
+            entry.priority = self._priority(entry)
+            self._entries[key] = entry
+            self._bytes += size
+            while self._bytes > self.budget_bytes:
+                victim = min(self._entries, key=lambda k: self._entries[k].priority)
+                self._clock = self._entries[victim].priority
+                self._drop(victim, 'evictions')
+            return key in self._entries
+
+    def _drop(self, key, reason=None):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        if reason:
+            self.stats[(key[0], reason)] += 1
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._drop(key, 'invalidations')
+
+    def summary(self):
+        """Zähler je Name sowie Belegung: {'names': {...}, 'entries', 'bytes', 'budget_bytes', 'version'}."""
+        with self._lock:
+            sizes = Counter()
+            for key, entry in self._entries.items():
+                sizes[key[0]] += entry.size
+            names = sorted({name for name, _ in self.stats} | set(sizes))
+            return {
+                'names': {name: {**{kind: self.stats[(name, kind)] for kind in ('hits', 'misses', 'evictions', 'invalidations')},
+                                 'bytes': sizes[name]} for name in names},
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'budget_bytes': self.budget_bytes,
+                'version': self.version,
+            }
+
+result_cache = ResultCache(int(float(os.environ.get("RESULT_CACHE_MB", DEFAULT_BUDGET_MB)) * 1024 * 1024))
+
+def cached(key_fn, version_fn, copy=copy_result):
+    """Dekorator: Ergebnisse je (Datenversion, key_fn(*args, **kwargs)) im result_cache.
+
+    Ohne ermittelbare oder bei bereits abgelöster Datenversion wird direkt gerechnet.
+    Leere Ergebnisse (None, leere DataFrames) werden nicht abgelegt, sie stammen meist
+    aus Fehlerpfaden. Aufrufer erhalten Kopien, damit der abgelegte Wert unverändert bleibt.
+    """
+    copy = copy or (lambda value: value)
+
+    def decorator(fn):
+        name = f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            version = version_fn()
+            if version is None or not result_cache.retire(version):
+                return fn(*args, **kwargs)
+            key = (name, version) + tuple(key_fn(*args, **kwargs))
+            found, value = result_cache.get(key)
+            if found:
+                return copy(value)
+            started = time.perf_counter()
+            value = fn(*args, **kwargs)
+            if value is not None and not getattr(value, 'empty', False):
+                result_cache.put(key, version, value, time.perf_counter() - started)
+                value = copy(value)
+            return value
+        return wrapper
+    return decorator
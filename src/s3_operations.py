@@ -4,115 +4,166 @@ import numpy as np
 from datetime import datetime, timedelta
 from src.s3_utils import get_s3_fs
 import logging
-from src.sku_names import SKU_NAMES
+from src.sku_registry import sku_registry, add_sku_codes
 import json
-from src.inventory_management import load_initial_inventory, load_supplier_deliveries
-from src.trend_analysis import calculate_trend
+from src.inventory_management import load_initial_inventory, load_supplier_deliveries, get_inventory_version
+from src.daily_matrix import build_daily_matrix
+from src.bill_of_materials import expand_daily_matrix, daily_rows
+from src.sku_hierarchy import SKU_LEVEL, group_codes, group_labels, group_names, label_names, segments, sku_groups, rollup_matrix
+from src.inventory_simulation import stockout_summary
+from src.stock_levels import build_stock_levels, in_stock_demand
+from src.sales_store import (list_partitions, partitions_version, covered_dates,
+                             write_sales_batch, read_sales, current_trends, load_platform_cube)
+from src.platform_cube import UNKNOWN_PLATFORM
+from src.trend_state import HISTORY_START
 from datetime import datetime, timedelta
 from src.billbee_api import billbee_api
 from src.data_processor import process_orders
+from src.raw_archive import archive_raw_orders
+from src.anomaly_detection import check_new_days
+from src.single_flight import coalesce, freeze
+from src.result_cache import cached
+from src.artifacts import artifact_tag, read_artifact
+from src.sales_snapshot import load_sales_snapshot
 import time
 
 # Setze das Logging-Level für dieses Modul auf WARNING
 logging.basicConfig(level=logging.WARNING)
 logger = logging.getLogger(__name__)
 
-SALES_FILE = "all_sales_data_original_sku.csv"
+SUMMARY_COLUMNS = ['SKU', 'SKU_Name', 'Last30DaysQuantity', 'AvgDailyQuantity', 'StockoutDays', 'CurrentQuantity', 'PlannedDeliveries',
+                   'InventoryDays', 'AdjustedInventoryDays', 'AdjustedInventoryDaysWithDeliveries', 'Trend', 'Platforms',
+                   'StockoutProb14d', 'StockoutProb30d', 'StockoutProb60d', 'ExpectedStockoutDate', 'ReorderPoint']
 
 def save_to_s3(new_data, date, overwrite=False):
+    """Speichert die Verkäufe eines Tages.
+
+    Bereits gespeicherte Tage werden ohne overwrite über Bestell- und Positions-ID
+    abgeglichen, sodass ein erneuter Abruf keine Bestellung doppelt zählt.
+    """
     try:
         s3 = get_s3_fs()
         bucket_name = st.secrets['aws']['S3_BUCKET_NAME']
-        full_path = f"{bucket_name}/{SALES_FILE}"
-        
-        new_data['Date'] = pd.to_datetime(date).date()
+        date = pd.to_datetime(date).date()
         
-        if s3.exists(full_path):
-            existing_data = load_existing_data(s3, full_path)
-            existing_data['Date'] = pd.to_datetime(existing_data['Date']).dt.date
-            if overwrite:
-                existing_data = existing_data[existing_data['Date'] != new_data['Date'].iloc[0]]
-            elif date_exists(existing_data, new_data['Date'].iloc[0]):
-                logger.info(f"Daten für {date} existieren bereits. Überspringe diesen Tag.")
-                return SALES_FILE
-            combined_data = pd.concat([existing_data, new_data], ignore_index=True)
-        else:
-            combined_data = new_data
+        # Der Abgleich erfolgt auf dem Stand, auf den der Manifest-Commit aufsetzt
+        partitions = write_sales_batch({date: new_data}, s3, bucket_name, upsert=not overwrite)
+        logger.info(f"Daten für {date} {'gespeichert' if overwrite else 'abgeglichen'}.")
         
-        combined_data['Date'] = pd.to_datetime(combined_data['Date']).dt.date
-        combined_data = combined_data.sort_values('Date')
-        save_combined_data(s3, full_path, combined_data)
-        logger.info(f"Neue Daten für {date} gespeichert.")
-        
-        return SALES_FILE
+        return (partitions['day'].get(date) or partitions['month'].get(pd.Period(date, freq='M'))
+                or partitions['year'].get(pd.Period(date, freq='Y')))
     except Exception as e:
         logger.error(f"Fehler beim Speichern in S3: {str(e)}")
         raise
 
-def load_existing_data(s3, full_path):
-    with s3.open(full_path, 'r') as f:
-        data = pd.read_csv(f, parse_dates=['Date'])
-    data['Quantity'] = data['Quantity'].astype(int)
-    data['Date'] = data['Date'].dt.date  # Convert to datetime.date objects
-    data['Platform'] = data['Platform'].astype(str)  # Ensure Platform is loaded as string
-    return data
+def load_sales(start_date=None, end_date=None, skus=None, platforms=None, columns=None):
+    """Lädt Verkäufe im Zeitraum [start_date, end_date], optional nur für bestimmte SKUs und Plattformen.
 
-def date_exists(data, date):
-    return date in set(data['Date'])  # Use set for faster lookup
+    Zeitraum, Spalten und Filter werden an den Partitionsspeicher durchgereicht, der
+    Speicherbedarf richtet sich daher nach dem Ergebnis, nicht nach der gesamten
+    Historie. Enthält das Ergebnis die SKU, wird die Spalte SKUCode ergänzt.
+    """
+    data = read_sales(start_date, end_date, columns, skus, platforms)
+    if 'Quantity' in data.columns:
+        data['Quantity'] = data['Quantity'].astype(int)
+    if 'Platform' in data.columns:
+        data['Platform'] = data['Platform'].astype(str)  # Ensure Platform is loaded as string
+    return add_sku_codes(data) if 'SKU' in data.columns else data
 
-def save_combined_data(s3, full_path, combined_data):
-    with s3.open(full_path, 'w') as f:
-        combined_data.to_csv(f, index=False)
+def load_existing_data(start_date=None, end_date=None):
+    return load_sales(start_date, end_date)
 
-def get_all_data_since_date(start_date):
-    """Holt alle Daten seit einem bestimmten Datum."""
+def date_exists(partitions, date):
+    return date in covered_dates(partitions)
+
+@coalesce(lambda start_date=None, end_date=None, skus=None, platforms=None, columns=None:
+          (start_date, end_date, freeze(skus), freeze(platforms), freeze(columns)))
+def get_sales_data(start_date=None, end_date=None, skus=None, platforms=None, columns=None):
+    """Wie load_sales, liefert bei Fehlern aber ein leeres DataFrame mit den angefragten Spalten."""
     try:
-        s3 = get_s3_fs()
-        bucket_name = st.secrets['aws']['S3_BUCKET_NAME']
-        full_path = f"{bucket_name}/{SALES_FILE}"
-        
-        if s3.exists(full_path):
-            with s3.open(full_path, 'r') as f:
-                all_data = pd.read_csv(f, parse_dates=['Date'])
-            all_data['Date'] = pd.to_datetime(all_data['Date']).dt.date
-            start_date = pd.to_datetime(start_date).date()
-            return all_data[all_data['Date'] >= start_date]
-        else:
+        all_data = load_sales(start_date, end_date, skus, platforms, columns)
+        if all_data.empty:
             logger.warning("Keine Verkaufsdaten gefunden.")
-            return pd.DataFrame(columns=['Date', 'SKU', 'Quantity', 'Platform'])
+        return all_data
     except Exception as e:
         logger.error(f"Fehler beim Laden der Daten aus S3: {str(e)}")
-        return pd.DataFrame(columns=['Date', 'SKU', 'Quantity', 'Platform'])
+        columns = list(columns or ['Date', 'SKU', 'Quantity', 'Platform'])
+        return pd.DataFrame(columns=columns + ['SKUCode'] if 'SKU' in columns else columns)
+
+def get_all_data_since_date(start_date):
+    """Holt alle Daten seit einem bestimmten Datum."""
+    return get_sales_data(start_date)
+
+def get_data_version():
+    """Liefert eine Kennung für den aktuellen Stand der Verkaufsdaten."""
+    try:
+        return partitions_version(list_partitions())
+    except Exception as e:
+        logger.error(f"Fehler beim Ermitteln der Datenversion: {str(e)}")
+        return None
+
+# Die Zusammenfassung hängt außer von den Verkäufen vom Bestand und vom aktuellen Tag ab
+@cached(lambda days=30, components=False, level=SKU_LEVEL: (days, components, level, get_inventory_version(), datetime.now().date()),
+        get_data_version)
+@coalesce(lambda days=30, components=False, level=SKU_LEVEL: (days, components, level))
+def get_summary_data(days=30, components=False, level=SKU_LEVEL):
+    """Zusammenfassung der Verkaufsdaten, vorberechnet aus dem Artefakt oder live berechnet."""
+    summary_data = read_artifact(summary_artifact(days, components, level), summary_tag())
+    if summary_data is not None:
+        return summary_data
+    return compute_summary_data(days, components, level)
 
-def get_summary_data(days=30):
-    """Erstellt eine Zusammenfassung der Verkaufsdaten."""
+def summary_artifact(days=30, components=False, level=SKU_LEVEL):
+    return f"summary-{days}-{level}" + ("-components" if components else "")
+
+def summary_tag():
+    """Stand der Zusammenfassung: Verkäufe, Bestand und aktueller Tag."""
+    return artifact_tag(get_data_version(), get_inventory_version(), datetime.now().date())
+
+def compute_summary_data(days=30, components=False, level=SKU_LEVEL):
+    """Erstellt eine Zusammenfassung der Verkaufsdaten.
+
+    Mit components werden Sets gemäß Stückliste in ihre Komponenten aufgelöst, sodass
+    Absatz, Reichweiten, Trends und Simulationen auf dem Bedarf der Einzelartikel beruhen.
+    level fasst die Zusammenfassung auf Eltern-SKU- oder Familienebene zusammen.
+    """
     try:
         logger.info("Starting get_summary_data function")
-        start_date = datetime(2024, 1, 1).date()  # Angepasst auf 01.01.2024
-        all_data = get_all_data_since_date(start_date)
+        # Aus dem lokalen Snapshot der Tagesmatrix, sonst aus den Verkaufszeilen des Speichers
+        snapshot = load_sales_snapshot()
+        all_data = snapshot.daily_rows() if snapshot is not None else get_all_data_since_date(HISTORY_START)
         
         if all_data.empty:
             logger.warning("No data available")
-            return pd.DataFrame(columns=['SKU', 'SKU_Name', 'Last30DaysQuantity', 'AvgDailyQuantity', 'CurrentQuantity', 'PlannedDeliveries', 'InventoryDays', 'AdjustedInventoryDays', 'AdjustedInventoryDaysWithDeliveries', 'Trend', 'Platforms'])
+            return pd.DataFrame(columns=SUMMARY_COLUMNS)
         
         all_data['Date'] = pd.to_datetime(all_data['Date'])
+        if components:
+            source = snapshot.daily_matrix() if snapshot is not None else build_daily_matrix(all_data)
+            all_data = add_sku_codes(daily_rows(expand_daily_matrix(source)))
         
         end_date = datetime.now().date() - timedelta(days=1)
         start_date_30d = end_date - timedelta(days=days-1)
         
-        all_data['SKU'] = all_data['SKU'].astype(str)
-        
+        if snapshot is not None and not components:
+            matrix = snapshot.daily_matrix(end_date=end_date)
+        else:
+            matrix = build_daily_matrix(all_data, end_date=end_date)
         summary_data = calculate_summary_data(all_data, start_date_30d)
+        summary_data = add_in_stock_demand(summary_data, matrix, days)
         summary_data = add_inventory_data(summary_data, all_data)
-        summary_data = add_trend_data(all_data, summary_data)
+        summary_data = add_trend_data(all_data, summary_data, components)
         summary_data = calculate_inventory_days(summary_data)
+        summary_data = add_stockout_simulation(summary_data, matrix, end_date)
         summary_data = add_sku_names(summary_data)
         summary_data = add_platform_data(all_data, summary_data)
+        if level != SKU_LEVEL:
+            summary_data = rollup_summary(summary_data, matrix, end_date, level, components)
         
         return sort_summary_data(summary_data)
     except Exception as e:
         logger.error(f"Error in get_summary_data: {str(e)}", exc_info=True)
-        return pd.DataFrame(columns=['SKU', 'SKU_Name', 'Last30DaysQuantity', 'AvgDailyQuantity', 'CurrentQuantity', 'PlannedDeliveries', 'InventoryDays', 'AdjustedInventoryDays', 'AdjustedInventoryDaysWithDeliveries', 'Trend', 'Platforms'])
+        return pd.DataFrame(columns=SUMMARY_COLUMNS)
 
 
 def calculate_summary_data(all_data, start_date_30d):
@@ -123,25 +174,32 @@ def calculate_summary_data(all_data, start_date_30d):
     # Filtere die Daten für die letzten 30 Tage
     last_30d_data = all_data[all_data['Date'] >= start_date_30d]
     
+    # Zeilen aus dem Snapshot fassen einen Tag zusammen, Lines zählt ihre Bestellpositionen;
+    # Zeilen aus dem Speicher sind je eine Bestellposition
+    if 'Lines' not in last_30d_data.columns:
+        last_30d_data = last_30d_data.assign(Lines=1)
+    
     # Berechne die Zusammenfassung für die letzten 30 Tage
-    summary_data = last_30d_data.groupby('SKU').agg({
-        'Quantity': ['sum', 'count'],
+    summary_data = last_30d_data.groupby('SKUCode').agg({
+        'Quantity': 'sum',
+        'Lines': 'sum',
         'Date': ['min', 'max']
     }).reset_index()
-    summary_data.columns = ['SKU', 'Last30DaysQuantity', 'DaysWithSales', 'FirstDate', 'LastDate']
+    summary_data.columns = ['SKUCode', 'Last30DaysQuantity', 'DaysWithSales', 'FirstDate', 'LastDate']
     
     # Berechne AvgDailyQuantity basierend auf den letzten 30 Tagen
     summary_data['AvgDailyQuantity'] = summary_data['Last30DaysQuantity'] / 30
     
     # Füge Informationen über den gesamten Zeitraum hinzu
-    total_data = all_data.groupby('SKU').agg({
+    total_data = all_data.groupby('SKUCode').agg({
         'Quantity': 'sum',
         'Date': ['min', 'max']
     }).reset_index()
-    total_data.columns = ['SKU', 'TotalQuantity', 'FirstEverDate', 'LastEverDate']
+    total_data.columns = ['SKUCode', 'TotalQuantity', 'FirstEverDate', 'LastEverDate']
     
     # Verknüpfe die Daten
-    summary_data = pd.merge(summary_data, total_data, on='SKU', how='outer')
+    summary_data = pd.merge(summary_data, total_data, on='SKUCode', how='outer')
+    summary_data['SKU'] = sku_registry.decode(summary_data['SKUCode'])
     
     # Fülle NaN-Werte für SKUs, die in den letzten 30 Tagen keine Verkäufe hatten
     summary_data['Last30DaysQuantity'] = summary_data['Last30DaysQuantity'].fillna(0)
@@ -149,27 +207,38 @@ def calculate_summary_data(all_data, start_date_30d):
     
     return summary_data
 
+def add_in_stock_demand(summary_data, matrix, days=30):
+    """Ersetzt AvgDailyQuantity durch die Verkaufsmenge je Tag mit Ware.
+
+    Grundlage ist der tägliche Bestandsverlauf aus Anfangsbestand, Anlieferungen und
+    Verkäufen; Stock-out-Tage im Zeitraum werden nicht mitgezählt.
+    """
+    levels = build_stock_levels(matrix, load_initial_inventory(), load_supplier_deliveries())
+    demand = in_stock_demand(matrix, levels, days)[['SKU', 'StockoutDays', 'InStockDays']]
+    summary_data = pd.merge(summary_data, demand, on='SKU', how='left')
+    summary_data['StockoutDays'] = summary_data['StockoutDays'].fillna(0)
+    in_stock_days = summary_data['InStockDays'].fillna(days).clip(lower=1)
+    summary_data['AvgDailyQuantity'] = summary_data['Last30DaysQuantity'] / in_stock_days
+    return summary_data.drop(columns=['InStockDays'])
+
 def add_inventory_data(summary_data, all_data):
     """Fügt Bestandsdaten zur Zusammenfassung hinzu und berechnet die CurrentQuantity korrekt."""
     try:
         initial_inventory = load_initial_inventory()
         supplier_deliveries = load_supplier_deliveries()
         
-        initial_inventory['SKU'] = initial_inventory['SKU'].astype(str)
-        supplier_deliveries['SKU'] = supplier_deliveries['SKU'].astype(str)
-        
         # Ensure Date column is datetime
         initial_inventory['Date'] = pd.to_datetime(initial_inventory['Date'])
         
         # Merge initial inventory data
-        summary_data = pd.merge(summary_data, initial_inventory[['SKU', 'InitialQuantity', 'Date']], on='SKU', how='left')
+        summary_data = pd.merge(summary_data, initial_inventory[['SKUCode', 'InitialQuantity', 'Date']], on='SKUCode', how='left')
         
         # Process supplier deliveries
-        delivered = supplier_deliveries[supplier_deliveries['Status'] == 'Angeliefert'].groupby('SKU')['SupplierDelivery'].sum().reset_index(name='SupplierDelivery_Delivered')
-        planned = supplier_deliveries[supplier_deliveries['Status'].isin(['Bestellt', 'Bestätigt'])].groupby('SKU')['SupplierDelivery'].sum().reset_index(name='SupplierDelivery_Planned')
+        delivered = supplier_deliveries[supplier_deliveries['Status'] == 'Angeliefert'].groupby('SKUCode')['SupplierDelivery'].sum().reset_index(name='SupplierDelivery_Delivered')
+        planned = supplier_deliveries[supplier_deliveries['Status'].isin(['Bestellt', 'Bestätigt'])].groupby('SKUCode')['SupplierDelivery'].sum().reset_index(name='SupplierDelivery_Planned')
         
-        summary_data = pd.merge(summary_data, delivered, on='SKU', how='left')
-        summary_data = pd.merge(summary_data, planned, on='SKU', how='left')
+        summary_data = pd.merge(summary_data, delivered, on='SKUCode', how='left')
+        summary_data = pd.merge(summary_data, planned, on='SKUCode', how='left')
         
         # Fill NaN values with 0 and convert to float64
         for col in ['InitialQuantity', 'SupplierDelivery_Delivered', 'SupplierDelivery_Planned']:
@@ -179,21 +248,17 @@ def add_inventory_data(summary_data, all_data):
         summary_data['Date'] = pd.to_datetime(summary_data['Date'])
         all_data['Date'] = pd.to_datetime(all_data['Date'])
         
-        # Calculate CurrentQuantity correctly
-        def calculate_current_quantity(row):
-            initial_date = row['Date']
-            sales_after_initial = row['TotalQuantity'] - row['SalesBeforeInitial']
-            return row['InitialQuantity'] + row['SupplierDelivery_Delivered'] - sales_after_initial
-
-        # Calculate sales before initial inventory date
-        summary_data['SalesBeforeInitial'] = summary_data.apply(
-            lambda row: row['TotalQuantity'] if pd.isnull(row['Date']) 
-            else all_data[(all_data['SKU'] == row['SKU']) & (all_data['Date'] < row['Date'])]['Quantity'].sum(),
-            axis=1
-        )
+        # Calculate sales before initial inventory date (join on SKUCode instead of filtering per row)
+        initial_dates = summary_data[['SKUCode', 'Date']].rename(columns={'Date': 'InitialDate'}).reset_index()
+        sales_with_initial = pd.merge(all_data[['SKUCode', 'Date', 'Quantity']], initial_dates, on='SKUCode')
+        sales_before = sales_with_initial[sales_with_initial['Date'] < sales_with_initial['InitialDate']].groupby('index')['Quantity'].sum()
+        summary_data['SalesBeforeInitial'] = np.where(summary_data['Date'].isnull(),
+                                                      summary_data['TotalQuantity'],
+                                                      sales_before.reindex(summary_data.index).fillna(0))
         
-        # Apply the calculation
-        summary_data['CurrentQuantity'] = summary_data.apply(calculate_current_quantity, axis=1)
+        # Calculate CurrentQuantity correctly
+        sales_after_initial = summary_data['TotalQuantity'] - summary_data['SalesBeforeInitial']
+        summary_data['CurrentQuantity'] = summary_data['InitialQuantity'] + summary_data['SupplierDelivery_Delivered'] - sales_after_initial
         summary_data['PlannedDeliveries'] = summary_data['SupplierDelivery_Planned']
         
         # Calculate AdjustedInventoryDays and AdjustedInventoryDaysWithDeliveries
@@ -216,90 +281,198 @@ def calculate_inventory_days(summary_data):
                                              np.inf)
     return summary_data
 
-def add_trend_data(all_data, summary_data):
-    """Fügt Trenddaten zur Zusammenfassung hinzu."""
-    trend_data = all_data.groupby('SKU').apply(calculate_trend).reset_index()
-    trend_data.columns = ['SKU', 'Trend']
-    return pd.merge(summary_data, trend_data, on='SKU', how='left')
+def add_stockout_simulation(summary_data, matrix, end_date):
+    """Fügt Stock-out-Wahrscheinlichkeiten, erwartetes Stock-out-Datum und Meldebestand hinzu."""
+    stock = summary_data.set_index('SKU')['CurrentQuantity'].reindex(matrix.skus).fillna(0).clip(lower=0).to_numpy()
+    simulation = stockout_summary(matrix, stock, load_supplier_deliveries(), end_date + timedelta(days=1))
+    return pd.merge(summary_data, simulation, on='SKU', how='left')
+
+def add_trend_data(all_data, summary_data, components=False):
+    """Fügt Trenddaten zur Zusammenfassung hinzu.
+
+    Die Trends stammen aus dem beim Import gepflegten Trendzustand, die Historie wird
+    dafür nicht erneut durchlaufen.
+    """
+    trend_data = current_trends(components=components)[['SKU', 'Trend']]
+    trend_data['SKUCode'] = sku_registry.encode(trend_data['SKU'])
+    summary_data = pd.merge(summary_data, trend_data[['SKUCode', 'Trend']], on='SKUCode', how='left')
+    summary_data['Trend'] = summary_data['Trend'].fillna(0)
+    return summary_data
 
 def add_sku_names(summary_data):
     """Fügt SKU-Namen zur Zusammenfassung hinzu."""
-    summary_data['SKU_Name'] = summary_data['SKU'].map(SKU_NAMES)
+    summary_data['SKU_Name'] = sku_registry.names(summary_data['SKUCode'])
     return summary_data
 
 def add_platform_data(all_data, summary_data):
-    """Fügt Plattformdaten zur Zusammenfassung hinzu."""
-    def safe_join(x):
-        return ', '.join(sorted(set(str(item) for item in x if pd.notna(item))))
-    
-    platform_data = all_data.groupby('SKU')['Platform'].apply(safe_join).reset_index()
-    platform_data = platform_data.rename(columns={'Platform': 'Platforms'})
+    """Fügt die Plattformen mit Verkäufen je SKU aus dem Plattformwürfel hinzu."""
+    platform_data = load_platform_cube().sku_platforms()
     return pd.merge(summary_data, platform_data, on='SKU', how='left')
 
+def rollup_summary(summary_data, matrix, end_date, level, components=False):
+    """Fasst die SKU-Zusammenfassung auf Eltern-SKU- oder Familienebene zusammen.
+
+    Mengen, Bestände und Lieferungen werden je Gruppe in einer segmentierten Summe
+    addiert und die Reichweiten daraus neu berechnet. Trends stammen aus dem
+    zusammengefassten Trendzustand, die Stock-out-Simulation läuft auf der
+    zusammengefassten Tagesmatrix mit dem gemeinsamen Bestand der Gruppe.
+    """
+    codes = group_codes(sku_registry.encode(summary_data['SKU']), level)
+    order, starts, groups = segments(codes)
+    members = summary_data.iloc[order].assign(Stock=lambda df: df['CurrentQuantity'].clip(lower=0))
+    sums = ['Last30DaysQuantity', 'AvgDailyQuantity', 'CurrentQuantity', 'PlannedDeliveries', 'Stock']
+    rolled = pd.DataFrame(np.add.reduceat(members[sums].to_numpy('float64'), starts, axis=0), columns=sums)
+    rolled['StockoutDays'] = np.maximum.reduceat(members['StockoutDays'].to_numpy('float64'), starts)
+    rolled['SKU'] = group_labels(groups, level)
+    rolled['SKU_Name'] = group_names(groups, level)
+    rolled['Platforms'] = [', '.join(sorted({platform for value in chunk if isinstance(value, str) for platform in value.split(', ') if platform}))
+                           for chunk in np.split(members['Platforms'].to_numpy(), starts[1:])]
+
+    velocity = rolled['AvgDailyQuantity']
+    rolled['InventoryDays'] = np.where(velocity > 0, rolled['CurrentQuantity'] / velocity, np.inf)
+    rolled['AdjustedInventoryDays'] = rolled['InventoryDays']
+    rolled['AdjustedInventoryDaysWithDeliveries'] = np.where(
+        velocity > 0, (rolled['CurrentQuantity'] + rolled['PlannedDeliveries']) / velocity, np.inf)
+
+    trend_data = current_trends(components=components, level=level)[['SKU', 'Trend']]
+    rolled = pd.merge(rolled, trend_data, on='SKU', how='left')
+    rolled['Trend'] = rolled['Trend'].fillna(0)
+
+    group_matrix = rollup_matrix(matrix, level)
+    deliveries = load_supplier_deliveries()
+    deliveries['SKU'] = sku_groups(deliveries['SKU'], level)
+    stock = rolled.set_index('SKU')['Stock'].reindex(group_matrix.skus).fillna(0).to_numpy()
+    simulation = stockout_summary(group_matrix, stock, deliveries, end_date + timedelta(days=1))
+    return pd.merge(rolled.drop(columns=['Stock']), simulation, on='SKU', how='left')
+
 def sort_summary_data(summary_data):
     """Sortiert die Zusammenfassungsdaten."""
-    columns = ['SKU', 'SKU_Name', 'Last30DaysQuantity', 'AvgDailyQuantity', 'CurrentQuantity', 'PlannedDeliveries',
-               'InventoryDays', 'AdjustedInventoryDays', 'AdjustedInventoryDaysWithDeliveries', 'Trend', 'Platforms']
-    return summary_data[columns].sort_values('InventoryDays', ascending=True)
+    return summary_data[SUMMARY_COLUMNS].sort_values('InventoryDays', ascending=True)
 
-def get_daily_sales_data(days=30):
-    """Holt tägliche Verkaufsdaten."""
+def get_platform_names():
+    """Plattformen mit Verkäufen, für Plattformfilter."""
     try:
-        s3 = get_s3_fs()
-        bucket_name = st.secrets['aws']['S3_BUCKET_NAME']
-        full_path = f"{bucket_name}/{SALES_FILE}"
-        
-        if s3.exists(full_path):
-            all_data = load_existing_data(s3, full_path)
-            return process_daily_sales_data(all_data, days)
+        return sorted(platform for platform in load_platform_cube().platforms if platform != UNKNOWN_PLATFORM)
+    except Exception as e:
+        logger.error(f"Fehler beim Laden der Plattformen: {str(e)}")
+        return []
+
+def get_platform_shares(days=30, platforms=None):
+    """Menge und Anteil je Plattform in den letzten days Tagen."""
+    try:
+        end_date = pd.Timestamp.now().floor('D')
+        shares = load_platform_cube().platform_shares(end_date - pd.Timedelta(days=days - 1), end_date)
+        if platforms:
+            shares = shares[shares['Platform'].isin(platforms)]
+        return shares
+    except Exception as e:
+        logger.error(f"Fehler beim Berechnen der Plattformanteile: {str(e)}")
+        return pd.DataFrame(columns=['Platform', 'Quantity', 'Share'])
+
+def get_platform_daily_sales(days=90, platforms=None):
+    """Tägliche Verkäufe je Plattform (Zeilen: Tage, Spalten: Plattformen)."""
+    try:
+        end_date = pd.Timestamp.now().floor('D')
+        daily = load_platform_cube().platform_daily(end_date - pd.Timedelta(days=days - 1), end_date)
+        return daily[[platform for platform in daily.columns if platform in platforms]] if platforms else daily
+    except Exception as e:
+        logger.error(f"Fehler beim Abrufen der Plattformverläufe: {str(e)}")
         return pd.DataFrame()
+
+def get_period_comparison(days=30, platforms=None, level=SKU_LEVEL):
+    """Vergleich der Verkaufszeiträume, ohne Plattformfilter aus dem vorberechneten Artefakt."""
+    if not platforms:
+        comparison = read_artifact(comparison_artifact(days, level), comparison_tag())
+        if comparison is not None:
+            return comparison
+    return compute_period_comparison(days, platforms, level)
+
+def comparison_artifact(days=30, level=SKU_LEVEL):
+    return f"comparison-{days}-{level}"
+
+def comparison_tag():
+    return artifact_tag(get_data_version(), datetime.now().date())
+
+def compute_period_comparison(days=30, platforms=None, level=SKU_LEVEL):
+    """Verkäufe je SKU (bzw. Gruppe der Ebene) in den letzten days Tagen und in den days Tagen davor (bis heute).
+
+    Enthält alle Einträge mit Verkäufen in mindestens einem der Zeiträume, der andere zählt
+    dann 0 (SKU, SKU_Name, Quantity_last, Quantity_previous).
+    """
+    try:
+        end_date = pd.Timestamp.now().floor('D')
+        matrix = load_platform_cube().daily_matrix(end_date - pd.Timedelta(days=2 * days - 1), end_date, platforms)
+        matrix = rollup_matrix(matrix, level)
+        comparison = pd.DataFrame({
+            'SKU': matrix.skus.astype(str),
+            'SKU_Name': label_names(matrix.skus, level),
+            'Quantity_last': matrix.values[:, -days:].sum(axis=1),
+            'Quantity_previous': matrix.values[:, :days].sum(axis=1),
+        })
+        return comparison[(comparison['Quantity_last'] > 0) | (comparison['Quantity_previous'] > 0)].reset_index(drop=True)
+    except Exception as e:
+        logger.error(f"Fehler beim Vergleich der Verkaufszeiträume: {str(e)}")
+        return pd.DataFrame(columns=['SKU', 'SKU_Name', 'Quantity_last', 'Quantity_previous'])
+
+def get_daily_sales_data(days=30, platforms=None, level=SKU_LEVEL):
+    """Tägliche Verkäufe je SKU bzw. Gruppe der Ebene (Zeilen: Tage, Spalten: SKUs) aus dem Plattformwürfel."""
+    try:
+        end_date = pd.Timestamp.now().floor('D')
+        matrix = load_platform_cube().daily_matrix(end_date - pd.Timedelta(days=days), end_date, platforms)
+        matrix = rollup_matrix(matrix, level)
+        if len(matrix.skus) == 0:
+            return pd.DataFrame()
+        return pd.DataFrame(matrix.values.T, index=matrix.dates, columns=matrix.skus.astype(str))
     except Exception as e:
         logger.error(f"Fehler beim Abrufen der täglichen Verkaufsdaten: {str(e)}")
         return pd.DataFrame()
 
-def process_daily_sales_data(all_data, days):
-    """Verarbeitet die täglichen Verkaufsdaten."""
-    all_data['Date'] = pd.to_datetime(all_data['Date'])
-    all_data['SKU'] = all_data['SKU'].astype(str)
-    
-    end_date = pd.Timestamp.now().floor('D')
-    start_date = end_date - pd.Timedelta(days=days)
-    
-    filtered_data = all_data[(all_data['Date'] >= start_date) & (all_data['Date'] <= end_date)]
-    
-    date_range = pd.date_range(start=start_date, end=end_date)
-    
-    daily_sales = filtered_data.pivot_table(
-        values='Quantity', 
-        index='Date', 
-        columns='SKU', 
-        aggfunc='sum'
-    ).reindex(date_range).fillna(0)
-    
-    return daily_sales
+def get_monthly_sales(start_date, end_date, platforms=None, level=SKU_LEVEL):
+    """Monatssummen des Zeitraums; ganze Monate ohne Plattformfilter aus dem vorberechneten Artefakt.
+
+    Das Artefakt enthält alle Monate seit HISTORY_START bis heute. Es passt, wenn der
+    Zeitraum an einem Monatsanfang beginnt und an einem Monatsende oder nach heute endet.
+    """
+    start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+    if (not platforms and start.day == 1 and start >= pd.Timestamp(HISTORY_START)
+            and (end.is_month_end or end >= pd.Timestamp.now().floor('D'))):
+        monthly = read_artifact(monthly_artifact(level), artifact_tag(get_data_version()))
+        if monthly is not None:
+            return monthly[monthly['Date'].between(start, end + pd.offsets.MonthEnd(0))].reset_index(drop=True)
+    return compute_monthly_sales(start_date, end_date, platforms, level)
+
+def monthly_artifact(level=SKU_LEVEL):
+    return f"monthly-{level}"
+
+def compute_monthly_sales(start_date, end_date, platforms=None, level=SKU_LEVEL):
+    """Monatliche Verkäufe je SKU bzw. Gruppe der Ebene (Date = Monatsende, SKU, SKU_Name, Quantity) aus dem Plattformwürfel."""
+    columns = ['Date', 'SKU', 'SKU_Name', 'Quantity']
+    try:
+        matrix = rollup_matrix(load_platform_cube().daily_matrix(start_date, end_date, platforms), level)
+        if len(matrix.skus) == 0:
+            return pd.DataFrame(columns=columns)
+        months = matrix.dates.to_period('M')
+        starts = np.flatnonzero(np.r_[True, months[1:] != months[:-1]])
+        values = np.add.reduceat(matrix.values, starts, axis=1)
+        rows, cols = np.nonzero(values)
+        return pd.DataFrame({
+            'Date': months[starts][cols].to_timestamp(how='end').normalize(),
+            'SKU': matrix.skus[rows].astype(str),
+            'SKU_Name': label_names(matrix.skus, level)[rows],
+            'Quantity': values[rows, cols],
+        }, columns=columns)
+    except Exception as e:
+        logger.error(f"Fehler beim Abrufen der Monatsverkäufe: {str(e)}")
+        return pd.DataFrame(columns=columns)
 
 def get_missing_dates(start_date, end_date):
-    s3 = get_s3_fs()
-    bucket_name = st.secrets['aws']['S3_BUCKET_NAME']
-    full_path = f"{bucket_name}/{SALES_FILE}"
-    
-    if s3.exists(full_path):
-        with s3.open(full_path, 'r') as f:
-            all_data = pd.read_csv(f, parse_dates=['Date'])
-        
-        all_dates = set(all_data['Date'].dt.date)
-        
-        all_possible_dates = set(pd.date_range(start=start_date, end=end_date).date)
-        
-        missing_dates = sorted(all_possible_dates - all_dates)
-        
-        return missing_dates
-    else:
-        return list(pd.date_range(start=start_date, end=end_date).date)
+    all_dates = covered_dates(list_partitions())
+    all_possible_dates = set(pd.date_range(start=start_date, end=end_date).date)
+    return sorted(all_possible_dates - all_dates)
 
 def get_missing_dates_last_30_days():
     all_dates = set(pd.date_range(end=datetime.now().date(), periods=30).date)
-    existing_dates = set(get_all_data_since_date(datetime.now().date() - timedelta(days=30))['Date'].dt.date)
+    existing_dates = set(get_sales_data(datetime.now().date() - timedelta(days=30), columns=['Date'])['Date'])
     missing_dates = sorted(all_dates - existing_dates)
     return missing_dates[0] if missing_dates else None, missing_dates[-1] if missing_dates else None
 
@@ -333,16 +506,37 @@ def update_data(date=None, overwrite_existing_data=False):
     current_date = end_date
     total_days = (end_date - last_import_date).days + 1
     days_processed = 0
+    imported_dates = []
+    failed_dates = []
     
     while current_date >= last_import_date:
-        orders_data = billbee_api.get_orders(current_date, current_date + timedelta(days=1))
+        try:
+            orders_data = billbee_api.get_orders(current_date, current_date + timedelta(days=1), raise_errors=True)
+        except Exception as e:
+            # Ohne Antwort wird nichts geschrieben: der Tag bleibt fehlend und wird erneut abgerufen
+            logger.error(f"Bestellungen für {current_date} konnten nicht abgerufen werden: {str(e)}")
+            failed_dates.append(current_date)
+            current_date -= timedelta(days=1)
+            continue
+        try:
+            archive_raw_orders(current_date, orders_data, s3, bucket_name)
+        except Exception as e:
+            logger.error(f"Fehler beim Archivieren der Rohdaten für {current_date}: {str(e)}")
         processed_orders = process_orders(orders_data)
         save_to_s3(processed_orders, current_date, overwrite_existing_data)
+        imported_dates.append(current_date)
         
         current_date -= timedelta(days=1)
         days_processed += 1
 
+    # Der nächste Import beginnt beim frühesten Tag, der nicht abgerufen werden konnte
     with s3.open(last_import_path, 'w') as f:
-        f.write(end_date.strftime("%Y-%m-%d"))
+        f.write(min(failed_dates, default=end_date).strftime("%Y-%m-%d"))
+
+    # Alle neuen Tage werden gemeinsam gegen ihre Vergleichsbasis geprüft
+    check_new_days(imported_dates, s3, bucket_name)
 
-    st.success(f"Bestellungen für {days_processed} Tage wurden erfolgreich verarbeitet.")
\ No newline at end of file
+    st.success(f"Bestellungen für {days_processed} Tage wurden erfolgreich verarbeitet.")
+    if failed_dates:
+        st.warning(f"Für {len(failed_dates)} Tage konnten keine Bestellungen abgerufen werden; "
+                   f"sie werden beim nächsten Import erneut abgerufen.")
\ No newline at end of file
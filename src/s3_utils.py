@@ -1,7 +1,40 @@
+import os
+import uuid
 import streamlit as st
 import s3fs
+from fsspec.implementations.dirfs import DirFileSystem
+from fsspec.implementations.local import LocalFileSystem
+
+# Ist die Variable gesetzt, liegen die Buckets als Verzeichnisse darunter statt in S3
+# (lokale Entwicklung und Lasttests)
+LOCAL_STORAGE_ENV = "PROCUREMENT_LOCAL_STORAGE"
+
+class LocalObjectStore(DirFileSystem):
+    """Verzeichnis als Ersatz für S3: Objekte werden wie ein PUT atomar geschrieben,
+    pipe_file(mode="create") schlägt wie If-None-Match fehl, wenn das Objekt existiert."""
+
+    def __init__(self, root):
+        super().__init__(path=root, fs=LocalFileSystem(auto_mkdir=True))
+
+    def pipe_file(self, path, value, mode="overwrite", **kwargs):
+        target = self._join(path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        temporary = f"{target}.{uuid.uuid4().hex}.tmp"
+        with open(temporary, 'wb') as f:
+            f.write(value)
+        try:
+            if mode == "create":
+                os.link(temporary, target)
+            else:
+                os.replace(temporary, target)
+        finally:
+            if os.path.exists(temporary):
+                os.unlink(temporary)
 
 def get_s3_fs():
+    local_root = os.environ.get(LOCAL_STORAGE_ENV)
+    if local_root:
+        return LocalObjectStore(local_root)
     return s3fs.S3FileSystem(
         key=st.secrets["aws"]["AWS_ACCESS_KEY_ID"],
         secret=st.secrets["aws"]["AWS_SECRET_ACCESS_KEY"],
@@ -0,0 +1,296 @@
+import os
+import json
+import uuid
+import fcntl
+import logging
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+from src.daily_matrix import DailyMatrix
+from src.sku_registry import sku_registry, add_sku_codes
+from src.sales_store import list_partitions, partitions_version, read_sales, get_bucket_name
+from src.trend_state import HISTORY_START
+
+logger = logging.getLogger(__name__)
+
+# Lokaler Snapshot der SKU×Tag-Matrix seit HISTORY_START: Mengen (float64) und Anzahl
+# Bestellpositionen (int32) liegen tageweise hintereinander als Rohdaten auf der Platte,
+# jede Zeile ein Tag mit sku_capacity Spalten. Neue Tage werden angehängt, neue SKUs
+# belegen freie Spalten; ein neuer Prozess bildet die Dateien per Memory-Map ab.
+# meta.json hält Datenversion, Startdatum, Tage, SKUs und die Partitionspfade des Stands,
+# die Kennzahlen je SKU liegen in einer eigenen npz-Datei.
+SNAPSHOT_DIR_ENV = "PROCUREMENT_SNAPSHOT_DIR"
+DEFAULT_SNAPSHOT_DIR = os.path.join(tempfile.gettempdir(), "procurement-snapshot")
+META_FILE = "meta.json"
+QUANTITY_DTYPE = np.float64
+LINES_DTYPE = np.int32
+# Freie SKU-Spalten, damit neue SKUs ohne Neuschreiben der Dateien Platz finden
+SKU_HEADROOM = 1.25
+MIN_SKU_CAPACITY = 64
+
+_lock = threading.Lock()
+_snapshots = {}
+
+def snapshot_dir(bucket_name=None):
+    return os.path.join(os.environ.get(SNAPSHOT_DIR_ENV, DEFAULT_SNAPSHOT_DIR), bucket_name or get_bucket_name())
+
+class SalesSnapshot:
+    """Tagesmatrizen eines Stands als Memory-Map: quantities und lines haben die Form (Tage, sku_capacity)."""
+
+    def __init__(self, version, start, skus, quantities, lines, aggregates):
+        self.version = version
+        self.skus = pd.Index(skus, dtype=object)
+        self.dates = pd.date_range(start, periods=quantities.shape[0], freq='D')
+        self.quantities = quantities
+        self.lines = lines
+        self.aggregates = aggregates
+
+    def _columns(self, start_date=None, end_date=None):
+        start = self.dates.searchsorted(pd.Timestamp(start_date)) if start_date is not None else 0
+        end = self.dates.searchsorted(pd.Timestamp(end_date), side='right') if end_date is not None else len(self.dates)
+        return slice(start, end)
+
+    def daily_matrix(self, start_date=None, end_date=None):
+        """SKU×Tag-Matrix wie build_daily_matrix auf den Verkaufszeilen des Zeitraums.
+
+        Ohne start_date beginnt sie am ersten Tag mit Verkäufen. Enthält der Zeitraum alle
+        SKUs, ist values eine Sicht auf die Memory-Map ohne Kopie.
+        """
+        if start_date is None and (self.aggregates['FirstDate'].notna()).any():
+            start_date = self.aggregates['FirstDate'].min()
+        days = self._columns(start_date, end_date)
+        n_skus = len(self.skus)
+        present = self.lines[days, :n_skus].any(axis=0)
+        dates = self.dates[days]
+        if not present.any():
+            return DailyMatrix(np.zeros((0, len(dates))), pd.Index([], dtype=object), dates)
+        if present.all():
+            return DailyMatrix(self.quantities[days, :n_skus].T, self.skus, dates)
+        return DailyMatrix(self.quantities[days][:, present].T, self.skus[present], dates)
+
+    def daily_rows(self, start_date=None, end_date=None):
+        """Eine Zeile je SKU und Tag mit Bestellpositionen (Date, SKU, SKUCode, Quantity, Lines)."""
+        days = self._columns(start_date, end_date)
+        lines = self.lines[days, :len(self.skus)]
+        day, column = np.nonzero(lines)
+        rows = pd.DataFrame({
+            'Date': self.dates[days][day],
+            'SKU': self.skus[column].to_numpy(),
+            'Quantity': self.quantities[days, :len(self.skus)][day, column],
+            'Lines': lines[day, column],
+        })
+        return add_sku_codes(rows)
+
+def _partition_ranges(partitions):
+    """Partitionsschlüssel -> [Pfad, erster Tag, letzter Tag] (Tage als ISO-Text, wie in meta.json)."""
+    ranges = {}
+    for kind in ('day', 'month', 'year'):
+        for period, path in partitions[kind].items():
+            if kind == 'day':
+                ranges[f"day/{period:%Y-%m-%d}"] = [path, f"{period:%Y-%m-%d}", f"{period:%Y-%m-%d}"]
+            else:
+                ranges[f"{kind}/{period}"] = [path, f"{period.start_time:%Y-%m-%d}", f"{period.end_time:%Y-%m-%d}"]
+    return ranges
+
+def _first_changed_day(meta, partitions):
+    """Erster Tag, ab dem sich der Stand gegenüber dem Snapshot geändert hat; None ohne Änderung.
+
+    Hinzugekommene, ersetzte und entfernte Partitionen zählen ab ihrem ersten Tag,
+    solche vollständig vor HISTORY_START gar nicht.
+    """
+    recorded = meta['partitions']
+    current = _partition_ranges(partitions)
+    history_start = f"{HISTORY_START:%Y-%m-%d}"
+    days = []
+    for key in set(recorded) | set(current):
+        old, new = recorded.get(key), current.get(key)
+        if old is not None and new is not None and old[0] == new[0]:
+            continue
+        _, first, last = new or old
+        if last >= history_start:
+            days.append(max(first, history_start))
+    return pd.Timestamp(min(days)) if days else None
+
+def _aggregate(sales):
+    """Menge und Positionen je (Tag, SKU) aus Verkaufszeilen, SKUs wie in add_sku_codes normalisiert."""
+    if sales.empty:
+        return pd.DataFrame(columns=['Date', 'SKU', 'Quantity', 'Lines'])
+    sales = sales.assign(Date=pd.to_datetime(sales['Date']), SKU=sku_registry.decode(sku_registry.encode(sales['SKU'])))
+    return sales.groupby(['Date', 'SKU'], sort=False).agg(Quantity=('Quantity', 'sum'), Lines=('Quantity', 'size')).reset_index()
+
+def _file(directory, kind, file_id):
+    return os.path.join(directory, f"{kind}-{file_id}.bin")
+
+def _map(directory, meta, kind, dtype, mode='r'):
+    shape = (meta['days'], meta['sku_capacity'])
+    if meta['days'] == 0:
+        return np.zeros(shape, dtype=dtype)
+    return np.memmap(_file(directory, kind, meta['file_id']), dtype=dtype, mode=mode, shape=shape)
+
+def _write_aggregates(directory, meta):
+    """Speichert Summe, Positionen, ersten und letzten Verkaufstag (Tagesnummer, -1 ohne Verkauf) je SKU."""
+    n_skus = len(meta['skus'])
+    quantities = _map(directory, meta, 'quantities', QUANTITY_DTYPE)[:, :n_skus]
+    has_lines = _map(directory, meta, 'lines', LINES_DTYPE)[:, :n_skus] > 0
+    any_lines = has_lines.any(axis=0)
+    first = np.full(n_skus, -1)
+    last = np.full(n_skus, -1)
+    if meta['days']:
+        first[any_lines] = has_lines.argmax(axis=0)[any_lines]
+        last[any_lines] = meta['days'] - 1 - has_lines[::-1].argmax(axis=0)[any_lines]
+    name = f"aggregates-{uuid.uuid4().hex[:16]}.npz"
+    with open(os.path.join(directory, name), 'wb') as f:
+        np.savez(f, total=quantities.sum(axis=0), lines=has_lines.sum(axis=0), first=first, last=last)
+    return name
+
+def _read_aggregates(directory, meta):
+    """Kennzahlen je SKU: TotalQuantity, DaysWithLines, FirstDate, LastDate."""
+    # Index -1 (ohne Verkauf) trifft das angehängte NaT
+    dates = pd.date_range(meta['start'], periods=meta['days'], freq='D').append(pd.DatetimeIndex([pd.NaT]))
+    with np.load(os.path.join(directory, meta['aggregates'])) as stored:
+        return pd.DataFrame({
+            'SKU': meta['skus'],
+            'TotalQuantity': stored['total'],
+            'DaysWithLines': stored['lines'],
+            'FirstDate': dates[stored['first']],
+            'LastDate': dates[stored['last']],
+        })
+
+def _write_meta(directory, meta):
+    path = os.path.join(directory, META_FILE)
+    with open(f"{path}.tmp", 'w') as f:
+        json.dump(meta, f)
+    os.replace(f"{path}.tmp", path)
+
+def _read_meta(directory):
+    try:
+        with open(os.path.join(directory, META_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _remove_stale_files(directory, meta):
+    keep = {f"{kind}-{meta['file_id']}.bin" for kind in ('quantities', 'lines')} | {meta['aggregates'], META_FILE, 'lock'}
+    for name in os.listdir(directory):
+        if name not in keep and not name.endswith('.tmp'):
+            # Bestehende Memory-Maps auf gelöschte Dateien bleiben lesbar, bis sie freigegeben werden
+            os.remove(os.path.join(directory, name))
+
+def _write_days(directory, meta, keep_days, new_rows, last_day):
+    """Behält die ersten keep_days Tage und schreibt die Tage danach bis last_day aus new_rows.
+
+    Reicht die Dateigröße und SKU-Kapazität, werden die Tage an die bestehenden Dateien
+    angehängt; sonst (weniger Tage behalten oder zu viele neue SKUs) entstehen neue Dateien.
+    """
+    start = pd.Timestamp(meta['start'])
+    skus = list(meta['skus'])
+    columns = {sku: position for position, sku in enumerate(skus)}
+    for sku in pd.unique(new_rows['SKU']):
+        if sku not in columns:
+            columns[sku] = len(skus)
+            skus.append(sku)
+    n_days = max((pd.Timestamp(last_day) - start).days + 1, keep_days)
+    capacity = meta['sku_capacity']
+    rewrite = keep_days < meta['days'] or len(skus) > capacity
+    if len(skus) > capacity:
+        capacity = max(MIN_SKU_CAPACITY, int(len(skus) * SKU_HEADROOM))
+
+    block_days = n_days - keep_days
+    quantities = np.zeros((block_days, capacity), dtype=QUANTITY_DTYPE)
+    lines = np.zeros((block_days, capacity), dtype=LINES_DTYPE)
+    if not new_rows.empty:
+        row = (pd.to_datetime(new_rows['Date']) - start).dt.days.to_numpy() - keep_days
+        column = new_rows['SKU'].map(columns).to_numpy()
+        np.add.at(quantities, (row, column), new_rows['Quantity'].to_numpy(QUANTITY_DTYPE))
+        np.add.at(lines, (row, column), new_rows['Lines'].to_numpy(LINES_DTYPE))
+
+    updated = {**meta, 'skus': skus, 'days': n_days, 'sku_capacity': capacity}
+    if rewrite:
+        updated['file_id'] = uuid.uuid4().hex[:16]
+        for kind, dtype, block in (('quantities', QUANTITY_DTYPE, quantities), ('lines', LINES_DTYPE, lines)):
+            kept = _map(directory, meta, kind, dtype)[:keep_days]
+            with open(_file(directory, kind, updated['file_id']), 'wb') as f:
+                if keep_days:
+                    widened = np.zeros((keep_days, capacity), dtype=dtype)
+                    widened[:, :meta['sku_capacity']] = kept
+                    f.write(widened.tobytes())
+                f.write(block.tobytes())
+    else:
+        for kind, dtype, block in (('quantities', QUANTITY_DTYPE, quantities), ('lines', LINES_DTYPE, lines)):
+            path = _file(directory, kind, meta['file_id'])
+            with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+                f.seek(keep_days * capacity * np.dtype(dtype).itemsize)
+                f.write(block.tobytes())
+                f.truncate()
+    return updated
+
+def _build(directory, partitions, s3):
+    """Baut den Snapshot aus allen Verkäufen seit HISTORY_START neu auf."""
+    rows = _aggregate(read_sales(HISTORY_START, columns=['Date', 'SKU', 'Quantity'], s3=s3, partitions=partitions))
+    start = rows['Date'].min() if not rows.empty else pd.Timestamp(HISTORY_START)
+    meta = {'start': f"{start:%Y-%m-%d}", 'days': 0, 'skus': [], 'sku_capacity': 0, 'file_id': uuid.uuid4().hex[:16]}
+    last_day = rows['Date'].max() if not rows.empty else start - pd.Timedelta(days=1)
+    meta = _write_days(directory, meta, 0, rows, last_day)
+    logger.info(f"Snapshot der Tagesmatrix neu aufgebaut: {meta['days']} Tage, {len(meta['skus'])} SKUs.")
+    return meta
+
+def _update(directory, meta, partitions, s3):
+    """Schreibt den Snapshot auf den Stand von partitions fort; nur Tage ab der ersten Änderung werden gelesen."""
+    if meta is None:
+        return _build(directory, partitions, s3)
+    changed = _first_changed_day(meta, partitions)
+    if changed is None:
+        return meta
+    start = pd.Timestamp(meta['start'])
+    if pd.Timestamp(changed) <= start:
+        return _build(directory, partitions, s3)
+    keep_days = min((pd.Timestamp(changed) - start).days, meta['days'])
+    first_read = start + pd.Timedelta(days=keep_days)
+    rows = _aggregate(read_sales(first_read.date(), columns=['Date', 'SKU', 'Quantity'], s3=s3, partitions=partitions))
+    last_day = rows['Date'].max() if not rows.empty else first_read - pd.Timedelta(days=1)
+    logger.info(f"Snapshot der Tagesmatrix ab {first_read:%Y-%m-%d} fortgeschrieben.")
+    return _write_days(directory, meta, keep_days, rows, last_day)
+
+def _open(directory, meta):
+    quantities = _map(directory, meta, 'quantities', QUANTITY_DTYPE)
+    lines = _map(directory, meta, 'lines', LINES_DTYPE)
+    return SalesSnapshot(meta['version'], meta['start'], meta['skus'], quantities, lines,
+                         _read_aggregates(directory, meta))
+
+def load_sales_snapshot(s3=None, bucket_name=None):
+    """Snapshot der Tagesmatrix zum aktuellen Datenstand, None bei Fehlern.
+
+    Ist der Snapshot auf der Platte aktuell, wird er nur abgebildet; sonst werden die
+    geänderten Tage aus dem Partitionsspeicher gelesen und angehängt. Aktuell ist er nur,
+    wenn seine Partitionspfade mit denen des Speichers übereinstimmen: Generation und
+    Bucket-Name allein unterscheiden z. B. zwei lokale Speicher mit gleichem Bucket nicht.
+    Mehrere Prozesse auf derselben Platte stimmen sich über eine Sperrdatei ab.
+    """
+    try:
+        bucket_name = bucket_name or get_bucket_name()
+        directory = snapshot_dir(bucket_name)
+        partitions = list_partitions(s3, bucket_name)
+        version = partitions_version(partitions)
+        ranges = _partition_ranges(partitions)
+        with _lock:
+            cached_ranges, snapshot = _snapshots.get(directory, (None, None))
+            if snapshot is not None and snapshot.version == version and cached_ranges == ranges:
+                return snapshot
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, 'lock'), 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                meta = _read_meta(directory)
+                if meta is None or meta.get('version') != version or meta.get('partitions') != ranges:
+                    meta = _update(directory, meta, partitions, s3)
+                    meta['version'] = version
+                    meta['partitions'] = ranges
+                    meta['aggregates'] = _write_aggregates(directory, meta)
+                    _write_meta(directory, meta)
+                    _remove_stale_files(directory, meta)
+            snapshot = _open(directory, meta)
+            _snapshots[directory] = (ranges, snapshot)
+            return snapshot
+    except Exception as e:
+        logger.error(f"Fehler beim Laden des Snapshots der Tagesmatrix: {str(e)}", exc_info=True)
+        return None
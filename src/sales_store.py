@@ -0,0 +1,553 @@
+import streamlit as st
+import pandas as pd
+import io
+import numpy as np
+import logging
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from src.s3_utils import get_s3_fs
+from src.manifest import read_manifest, commit_manifest, new_object_path
+from src.sku_registry import sku_registry, normalize_sku
+from src.trend_state import TrendState, HISTORY_START
+from src.platform_cube import PlatformCube
+from src.bill_of_materials import BILL_OF_MATERIALS, bom_pairs, expand_sales, expand_trend_state
+from src.sku_hierarchy import SKU_LEVEL, rollup_mapping
+from src.single_flight import coalesce
+from src.result_cache import result_cache
+
+logger = logging.getLogger(__name__)
+
+# Verkaufsdaten liegen als unveränderliche Parquet-Partitionen unter sales/, das Manifest
+# "sales" verweist auf den gültigen Stand:
+#   day/2024-07-01 -> sales/day/2024-07-01.<id>.parquet   ein Tag (auch leer, dann gilt der Tag als abgerufen)
+#   month/2024-06  -> sales/month/2024-06.<id>.parquet    ein abgeschlossener Monat
+#   year/2023      -> sales/year/2023.<id>.parquet        ein abgeschlossenes Jahr
+# Monats- und Jahrespartitionen entstehen durch die Verdichtung und überschneiden sich nicht.
+# Eine Tagespartition hat Vorrang vor den Zeilen desselben Tages in einer Monats- oder Jahrespartition.
+SALES_PREFIX = "sales"
+SALES_MANIFEST = "sales"
+# Aus den Verkäufen abgeleitete Zustände gehören zum selben Manifest-Stand wie die Partitionen
+# und werden bei jeder Änderung im selben Commit fortgeschrieben
+TREND_STATE_KEY = "state/trend"
+PLATFORM_CUBE_KEY = "state/platforms"
+SALES_STATES = {TREND_STATE_KEY: TrendState, PLATFORM_CUBE_KEY: PlatformCube}
+LEGACY_SALES_FILE = "all_sales_data_original_sku.csv"
+SALES_COLUMNS = ['Date', 'SKU', 'Quantity', 'Platform']
+# Billbee-Bestell- und Positions-ID; bei Zeilen aus der früheren CSV fehlen sie
+KEY_COLUMNS = ['OrderId', 'OrderItemId']
+STORE_COLUMNS = SALES_COLUMNS + KEY_COLUMNS
+SALES_SCHEMA = pa.schema([
+    ('Date', pa.date32()),
+    ('SKU', pa.string()),
+    ('Quantity', pa.int64()),
+    ('Platform', pa.string()),
+    ('OrderId', pa.string()),
+    ('OrderItemId', pa.string()),
+])
+
+_migrated_buckets = set()
+# Zuletzt gelesene abgeleitete Zustände: Schlüssel -> (Objektpfad, Zustand)
+_state_cache = {}
+
+def get_bucket_name():
+    return st.secrets['aws']['S3_BUCKET_NAME']
+
+def day_key(date):
+    return f"day/{pd.Timestamp(date):%Y-%m-%d}"
+
+def month_key(month):
+    return f"month/{pd.Period(month, freq='M')}"
+
+def year_key(year):
+    return f"year/{pd.Period(year, freq='Y')}"
+
+def new_partition_path(bucket_name, key):
+    return new_object_path(bucket_name, SALES_PREFIX, key, '.parquet')
+
+def _parse_key(key):
+    """Liefert (Art, Zeitraum) zu einem Partitionsschlüssel wie 'day/2024-07-01' oder None."""
+    kind, _, stem = key.partition('/')
+    try:
+        if kind == 'day':
+            return kind, pd.Timestamp(stem).date()
+        if kind == 'month':
+            return kind, pd.Period(stem, freq='M')
+        if kind == 'year':
+            return kind, pd.Period(stem, freq='Y')
+    except ValueError:
+        return None
+    return None
+
+def partitions_from_manifest(manifest):
+    partitions = {'day': {}, 'month': {}, 'year': {}, 'generation': manifest['generation']}
+    for key, path in manifest['objects'].items():
+        parsed = _parse_key(key)
+        if parsed is not None:
+            kind, period = parsed
+            partitions[kind][period] = path
+    return partitions
+
+def list_partitions(s3=None, bucket_name=None):
+    """Liefert den aktuellen Stand aller Partitionen aus dem Manifest.
+
+    Ein Dict mit 'day' (Datum -> Pfad), 'month' und 'year' (Periode -> Pfad) sowie 'generation';
+    die Pfade eines Aufrufs bilden einen konsistenten Stand, auch wenn parallel
+    geschrieben wird.
+    """
+    s3 = s3 or get_s3_fs()
+    bucket_name = bucket_name or get_bucket_name()
+    ensure_sales_store(s3, bucket_name)
+    return partitions_from_manifest(read_manifest(SALES_MANIFEST, s3, bucket_name))
+
+def partitions_version(partitions):
+    """Kennung des Datenstands: die Manifest-Generation."""
+    if not partitions['generation']:
+        return "empty"
+    return f"g{partitions['generation']}"
+
+def compacted_partitions(partitions):
+    """Monats- und Jahrespartitionen als sortierte Liste (Periode, Pfad)."""
+    return sorted(list(partitions['month'].items()) + list(partitions['year'].items()),
+                  key=lambda item: item[0].start_time)
+
+def period_dates(period):
+    return period.start_time.date(), period.end_time.date()
+
+def covered_dates(partitions):
+    """Alle Tage, für die Verkaufsdaten abgelegt sind (verdichtete Monate und Jahre gelten als vollständig)."""
+    dates = set(partitions['day'])
+    for period, _ in compacted_partitions(partitions):
+        dates.update(pd.date_range(period.start_time, period.end_time.normalize()).date)
+    return dates
+
+def to_sales_table(df):
+    """Wandelt ein Verkaufs-DataFrame in eine nach SKU und Datum sortierte Arrow-Tabelle."""
+    df = df.reindex(columns=STORE_COLUMNS)
+    df['Date'] = pd.to_datetime(df['Date']).dt.date
+    # Kanonische SKUs, damit SKU-Filter beim Lesen exakt greifen
+    df['SKU'] = sku_registry.decode(sku_registry.encode(df['SKU'])).astype(str)
+    df['Quantity'] = pd.to_numeric(df['Quantity']).astype('int64')
+    df['Platform'] = df['Platform'].astype(str)
+    for column in KEY_COLUMNS:
+        df[column] = df[column].astype(object).where(df[column].notna(), None).map(
+            lambda key: None if key is None else str(key))
+    df = df.sort_values(['SKU', 'Date'], kind='stable')
+    return pa.Table.from_pandas(df, schema=SALES_SCHEMA, preserve_index=False)
+
+def write_partition(s3, path, df, row_group_size=None):
+    buffer = io.BytesIO()
+    pq.write_table(to_sales_table(df), buffer, compression='zstd', row_group_size=row_group_size)
+    with s3.open(path, 'wb') as f:
+        f.write(buffer.getvalue())
+
+def write_new_partition(s3, bucket_name, key, df, row_group_size=None):
+    """Schreibt eine Partition als neues Objekt; sichtbar wird sie erst mit dem Manifest-Commit."""
+    path = new_partition_path(bucket_name, key)
+    write_partition(s3, path, df, row_group_size)
+    return path
+
+def read_partition(s3, path, dates=None):
+    """Liest eine Partition, optional nur die Zeilen der angegebenen Tage."""
+    expression = None if dates is None else ds.field('Date').isin(pa.array(dates, type=pa.date32()))
+    with s3.open(path, 'rb') as f:
+        return pq.read_table(f, schema=SALES_SCHEMA, filters=expression).to_pandas()
+
+def row_keys(df):
+    """Schlüssel Bestell-ID/Positions-ID je Zeile, NaN für Zeilen ohne IDs."""
+    if not set(KEY_COLUMNS).issubset(df.columns):
+        return pd.Series(np.nan, index=df.index, dtype=object)
+    keys = df['OrderId'].astype(str) + '/' + df['OrderItemId'].astype(str)
+    return keys.where(df['OrderId'].notna() & df['OrderItemId'].notna())
+
+def rows_for_day(frame, date):
+    """Bereitet die verarbeiteten Bestellungen eines abgerufenen Tages für den Speicher vor.
+
+    Zeilen, deren Bestelldatum auf einen anderen Tag fällt (Randbestellungen aus
+    überlappenden Abfragefenstern), gehören zum Abruf jenes Tages und entfallen hier;
+    mehrfach gelieferte Positionen werden auf die letzte reduziert.
+    """
+    frame = frame.copy()
+    if 'OrderDate' in frame.columns:
+        order_dates = pd.to_datetime(frame['OrderDate']).dt.date
+        frame = frame[frame['OrderDate'].isna() | (order_dates == date)]
+    frame['Date'] = date
+    keys = row_keys(frame)
+    return frame[keys.isna() | ~keys.duplicated(keep='last')]
+
+def upsert_rows(existing, new):
+    """Führt neue Zeilen über einen Hash-Index auf (OrderId, OrderItemId) mit den vorhandenen zusammen.
+
+    Vorhandene Zeilen mit gleichem Schlüssel werden ersetzt. Tage, deren vorhandene
+    Zeilen noch keine IDs tragen, lassen sich nicht abgleichen und werden durch die
+    neuen Zeilen dieses Tages ersetzt.
+    """
+    new_keys = pd.Index(row_keys(new).dropna())
+    existing_keys = row_keys(existing)
+    unkeyed_days = set(existing.loc[existing_keys.isna(), 'Date']) - set(existing.loc[existing_keys.notna(), 'Date'])
+    replaced_days = unkeyed_days & set(new.loc[row_keys(new).notna(), 'Date'])
+    keep = ~existing_keys.isin(new_keys) & ~existing['Date'].isin(replaced_days)
+    return pd.concat([existing[keep], new], ignore_index=True)
+
+def write_sales_batch(frames_by_date, s3=None, bucket_name=None, upsert=False):
+    """Schreibt die Verkäufe mehrerer Tage gesammelt, mit höchstens einem Schreibvorgang je Partition.
+
+    Ohne upsert ersetzt jeder übergebene Tag den gespeicherten Tag vollständig: Tage in
+    bereits verdichteten Monaten werden in die Monatspartition eingearbeitet (eine
+    eventuell vorhandene Tagespartition entfällt dann), alle übrigen Tage werden als
+    Tagespartitionen geschrieben, in verdichteten Jahren überdecken diese die Zeilen der
+    Jahrespartition bis zur nächsten Verdichtung. Mit upsert werden die Zeilen über ihre
+    Bestell- und Positions-ID mit dem gespeicherten Stand zusammengeführt, sodass ein
+    erneuter Import desselben Fensters nichts verändert.
+
+    Geänderte Partitionen werden als neue Objekte geschrieben und gemeinsam per
+    Manifest-Commit übernommen; bei einem gleichzeitigen Schreiber wird auf dessen
+    Stand neu aufgesetzt. Liefert die übernommenen Partitionen.
+    """
+    s3 = s3 or get_s3_fs()
+    bucket_name = bucket_name or get_bucket_name()
+    ensure_sales_store(s3, bucket_name)
+
+    frames = {}
+    for date, frame in frames_by_date.items():
+        date = pd.Timestamp(date).date()
+        frames[date] = rows_for_day(frame, date)
+
+    by_month = {}
+    for date in frames:
+        by_month.setdefault(pd.Period(date, freq='M'), []).append(date)
+
+    def update(manifest):
+        partitions = partitions_from_manifest(manifest)
+        objects = dict(manifest['objects'])
+        for month, dates in sorted(by_month.items()):
+            month_path = partitions['month'].get(month)
+            if month_path is None:
+                into_month = []
+            elif upsert:
+                # Tage mit eigener Tagespartition werden dort abgeglichen
+                into_month = [date for date in dates if date not in partitions['day']]
+            else:
+                into_month = dates
+
+            if into_month:
+                existing = read_partition(s3, month_path)
+                new_rows = pd.concat([frames[date] for date in into_month], ignore_index=True)
+                if upsert:
+                    merged = upsert_rows(existing, new_rows)
+                else:
+                    merged = pd.concat([existing[~existing['Date'].isin(into_month)], new_rows], ignore_index=True)
+                objects[month_key(month)] = write_new_partition(s3, bucket_name, month_key(month), merged)
+                if not upsert:
+                    for date in into_month:
+                        objects.pop(day_key(date), None)
+
+            for date in dates:
+                if date in into_month:
+                    continue
+                frame = frames[date]
+                year_path = partitions['year'].get(pd.Period(date, freq='Y'))
+                if upsert and date in partitions['day']:
+                    frame = upsert_rows(read_partition(s3, partitions['day'][date]), frame)
+                elif upsert and year_path is not None:
+                    frame = upsert_rows(read_partition(s3, year_path, [date]), frame)
+                objects[day_key(date)] = write_new_partition(s3, bucket_name, day_key(date), frame)
+
+        if any(key in objects for key in SALES_STATES):
+            dates = [date for date in frames if date >= HISTORY_START]
+            new_partitions = partitions_from_manifest({'objects': objects, 'generation': None})
+            carry_sales_states(s3, bucket_name, objects, visible_rows(s3, partitions, dates), visible_rows(s3, new_partitions, dates))
+        return objects
+
+    manifest = commit_manifest(SALES_MANIFEST, update, s3, bucket_name)
+    logger.info(f"Verkäufe für {len(frames)} Tage gesammelt gespeichert (Generation {manifest['generation']}).")
+    # Zwischengespeicherte Ergebnisse des alten Stands sofort freigeben
+    result_cache.retire(partitions_version(manifest))
+    return partitions_from_manifest(manifest)
+
+def deduplicate_sales_store(s3=None, bucket_name=None):
+    """Entfernt doppelt gespeicherte Bestellpositionen aus dem gesamten Bestand.
+
+    Je (OrderId, OrderItemId) bleibt die Zeile mit dem spätesten Datum erhalten;
+    nur Partitionen mit Duplikaten werden neu geschrieben. Zeilen ohne IDs (aus der
+    früheren CSV) lassen sich nicht zuordnen und bleiben unverändert: der frühere Import
+    hat Tage nie doppelt geschrieben, gleiche Zeilen dort sind eigene Bestellungen.
+    Liefert (entfernte Zeilen, nicht geprüfte Zeilen ohne IDs).
+    """
+    s3 = s3 or get_s3_fs()
+    bucket_name = bucket_name or get_bucket_name()
+    ensure_sales_store(s3, bucket_name)
+    removed = 0
+    unkeyed = 0
+
+    def update(manifest):
+        nonlocal removed, unkeyed
+        removed = 0
+        unkeyed = 0
+        partitions = partitions_from_manifest(manifest)
+        _, _, shadowed = _selected_partitions(partitions)
+        objects = dict(manifest['objects'])
+
+        ordered = [(date, day_key(date)) for date in partitions['day']]
+        ordered += [(month.end_time.date(), month_key(month)) for month in partitions['month']]
+        ordered += [(year.end_time.date(), year_key(year)) for year in partitions['year']]
+        seen = set()
+        removed_rows = []
+        # Vom neuesten zum ältesten Stand, damit jeweils die späteste Zeile gewinnt
+        for _, key in sorted(ordered, reverse=True):
+            data = read_partition(s3, objects[key]).sort_values('Date', kind='stable')
+            keys = row_keys(data)
+            visible = pd.Series(True, index=data.index) if key.startswith('day/') else ~data['Date'].isin(shadowed)
+            duplicate = keys.notna() & visible & (keys.isin(seen) | keys.duplicated(keep='last'))
+            if duplicate.any():
+                objects[key] = write_new_partition(s3, bucket_name, key, data[~duplicate])
+                removed_rows.append(data[duplicate])
+                removed += int(duplicate.sum())
+            seen.update(keys[keys.notna() & visible & ~duplicate])
+            unkeyed += int((keys.isna() & visible).sum())
+        if not removed:
+            return None
+        carry_sales_states(s3, bucket_name, objects, pd.concat(removed_rows, ignore_index=True), None)
+        return objects
+
+    commit_manifest(SALES_MANIFEST, update, s3, bucket_name)
+    logger.info(f"{removed} doppelte Bestellpositionen entfernt, {unkeyed} Zeilen ohne Bestell-IDs nicht geprüft.")
+    return removed, unkeyed
+
+def _selected_partitions(partitions, start_date=None, end_date=None):
+    start = pd.Timestamp(start_date).date() if start_date is not None else None
+    end = pd.Timestamp(end_date).date() if end_date is not None else None
+
+    def overlaps(first, last):
+        return (start is None or last >= start) and (end is None or first <= end)
+
+    compacted = compacted_partitions(partitions)
+    day_paths = {date: path for date, path in partitions['day'].items() if overlaps(date, date)}
+    compacted_paths = [path for period, path in compacted if overlaps(*period_dates(period))]
+    # Tage mit eigener Partition werden aus den Monats- und Jahrespartitionen ausgeblendet
+    shadowed = sorted(date for date in partitions['day'] if any(
+        first <= date <= last for first, last in (period_dates(period) for period, _ in compacted)))
+    return [path for _, path in sorted(day_paths.items())], compacted_paths, shadowed
+
+def sales_datasets(start_date=None, end_date=None, s3=None, bucket_name=None, partitions=None):
+    """Arrow-Datasets über die benötigten Partitionen: (Tage, Monate und Jahre, ausgeblendete Tage).
+
+    Es werden nur Partitionen geöffnet, die den Zeitraum berühren; Spalten und Filter
+    werden erst beim Scannen angewendet.
+    """
+    s3 = s3 or get_s3_fs()
+    partitions = partitions or list_partitions(s3, bucket_name)
+    day_paths, compacted_paths, shadowed = _selected_partitions(partitions, start_date, end_date)
+    day_dataset = ds.dataset(day_paths, schema=SALES_SCHEMA, format='parquet', filesystem=s3)
+    compacted_dataset = ds.dataset(compacted_paths, schema=SALES_SCHEMA, format='parquet', filesystem=s3)
+    return day_dataset, compacted_dataset, shadowed
+
+def date_filter(start_date=None, end_date=None):
+    expression = None
+    if start_date is not None:
+        expression = ds.field('Date') >= pd.Timestamp(start_date).date()
+    if end_date is not None:
+        upper = ds.field('Date') <= pd.Timestamp(end_date).date()
+        expression = upper if expression is None else expression & upper
+    return expression
+
+def sales_filter(start_date=None, end_date=None, skus=None, platforms=None):
+    """Scan-Filter für Zeitraum, SKUs und Plattformen (None = keine Einschränkung)."""
+    expression = date_filter(start_date, end_date)
+    conditions = []
+    if skus is not None:
+        skus = sorted({normalize_sku(sku) for sku in skus} - {None})
+        conditions.append(ds.field('SKU').isin(pa.array(skus, type=pa.string())))
+    if platforms is not None:
+        conditions.append(ds.field('Platform').isin(pa.array([str(p) for p in platforms], type=pa.string())))
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+def read_sales(start_date=None, end_date=None, columns=None, skus=None, platforms=None, s3=None, partitions=None):
+    """Liest Verkaufsdaten im Zeitraum [start_date, end_date] aus dem Partitionsspeicher.
+
+    Partitionen außerhalb des Zeitraums werden nicht geöffnet; Spalten-, SKU- und
+    Plattformauswahl werden beim Scannen angewendet, sodass nur die Ergebniszeilen
+    materialisiert werden. Da die Dateien nach SKU sortiert sind, überspringt ein
+    SKU-Filter in verdichteten Dateien ganze Row Groups. Mit partitions wird ein
+    bestimmter Manifest-Stand gelesen.
+    """
+    columns = columns or SALES_COLUMNS
+    day_dataset, compacted_dataset, shadowed = sales_datasets(start_date, end_date, s3, partitions=partitions)
+
+    expression = sales_filter(start_date, end_date, skus, platforms)
+    compacted_expression = expression
+    if shadowed:
+        hidden = ~ds.field('Date').isin(pa.array(shadowed, type=pa.date32()))
+        compacted_expression = hidden if expression is None else expression & hidden
+
+    table = pa.concat_tables([
+        compacted_dataset.to_table(columns=columns, filter=compacted_expression),
+        day_dataset.to_table(columns=columns, filter=expression),
+    ])
+    if 'Date' in columns:
+        table = table.sort_by('Date')
+    # Die Arrow-Puffer werden während der Umwandlung freigegeben, statt bis zum Ende doppelt im Speicher zu liegen
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+def visible_rows(s3, partitions, dates):
+    """Die gültigen Zeilen der angegebenen Tage eines Manifest-Stands (Tagesdatei vor verdichteter Datei)."""
+    parts, compacted = [], {}
+    for date in sorted(set(dates)):
+        if date in partitions['day']:
+            parts.append(read_partition(s3, partitions['day'][date]))
+            continue
+        path = partitions['month'].get(pd.Period(date, freq='M')) or partitions['year'].get(pd.Period(date, freq='Y'))
+        if path is not None:
+            compacted.setdefault(path, []).append(date)
+    parts += [read_partition(s3, path, path_dates) for path, path_dates in compacted.items()]
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=STORE_COLUMNS)
+
+def read_sales_state(s3, key, path):
+    with s3.open(path, 'rb') as f:
+        return SALES_STATES[key].from_bytes(f.read())
+
+def write_sales_state(s3, bucket_name, key, state):
+    path = new_object_path(bucket_name, f"{SALES_PREFIX}/state", key.split('/', 1)[1], '.npz')
+    with s3.open(path, 'wb') as f:
+        f.write(state.to_bytes())
+    return path
+
+def carry_sales_states(s3, bucket_name, objects, removed, added):
+    """Arbeitet eine Änderung (entfernte und hinzugefügte Zeilen) in die abgeleiteten Zustände des neuen Stands ein.
+
+    Noch nicht gespeicherte Zustände bleiben aus; sie werden beim ersten Lesen aufgebaut.
+    """
+    for key in SALES_STATES:
+        path = objects.get(key)
+        if path is not None:
+            state = read_sales_state(s3, key, path).apply(removed, added)
+            objects[key] = write_sales_state(s3, bucket_name, key, state)
+
+def rebuild_sales_state(key, s3=None, bucket_name=None):
+    """Baut einen abgeleiteten Zustand aus den Verkäufen seit HISTORY_START neu auf und übernimmt ihn per Manifest-Commit."""
+    s3 = s3 or get_s3_fs()
+    bucket_name = bucket_name or get_bucket_name()
+    ensure_sales_store(s3, bucket_name)
+    built = {}
+
+    def update(manifest):
+        sales = read_sales(HISTORY_START, columns=SALES_STATES[key].COLUMNS, s3=s3,
+                           partitions=partitions_from_manifest(manifest))
+        built['state'] = SALES_STATES[key].from_sales(sales)
+        objects = dict(manifest['objects'])
+        objects[key] = write_sales_state(s3, bucket_name, key, built['state'])
+        return objects
+
+    commit_manifest(SALES_MANIFEST, update, s3, bucket_name)
+    logger.info(f"{key} für {len(built['state'].skus)} SKUs neu aufgebaut.")
+    return built['state']
+
+# Zustände werden nur gelesen und daher zwischen den Sitzungen geteilt
+@coalesce(lambda key, s3=None, bucket_name=None: (key, bucket_name), copy=None)
+def load_sales_state(key, s3=None, bucket_name=None):
+    """Abgeleiteter Zustand des aktuellen Stands; fehlt er, wird er einmalig aufgebaut.
+
+    Die Objekte sind unveränderlich, gelesene Zustände werden daher je Pfad im Prozess behalten.
+    """
+    s3 = s3 or get_s3_fs()
+    bucket_name = bucket_name or get_bucket_name()
+    ensure_sales_store(s3, bucket_name)
+    path = read_manifest(SALES_MANIFEST, s3, bucket_name)['objects'].get(key)
+    if path is None:
+        return rebuild_sales_state(key, s3, bucket_name)
+    cached = _state_cache.get(key)
+    if cached is None or cached[0] != path:
+        cached = (path, read_sales_state(s3, key, path))
+        _state_cache[key] = cached
+    return cached[1]
+
+def rebuild_trend_state(s3=None, bucket_name=None):
+    return rebuild_sales_state(TREND_STATE_KEY, s3, bucket_name)
+
+def load_trend_state(s3=None, bucket_name=None):
+    return load_sales_state(TREND_STATE_KEY, s3, bucket_name)
+
+def load_platform_cube(s3=None, bucket_name=None):
+    """Würfel SKU × Plattform × Tag des aktuellen Stands."""
+    return load_sales_state(PLATFORM_CUBE_KEY, s3, bucket_name)
+
+def current_trends(s3=None, bucket_name=None, components=False, level=SKU_LEVEL):
+    """Lang-, kurzfristige Steigung und Trend je SKU aus dem Trendzustand.
+
+    SKUs, deren letzter Verkaufstag entfernt wurde, werden aus ihren eigenen Verkäufen
+    neu berechnet (per SKU-Filter, ohne die übrige Historie zu lesen). Mit components
+    gelten die Trends je Komponente, Sets sind gemäß Stückliste aufgelöst; level fasst
+    die Trends auf Eltern-SKU- oder Familienebene zusammen.
+    """
+    s3 = s3 or get_s3_fs()
+    state = load_trend_state(s3, bucket_name)
+    # Zuordnungen im Stücklistenformat, nacheinander auf den Zustand angewendet
+    mappings = []
+    if components:
+        mappings.append(lambda skus: BILL_OF_MATERIALS)
+    if level != SKU_LEVEL:
+        mappings.append(lambda skus: rollup_mapping(skus, level))
+
+    expanded = state
+    for mapping in mappings:
+        expanded = expand_trend_state(expanded, mapping(expanded.skus))
+    trends = expanded.trends()
+    stale = trends.loc[trends['Stale'], 'SKU'].tolist()
+    if stale:
+        origins = pd.DataFrame({'SKU': state.skus, 'Origin': state.skus})
+        for mapping in mappings:
+            pairs = bom_pairs(origins['SKU'], mapping(origins['SKU'].unique()))
+            origins = pd.merge(origins, pairs, on='SKU')[['Component', 'Origin']].rename(columns={'Component': 'SKU'})
+        sources = origins.loc[origins['SKU'].isin(stale), 'Origin'].unique().tolist()
+        sales = read_sales(HISTORY_START, columns=TrendState.COLUMNS, skus=sources, s3=s3)
+        for mapping in mappings:
+            sales = expand_sales(sales, mapping(sales['SKU'].astype(str).unique()))
+        fresh = TrendState.from_sales(sales[sales['SKU'].isin(stale)]).trends()
+        trends = pd.concat([trends[~trends['Stale']], fresh], ignore_index=True)
+    return trends.drop(columns=['Stale'])
+
+def ensure_sales_store(s3, bucket_name):
+    """Legt beim ersten Zugriff das Manifest an.
+
+    Vorhandene Partitionen ohne Manifest werden unverändert übernommen, sonst wird die
+    frühere Einzel-CSV einmalig in Partitionen überführt.
+    """
+    if bucket_name in _migrated_buckets:
+        return
+
+    def update(manifest):
+        if manifest['generation']:
+            return None
+        objects = {}
+        prefix = f"{bucket_name}/{SALES_PREFIX}"
+        if s3.exists(prefix):
+            for path in s3.find(prefix):
+                parts = path.rstrip('/').split('/')
+                if len(parts) < 3 or parts[-3] != SALES_PREFIX or not parts[-1].endswith('.parquet'):
+                    continue
+                key = f"{parts[-2]}/{parts[-1].split('.', 1)[0]}"
+                if _parse_key(key) is not None:
+                    objects[key] = path
+        if not objects and s3.exists(f"{bucket_name}/{LEGACY_SALES_FILE}"):
+            objects = migrate_legacy_sales(s3, bucket_name)
+        return objects or None
+
+    commit_manifest(SALES_MANIFEST, update, s3, bucket_name)
+    _migrated_buckets.add(bucket_name)
+
+def migrate_legacy_sales(s3, bucket_name):
+    """Schreibt je Tag der Einzel-CSV eine Tagespartition.
+
+    Tage, die in der CSV fehlen, bleiben fehlend und werden erneut abgerufen; zu Monats-
+    und Jahrespartitionen fasst erst die Verdichtung die vollständigen Zeiträume zusammen.
+    """
+    with s3.open(f"{bucket_name}/{LEGACY_SALES_FILE}", 'r') as f:
+        legacy = pd.read_csv(f, parse_dates=['Date'])
+
+    objects = {}
+    for date, day_data in legacy.groupby(legacy['Date'].dt.date):
+        objects[day_key(date)] = write_new_partition(s3, bucket_name, day_key(date), day_data)
+    logger.info(f"{len(legacy)} Verkaufszeilen aus {LEGACY_SALES_FILE} in Partitionen überführt.")
+    return objects
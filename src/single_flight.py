@@ -0,0 +1,111 @@
+import copy
+import functools
+import logging
+import threading
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+def copy_result(result):
+    """Eigene Kopie eines geteilten Ergebnisses, damit Sitzungen es unabhängig verändern können."""
+    if hasattr(result, 'copy') and not isinstance(result, dict):
+        return result.copy()
+    return copy.deepcopy(result)
+
+class SingleFlight:
+    """Fasst gleichzeitige Aufrufe mit gleichem Schlüssel zu einer Berechnung zusammen.
+
+    Der erste Aufrufer rechnet, alle weiteren warten auf sein Ergebnis (bzw. seinen
+    Fehler) und erhalten eine Kopie davon. Es wird nichts zwischengespeichert: ist die
+    Berechnung abgeschlossen, startet der nächste Aufruf eine neue. stats zählt je Name
+    die Aufrufe ('calls'), die tatsächlichen Berechnungen ('executions') und die
+    geteilten Ergebnisse ('shared').
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.stats = Counter()
+
+    def do(self, key, fn, args=(), kwargs=None, copy=copy_result):
+        """Führt fn(*args, **kwargs) aus oder wartet auf die laufende Berechnung zu key.
+
+        copy erstellt die Kopien für wartende Aufrufer; None teilt das Ergebnis selbst
+        (nur für Ergebnisse, die niemand verändert).
+        """
+        copy = copy or (lambda result: result)
+        name = key[0] if isinstance(key, tuple) else key
+        with self._lock:
+            self.stats[(name, 'calls')] += 1
+            call = self._calls.get(key) if self.enabled else None
+            leader = call is None
+            if leader:
+                call = _Call()
+                if self.enabled:
+                    self._calls[key] = call
+                self.stats[(name, 'executions')] += 1
+            else:
+                call.waiters += 1
+                self.stats[(name, 'shared')] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy(call.result)
+
+        try:
+            result = fn(*args, **(kwargs or {}))
+        except BaseException as e:
+            call.error = e
+            raise
+        else:
+            call.result = result
+            return result
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            # Ohne Sperre, da nach dem Entfernen keine Wartenden mehr hinzukommen; Wartende
+            # kopieren einen unveränderten Stand, während der erste Aufrufer weiterarbeitet
+            if call.waiters and call.error is None:
+                call.result = copy(call.result)
+            call.done.set()
+
+    def summary(self):
+        """Aufrufe, Berechnungen und geteilte Ergebnisse je Name."""
+        names = sorted({name for name, _ in self.stats})
+        return {name: {kind: self.stats[(name, kind)] for kind in ('calls', 'executions', 'shared')} for name in names}
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats.clear()
+
+# Prozessweit: alle Streamlit-Sitzungen laufen als Threads desselben Prozesses
+single_flight = SingleFlight()
+
+def coalesce(key_fn, copy=copy_result):
+    """Dekorator: gleichzeitige Aufrufe mit gleichem key_fn(*args, **kwargs) teilen eine Berechnung."""
+    def decorator(fn):
+        name = f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (name,) + tuple(key_fn(*args, **kwargs))
+            return single_flight.do(key, fn, args, kwargs, copy)
+        return wrapper
+    return decorator
+
+def freeze(value):
+    """Hashbare Form von Listen für Schlüssel (None und Texte bleiben unverändert)."""
+    if value is None or isinstance(value, (str, bytes)):
+        return value
+    return tuple(value)
@@ -0,0 +1,66 @@
+import pandas as pd
+import numpy as np
+from src.daily_matrix import DailyMatrix
+from src.sku_registry import sku_registry
+
+# Ebenen der SKU-Hierarchie: Variante -> Eltern-SKU -> Produktfamilie
+SKU_LEVEL, PARENT_LEVEL, FAMILY_LEVEL = 'SKU', 'Parent', 'Family'
+LEVELS = {SKU_LEVEL: 'Variante', PARENT_LEVEL: 'Eltern-SKU', FAMILY_LEVEL: 'Produktfamilie'}
+
+def group_codes(sku_codes, level=SKU_LEVEL):
+    """Integer-Gruppencodes der Ebene zu SKU-Codes (Familiencodes bilden einen eigenen Wertebereich)."""
+    if level == SKU_LEVEL:
+        return np.asarray(sku_codes)
+    if level == PARENT_LEVEL:
+        return sku_registry.parent_codes(sku_codes)
+    if level == FAMILY_LEVEL:
+        return sku_registry.family_codes(sku_codes)
+    raise ValueError(f"Unbekannte Ebene: {level}")
+
+def group_labels(codes, level=SKU_LEVEL):
+    """Bezeichnung der Gruppen: SKU-Text auf Varianten- und Elternebene, sonst der Familienname."""
+    return sku_registry.family_labels(codes) if level == FAMILY_LEVEL else sku_registry.decode(codes)
+
+def group_names(codes, level=SKU_LEVEL):
+    """Anzeigenamen der Gruppen; Eltern-SKUs ohne eigenen Namen tragen den Namen ihrer Familie."""
+    if level == FAMILY_LEVEL:
+        return sku_registry.family_labels(codes)
+    names = sku_registry.names(codes)
+    if level == PARENT_LEVEL:
+        missing = pd.isna(names)
+        names[missing] = sku_registry.family_labels(sku_registry.family_codes(np.asarray(codes)[missing]))
+    return names
+
+def label_names(labels, level=SKU_LEVEL):
+    """Anzeigenamen zu Gruppenbezeichnungen, etwa den Zeilen einer zusammengefassten Matrix."""
+    labels = pd.Series(list(labels), dtype=object)
+    if level == FAMILY_LEVEL:
+        return labels.to_numpy()
+    return group_names(sku_registry.encode(labels), level)
+
+def sku_groups(skus, level=SKU_LEVEL):
+    """Gruppenbezeichnung je SKU-Text (für Zeilen- und Spaltenzuordnungen)."""
+    return group_labels(group_codes(sku_registry.encode(pd.Series(list(skus), dtype=object)), level), level)
+
+def segments(codes):
+    """Sortierreihenfolge, Segmentanfänge und eindeutige Codes für eine segmentierte Reduktion."""
+    order = np.argsort(codes, kind='stable')
+    sorted_codes = np.asarray(codes)[order]
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]]) if len(order) else np.array([], dtype=np.int64)
+    return order, starts, sorted_codes[starts]
+
+def rollup_matrix(matrix, level=SKU_LEVEL):
+    """SKU×Tag-Matrix auf der gewählten Ebene, als eine segmentierte Summe über die Zeilen."""
+    if level == SKU_LEVEL or len(matrix.skus) == 0:
+        return matrix
+    codes = group_codes(sku_registry.encode(pd.Series(matrix.skus, dtype=object)), level)
+    order, starts, groups = segments(codes)
+    values = np.add.reduceat(matrix.values[order], starts, axis=0)
+    labels = pd.Index(group_labels(groups, level), dtype=object)
+    position = np.argsort(np.asarray(labels, dtype=str), kind='stable')
+    return DailyMatrix(values[position], labels[position], matrix.dates)
+
+def rollup_mapping(skus, level=SKU_LEVEL):
+    """Zuordnung SKU -> {Gruppe: 1} im Format der Stückliste, etwa für expand_trend_state."""
+    skus = list(skus)
+    return {sku: {group: 1} for sku, group in zip(skus, sku_groups(skus, level))}
@@ -391,3 +391,31 @@ SKU_NAMES = {
     '80525-18': 'Flüssigdünger 1 Liter',
     '80510': 'Herbstrasendünger 10 kg'
 }
+
+# Produktfamilie je Eltern-SKU (oberste Ebene der SKU-Hierarchie Variante -> Eltern-SKU -> Familie)
+PRODUCT_FAMILIES = {
+    '80522': 'Bio-Flüssigdünger',
+    '80523': 'Flüssigdünger',
+    '80524': 'Flüssigdünger',
+    '80525': 'Flüssigdünger',
+    '80528': 'Flüssigdünger',
+    '80526': 'Bio-Granulatdünger',
+    '80527': 'Granulatdünger',
+    '80537': 'Cannabis-Dünger',
+    '80538': 'Cannabis-Dünger',
+    '80539': 'Cannabis-Dünger',
+    '8000': 'Dünger-Sets',
+    '8001': 'Dünger-Sets',
+    '8002': 'Dünger-Sets',
+    '8003': 'Dünger-Sets',
+    '8004': 'Dünger-Sets',
+    '80510': 'Rasendünger',
+    '80511': 'Rasendünger',
+    '80513': 'Rasendünger',
+    '80533': 'Rasendünger',
+}
+# Handelsware ohne eigenen Eintrag wird über den Namensanfang zugeordnet
+BRAND_FAMILIES = {
+    'Beckmann': 'Beckmann',
+}
+OTHER_FAMILY = 'Sonstige'
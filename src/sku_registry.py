@@ -0,0 +1,145 @@
+import pandas as pd
+import numpy as np
+import threading
+from src.sku_names import SKU_NAMES, PRODUCT_FAMILIES, BRAND_FAMILIES, OTHER_FAMILY
+
+def normalize_sku(raw):
+    """Bringt eine Roh-SKU in die kanonische Textform ('8000.0' -> '8000', ' 80538-2 ' -> '80538-2')."""
+    if raw is None or (isinstance(raw, float) and np.isnan(raw)):
+        return None
+    if isinstance(raw, (int, np.integer)):
+        return str(int(raw))
+    if isinstance(raw, (float, np.floating)):
+        return str(int(raw)) if float(raw).is_integer() else str(raw)
+    sku = str(raw).strip()
+    if sku.endswith('.0') and sku[:-2].isdigit():
+        sku = sku[:-2]
+    return sku or None
+
+def parent_sku(sku):
+    """Liefert die Eltern-SKU einer Variante ('80538-2' -> '80538'); SKUs ohne Variante sind ihr eigenes Elternteil."""
+    return sku.split('-')[0]
+
+def product_family(parent, name=None):
+    """Produktfamilie einer Eltern-SKU, bei Handelsware über den Markennamen."""
+    family = PRODUCT_FAMILIES.get(parent)
+    if family is None and name:
+        family = next((family for brand, family in BRAND_FAMILIES.items() if name.startswith(brand)), None)
+    return family or OTHER_FAMILY
+
+class SKURegistry:
+    """Interniert normalisierte SKUs zu stabilen Integer-Codes (Code -1 steht für keine SKU).
+
+    Zu jedem Code werden die kanonische SKU, der Name aus SKU_NAMES, der Code der
+    Eltern-SKU und der Code der Produktfamilie gehalten, sodass Joins, Gruppierungen und
+    Filter auf Integer-Spalten laufen. Varianten gehören zur Familie ihrer Eltern-SKU.
+    """
+
+    def __init__(self, names=None):
+        self._lock = threading.Lock()
+        self._codes = {}
+        self._skus = []
+        self._names = []
+        self._parents = []
+        self._families = []
+        self._family_codes = {}
+        self._family_labels = []
+        self._sku_names = names if names is not None else {}
+        for sku in self._sku_names:
+            self.code(sku)
+
+    def __len__(self):
+        return len(self._skus)
+
+    def _family_code(self, family):
+        code = self._family_codes.get(family)
+        if code is None:
+            code = self._family_codes[family] = len(self._family_labels)
+            self._family_labels.append(family)
+        return code
+
+    def _intern(self, sku, name_hint=None):
+        code = self._codes.get(sku)
+        if code is None:
+            name = self._sku_names.get(sku)
+            parent = parent_sku(sku)
+            # Eltern-SKU zuerst, damit alle Listen vollständig sind, bevor der Code sichtbar wird;
+            # code() liest _codes ohne Sperre
+            if parent != sku:
+                parent_code = self._intern(parent, name)
+                family = self._families[parent_code]
+            else:
+                parent_code = None
+                family = self._family_code(product_family(sku, name or name_hint))
+            code = len(self._skus)
+            self._skus.append(sku)
+            self._names.append(name)
+            self._parents.append(code if parent_code is None else parent_code)
+            self._families.append(family)
+            self._codes[sku] = code
+        return code
+
+    def code(self, raw):
+        """Code einer einzelnen Roh-SKU."""
+        sku = normalize_sku(raw)
+        if sku is None:
+            return -1
+        code = self._codes.get(sku)
+        if code is not None:
+            return code
+        with self._lock:
+            return self._intern(sku)
+
+    def encode(self, values):
+        """Codiert eine Spalte von Roh-SKUs; normalisiert wird nur einmal pro eindeutigem Wert."""
+        positions, uniques = pd.factorize(pd.Series(values), use_na_sentinel=True)
+        unique_codes = np.array([self.code(raw) for raw in uniques], dtype=np.int32)
+        codes = np.full(len(positions), -1, dtype=np.int32)
+        valid = positions >= 0
+        codes[valid] = unique_codes[positions[valid]]
+        return codes
+
+    def _lookup(self, table, codes, missing=None):
+        codes = np.asarray(codes)
+        result = np.full(codes.shape, missing, dtype=object)
+        valid = codes >= 0
+        # Kopie der Liste, da andere Threads währenddessen neue SKUs anhängen können
+        result[valid] = np.asarray(table[:], dtype=object)[codes[valid]]
+        return result
+
+    def decode(self, codes):
+        """Kanonische SKU-Texte zu einem Array von Codes."""
+        return self._lookup(self._skus, codes)
+
+    def names(self, codes):
+        """SKU-Namen zu einem Array von Codes (None, wenn kein Name hinterlegt ist)."""
+        return self._lookup(self._names, codes)
+
+    def parent_codes(self, codes):
+        """Codes der Eltern-SKUs zu einem Array von Codes."""
+        codes = np.asarray(codes)
+        parents = np.asarray(self._parents[:], dtype=np.int32)
+        return np.where(codes >= 0, parents[np.clip(codes, 0, None)], -1)
+
+    def family_codes(self, codes):
+        """Codes der Produktfamilien zu einem Array von SKU-Codes."""
+        codes = np.asarray(codes)
+        families = np.asarray(self._families[:], dtype=np.int32)
+        return np.where(codes >= 0, families[np.clip(codes, 0, None)], -1)
+
+    def family_labels(self, family_codes):
+        """Namen der Produktfamilien zu einem Array von Familiencodes."""
+        return self._lookup(self._family_labels, family_codes)
+
+    def name(self, raw, default=None):
+        code = self.code(raw)
+        return self._names[code] if code >= 0 and self._names[code] is not None else default
+
+sku_registry = SKURegistry(SKU_NAMES)
+
+def add_sku_codes(df, column='SKU'):
+    """Normalisiert die SKU-Spalte eines DataFrames und ergänzt die Integer-Spalte SKUCode."""
+    codes = sku_registry.encode(df[column])
+    df['SKUCode'] = codes
+    df[column] = sku_registry.decode(codes)
+    return df
@@ -0,0 +1,71 @@
+import pandas as pd
+import numpy as np
+from collections import namedtuple
+
+DELIVERED_STATUS = 'Angeliefert'
+
+# Bestandsverlauf zur DailyMatrix: values[i, j] ist der Bestand von skus[i] am Ende des
+# Tages dates[j] (NaN vor dem Anfangsbestand), stockout[i, j] markiert Tage ohne Ware
+StockLevels = namedtuple('StockLevels', ['values', 'stockout', 'skus', 'dates'])
+
+def _day_positions(dates, start):
+    return (pd.to_datetime(pd.Series(dates)).dt.normalize() - start).dt.days.to_numpy()
+
+def build_stock_levels(matrix, initial_inventory, supplier_deliveries):
+    """Berechnet den täglichen Bestandsverlauf aller SKUs der Matrix in einem Durchgang.
+
+    Wie bei CurrentQuantity gilt der Anfangsbestand zu Beginn seines Datums; angelieferte
+    Lieferungen vor diesem Datum werden am Tag des Anfangsbestands eingebucht, Verkäufe ab
+    diesem Tag abgezogen. Ohne Anfangsbestand bleibt der Verlauf unbekannt (NaN). Ein Tag
+    gilt als Stock-out, wenn vor den Verkäufen des Tages kein Bestand vorhanden war und
+    nichts verkauft wurde.
+    """
+    sales = matrix.values
+    n_skus, n_days = sales.shape
+    if n_skus == 0 or n_days == 0:
+        return StockLevels(np.zeros((n_skus, n_days)), np.zeros((n_skus, n_days), dtype=bool), matrix.skus, matrix.dates)
+    start = matrix.dates[0]
+
+    # Erster Tag mit bekanntem Bestand; ohne Anfangsbestand liegt er hinter dem Zeitraum
+    first_day = np.full(n_skus, n_days, dtype=np.int64)
+    opening = np.zeros(n_skus)
+    initial = initial_inventory.dropna(subset=['Date'])
+    rows = matrix.skus.get_indexer(initial['SKU'].astype(str))
+    valid = rows >= 0
+    first_day[rows[valid]] = np.clip(_day_positions(initial['Date'], start)[valid], 0, n_days - 1)
+    opening[rows[valid]] = pd.to_numeric(initial['InitialQuantity'], errors='coerce').fillna(0).to_numpy()[valid]
+
+    inflow = np.zeros((n_skus, n_days))
+    delivered = supplier_deliveries[supplier_deliveries['Status'] == DELIVERED_STATUS]
+    rows = matrix.skus.get_indexer(delivered['SKU'].astype(str))
+    valid = rows >= 0
+    rows = rows[valid]
+    valid_rows = first_day[rows] < n_days
+    rows = rows[valid_rows]
+    days = np.clip(_day_positions(delivered['Date'], start)[valid][valid_rows], first_day[rows], n_days - 1)
+    quantities = pd.to_numeric(delivered['SupplierDelivery'], errors='coerce').fillna(0).to_numpy()[valid][valid_rows]
+    np.add.at(inflow, (rows, days), quantities)
+
+    known = np.arange(n_days)[None, :] >= first_day[:, None]
+    closing = opening[:, None] + np.cumsum(np.where(known, inflow - sales, 0.0), axis=1)
+    closing = np.where(known, closing, np.nan)
+    stockout = known & (closing + sales <= 0) & (sales <= 0)
+    return StockLevels(closing, stockout, matrix.skus, matrix.dates)
+
+def in_stock_demand(matrix, levels, days=30):
+    """Verkaufsmenge je Tag mit Ware in den letzten days Tagen der Matrix.
+
+    Stock-out-Tage zählen nicht als Verkaufstage, sodass SKUs, die gerade wieder lieferbar
+    sind, nicht unterschätzt werden. Liefert je SKU StockoutDays, InStockDays und
+    InStockDailyQuantity.
+    """
+    window = min(days, matrix.values.shape[1])
+    sold = matrix.values[:, -window:].sum(axis=1) if window else np.zeros(len(matrix.skus))
+    stockout_days = levels.stockout[:, -window:].sum(axis=1) if window else np.zeros(len(matrix.skus), dtype=np.int64)
+    in_stock_days = days - stockout_days
+    return pd.DataFrame({
+        'SKU': matrix.skus,
+        'StockoutDays': stockout_days,
+        'InStockDays': in_stock_days,
+        'InStockDailyQuantity': sold / np.maximum(in_stock_days, 1),
+    })
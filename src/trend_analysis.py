@@ -1,18 +1,17 @@
 import pandas as pd
 import numpy as np
-from scipy import stats
-from statsmodels.tsa.seasonal import seasonal_decompose
 import logging
 
 logging.basicConfig(level=logging.WARNING)
 logger = logging.getLogger(__name__)
 
+# scipy.stats und statsmodels werden erst bei der ersten Analyse geladen, nicht beim Start der App
+
 def calculate_trend(data):
+    from scipy import stats
+
     data = data.sort_values('Date')
     data['Days'] = (data['Date'] - data['Date'].min()).dt.days
-    
-    # Clean the SKU column
-    data['SKU'] = data['SKU'].astype(str).str.split('-').str[0]
 
     # Handle cases where there's not enough data or all x values are identical
     if len(data) < 2 or data['Days'].nunique() == 1:
@@ -37,6 +36,8 @@ def calculate_trend(data):
     return overall_trend
 
 def calculate_seasonality(data):
+    from statsmodels.tsa.seasonal import seasonal_decompose
+
     data = data.sort_values('Date')
     data = data.set_index('Date')
     
@@ -75,16 +76,15 @@ def create_forecast(data, days=60):
 
     return forecast
 
-def analyze_sku(sku_data):
+def analyze_sku(sku_data, forecast=None):
+    from statsmodels.tsa.seasonal import seasonal_decompose
+
     try:
         sku_data['Date'] = pd.to_datetime(sku_data['Date'])
         sku_data = sku_data.set_index('Date')
         
-        # Clean the SKU column
-        sku_data['SKU'] = sku_data['SKU'].astype(str).str.split('-').str[0]
-        
-        # Remove the 'Platform' column from the analysis
-        sku_data = sku_data.drop(columns=['Platform'], errors='ignore')
+        # Only the quantity is analysed; SKU, SKUCode and Platform are constant or irrelevant per group
+        sku_data = sku_data[['Quantity']]
         
         sku_data = sku_data.resample('D').sum().astype('float64')
         
@@ -101,8 +101,9 @@ def analyze_sku(sku_data):
         # Add smoothed data
         smoothed_data = smooth_data(sku_data.reset_index())
         
-        # Create forecast
-        forecast = create_forecast(sku_data.reset_index())
+        # Create forecast, unless a precomputed one was passed in
+        if forecast is None:
+            forecast = create_forecast(sku_data.reset_index())
         
         return {
             'seasonality': seasonality,
@@ -121,15 +122,60 @@ def analyze_sku(sku_data):
             'forecast': pd.DataFrame()
         }
 
-def analyze_all_skus(all_data):
+def analyze_all_skus(all_data, forecasts=None):
     results = {}
+    forecasts_by_sku = dict(tuple(forecasts.groupby('SKU'))) if forecasts is not None else {}
     for sku in all_data['SKU'].unique():
         sku_data = all_data[all_data['SKU'] == sku].copy()
         if len(sku_data) > 0:
             try:
-                result = analyze_sku(sku_data)
+                forecast = forecasts_by_sku.get(str(sku)) if forecasts is not None else None
+                if forecast is not None:
+                    forecast = forecast.drop(columns=['SKU']).reset_index(drop=True)
+                result = analyze_sku(sku_data, forecast)
                 if result is not None:
                     results[sku] = result
             except Exception as e:
                 logger.error(f"Error analyzing SKU {sku}: {str(e)}")
-    return results
\ No newline at end of file
+    return results
+
+
+def analysis_tables(results):
+    """Analyseergebnisse als zwei flache Tabellen zum Speichern.
+
+    Verlauf: SKU, Date, Quantity, SmoothQuantity, Seasonality, Trend, OverallTrend;
+    Prognose: SKU und die Spalten der Prognosen. SKUs ohne Verlauf (Fehlerfälle) entfallen.
+    """
+    history, forecasts = [], []
+    for sku, result in results.items():
+        smoothed = result['smoothed_data']
+        if smoothed.empty:
+            continue
+        dates = pd.DatetimeIndex(smoothed['Date'])
+        history.append(smoothed[['Date', 'Quantity', 'SmoothQuantity']].assign(
+            SKU=str(sku),
+            Seasonality=result['seasonality'].reindex(dates).to_numpy(np.float64),
+            Trend=result['trend'].reindex(dates).to_numpy(np.float64),
+            OverallTrend=float(result['overall_trend'])))
+        if not result['forecast'].empty:
+            forecasts.append(result['forecast'].assign(SKU=str(sku)))
+    history = pd.concat(history, ignore_index=True) if history else pd.DataFrame(
+        columns=['Date', 'Quantity', 'SmoothQuantity', 'SKU', 'Seasonality', 'Trend', 'OverallTrend'])
+    forecasts = pd.concat(forecasts, ignore_index=True) if forecasts else pd.DataFrame(columns=['Date', 'SKU'])
+    return history, forecasts
+
+def analysis_from_tables(history, forecasts):
+    """Analyseergebnisse je SKU aus den Tabellen von analysis_tables."""
+    forecasts_by_sku = dict(tuple(forecasts.groupby('SKU', sort=False)))
+    results = {}
+    for sku, rows in history.groupby('SKU', sort=False):
+        dates = pd.DatetimeIndex(rows['Date'], name='Date')
+        forecast = forecasts_by_sku.get(sku)
+        results[sku] = {
+            'seasonality': pd.Series(rows['Seasonality'].to_numpy(), index=dates, name='seasonal'),
+            'trend': pd.Series(rows['Trend'].to_numpy(), index=dates, name='trend'),
+            'overall_trend': float(rows['OverallTrend'].iat[0]),
+            'smoothed_data': rows[['Date', 'Quantity', 'SmoothQuantity']].reset_index(drop=True),
+            'forecast': forecast.drop(columns=['SKU']).reset_index(drop=True) if forecast is not None else pd.DataFrame(),
+        }
+    return results
@@ -0,0 +1,160 @@
+import pandas as pd
+import numpy as np
+import io
+from datetime import date
+from src.sku_registry import sku_registry
+
+# Beginn der Historie, auf der Trends berechnet werden (wie in get_summary_data)
+HISTORY_START = date(2024, 1, 1)
+# Kurzfristiger Trend: Tage [letzter Verkaufstag - 30, letzter Verkaufstag] je SKU
+RING_DAYS = 31
+LONG_TERM_WEIGHT = 0.7
+SHORT_TERM_WEIGHT = 0.3
+
+_STAT_FIELDS = ('n', 'sx', 'sy', 'sxy', 'sxx')
+
+def _slope(n, sx, sy, sxy, sxx):
+    """Steigung der linearen Regression aus den suffizienten Statistiken (0 bei weniger als zwei Tagen)."""
+    n, sx, sy, sxy, sxx = (np.asarray(value, dtype=np.float64) for value in (n, sx, sy, sxy, sxx))
+    denominator = n * sxx - sx * sx
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (n * sxy - sx * sy) / denominator
+    return np.where((n >= 2) & (denominator > 0), slope, 0.0)
+
+def day_numbers(dates):
+    """Tage seit HISTORY_START; Steigungen hängen nicht vom Nullpunkt ab."""
+    return (pd.to_datetime(pd.Series(dates)).to_numpy('datetime64[D]') - np.datetime64(HISTORY_START, 'D')).astype(np.int64)
+
+class TrendState:
+    """Laufende Regressionsstatistiken je SKU für den lang- und kurzfristigen Trend.
+
+    Je SKU werden Anzahl, Σtag, Σmenge, Σtag·menge und Σtag² über alle Verkaufszeilen
+    seit HISTORY_START gehalten, dazu ein Ringpuffer der letzten RING_DAYS Verkaufstage
+    mit Zeilenzahl und Menge je Tag. Änderungen werden als entfernte und hinzugefügte
+    Zeilen eingearbeitet; die Trends ergeben sich daraus ohne die Verkaufsdaten zu lesen
+    und stimmen mit calculate_trend überein. Wird der letzte Verkaufstag einer SKU
+    entfernt, reicht der Ringpuffer nicht mehr aus und die SKU wird als veraltet markiert.
+    """
+
+    COLUMNS = ['Date', 'SKU', 'Quantity']
+
+    def __init__(self, skus=None, arrays=None):
+        self.skus = list(skus or [])
+        self._index = {sku: i for i, sku in enumerate(self.skus)}
+        size = len(self.skus)
+        arrays = arrays or {}
+        for field in _STAT_FIELDS:
+            setattr(self, field, arrays.get(field, np.zeros(size, dtype=np.int64)))
+        self.last_day = arrays.get('last_day', np.full(size, -1, dtype=np.int64))
+        self.ring_day = arrays.get('ring_day', np.full((size, RING_DAYS), -1, dtype=np.int64))
+        self.ring_count = arrays.get('ring_count', np.zeros((size, RING_DAYS), dtype=np.int64))
+        self.ring_qty = arrays.get('ring_qty', np.zeros((size, RING_DAYS), dtype=np.int64))
+        self.stale = arrays.get('stale', np.zeros(size, dtype=bool))
+
+    def _indices(self, skus):
+        new = [sku for sku in pd.unique(skus) if sku not in self._index]
+        if new:
+            for sku in new:
+                self._index[sku] = len(self.skus)
+                self.skus.append(sku)
+            grow = len(new)
+            for field in _STAT_FIELDS:
+                setattr(self, field, np.concatenate([getattr(self, field), np.zeros(grow, dtype=np.int64)]))
+            self.last_day = np.concatenate([self.last_day, np.full(grow, -1, dtype=np.int64)])
+            self.ring_day = np.vstack([self.ring_day, np.full((grow, RING_DAYS), -1, dtype=np.int64)])
+            self.ring_count = np.vstack([self.ring_count, np.zeros((grow, RING_DAYS), dtype=np.int64)])
+            self.ring_qty = np.vstack([self.ring_qty, np.zeros((grow, RING_DAYS), dtype=np.int64)])
+            self.stale = np.concatenate([self.stale, np.zeros(grow, dtype=bool)])
+        return np.array([self._index[sku] for sku in skus], dtype=np.int64)
+
+    def apply(self, removed, added):
+        """Arbeitet entfernte und hinzugefügte Verkaufszeilen (Date, SKU, Quantity) ein.
+
+        Der Aufwand wächst mit der Zahl der betroffenen (SKU, Tag)-Paare, nicht mit der Historie.
+        """
+        parts = [frame[['Date', 'SKU', 'Quantity']].assign(Sign=sign)
+                 for frame, sign in ((removed, -1), (added, 1)) if frame is not None and not frame.empty]
+        if not parts:
+            return self
+        rows = pd.concat(parts, ignore_index=True)
+        rows['SKU'] = sku_registry.decode(sku_registry.encode(rows['SKU']))
+        rows['Day'] = day_numbers(rows['Date'])
+        rows = rows[rows['Day'] >= 0]
+        if rows.empty:
+            return self
+        rows['Count'] = rows['Sign']
+        rows['Qty'] = rows['Sign'] * rows['Quantity'].astype(np.int64)
+        delta = rows.groupby(['SKU', 'Day'], sort=False)[['Count', 'Qty']].sum().reset_index()
+        delta = delta[(delta['Count'] != 0) | (delta['Qty'] != 0)]
+        if delta.empty:
+            return self
+
+        index = self._indices(delta['SKU'].to_numpy())
+        day = delta['Day'].to_numpy(np.int64)
+        count = delta['Count'].to_numpy(np.int64)
+        qty = delta['Qty'].to_numpy(np.int64)
+        np.add.at(self.n, index, count)
+        np.add.at(self.sx, index, count * day)
+        np.add.at(self.sy, index, qty)
+        np.add.at(self.sxy, index, qty * day)
+        np.add.at(self.sxx, index, count * day * day)
+
+        # Nur Tage im künftigen Fenster einer SKU können den Ringpuffer betreffen
+        added_days = np.where(count > 0, day, -1)
+        new_last = self.last_day.copy()
+        np.maximum.at(new_last, index, added_days)
+        relevant = day >= new_last[index] - (RING_DAYS - 1)
+        for i, d, c, q in sorted(zip(index[relevant], day[relevant], count[relevant], qty[relevant]), key=lambda item: item[1]):
+            slot = d % RING_DAYS
+            if self.ring_day[i, slot] == d:
+                self.ring_count[i, slot] += c
+                self.ring_qty[i, slot] += q
+            elif self.ring_day[i, slot] < d and c > 0:
+                self.ring_day[i, slot] = d
+                self.ring_count[i, slot] = c
+                self.ring_qty[i, slot] = q
+        self.last_day = new_last
+
+        touched = np.unique(index[relevant])
+        last_slots = self.last_day[touched] % RING_DAYS
+        emptied = (self.ring_day[touched, last_slots] != self.last_day[touched]) | (self.ring_count[touched, last_slots] <= 0)
+        self.stale[touched[emptied & (self.last_day[touched] >= 0)]] = True
+        return self
+
+    @classmethod
+    def from_sales(cls, sales):
+        """Baut den Zustand aus Verkaufszeilen (Date, SKU, Quantity) vollständig auf."""
+        return cls().apply(None, sales)
+
+    def short_term_stats(self):
+        in_window = (self.ring_day >= (self.last_day[:, None] - (RING_DAYS - 1))) & (self.ring_day >= 0) & (self.ring_count > 0)
+        count = np.where(in_window, self.ring_count, 0)
+        qty = np.where(in_window, self.ring_qty, 0)
+        day = np.where(in_window, self.ring_day, 0)
+        return (count.sum(axis=1), (count * day).sum(axis=1), qty.sum(axis=1),
+                (qty * day).sum(axis=1), (count * day * day).sum(axis=1))
+
+    def trends(self):
+        """Lang- und kurzfristige Steigung sowie gewichteter Trend je SKU."""
+        long_term = _slope(self.n, self.sx, self.sy, self.sxy, self.sxx)
+        short_term = _slope(*self.short_term_stats())
+        return pd.DataFrame({
+            'SKU': self.skus,
+            'LongTermSlope': long_term,
+            'ShortTermSlope': short_term,
+            'Trend': LONG_TERM_WEIGHT * long_term + SHORT_TERM_WEIGHT * short_term,
+            'Stale': self.stale,
+        })
+
+    def to_bytes(self):
+        buffer = io.BytesIO()
+        arrays = {field: getattr(self, field) for field in _STAT_FIELDS}
+        np.savez_compressed(buffer, skus=np.array(self.skus, dtype=str), last_day=self.last_day, ring_day=self.ring_day,
+                            ring_count=self.ring_count, ring_qty=self.ring_qty, stale=self.stale, **arrays)
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, payload):
+        with np.load(io.BytesIO(payload)) as data:
+            arrays = {name: data[name] for name in data.files if name != 'skus'}
+            return cls(data['skus'].tolist(), arrays)
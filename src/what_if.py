@@ -0,0 +1,90 @@
+import pandas as pd
+import numpy as np
+from collections import namedtuple
+from datetime import datetime, timedelta
+from src.s3_operations import get_summary_data
+from src.sales_store import load_platform_cube
+from src.inventory_simulation import delivery_schedule, simulate_stockouts, HISTORY_DAYS, HORIZON_DAYS, PLANNED_STATUSES
+from src.stock_levels import DELIVERED_STATUS
+
+# Anzahl simulierter Pfade je Neuberechnung; für wenige SKUs reicht ein fester Seed,
+# damit sich alter und neuer Stand nur durch die Lieferungen unterscheiden
+WHAT_IF_PATHS = 1000
+WHAT_IF_SEED = 0
+WHAT_IF_COLUMNS = ['SKU', 'PlannedDeliveries', 'PlannedDeliveries_new', 'AdjustedInventoryDaysWithDeliveries',
+                   'AdjustedInventoryDaysWithDeliveries_new', 'ExpectedStockoutDate', 'ExpectedStockoutDate_new']
+
+# Aus den Verkäufen abgeleitete Grundlage je SKU: summary (Index SKU) mit AvgDailyQuantity
+# und CurrentQuantity, history die Tagesverkäufe (SKUs, HISTORY_DAYS), start_date der erste Prognosetag
+DeliveryBaseline = namedtuple('DeliveryBaseline', ['summary', 'history', 'history_skus', 'start_date'])
+
+def build_delivery_baseline():
+    """Lädt Geschwindigkeit, Bestand und Verkaufshistorie einmalig für die What-if-Rechnung."""
+    end_date = datetime.now().date() - timedelta(days=1)
+    summary = get_summary_data().set_index('SKU')[['AvgDailyQuantity', 'CurrentQuantity']]
+    matrix = load_platform_cube().daily_matrix(end_date - timedelta(days=HISTORY_DAYS - 1), end_date)
+    return DeliveryBaseline(summary, matrix.values, matrix.skus, end_date + timedelta(days=1))
+
+def _clean_deliveries(deliveries):
+    deliveries = deliveries.copy()
+    if 'Delete' in deliveries.columns:
+        deliveries = deliveries[~deliveries['Delete'].fillna(False).astype(bool)].drop(columns=['Delete'])
+    deliveries = deliveries.dropna(subset=['SKU'])
+    deliveries['SKU'] = deliveries['SKU'].astype(str)
+    deliveries['Date'] = pd.to_datetime(deliveries['Date'], errors='coerce').dt.normalize()
+    # Während der Bearbeitung geleerte Zellen: die Zeile zählt erst wieder mit Datum und Status
+    deliveries = deliveries.dropna(subset=['Date', 'Status'])
+    deliveries['SupplierDelivery'] = pd.to_numeric(deliveries['SupplierDelivery'], errors='coerce').fillna(0)
+    return deliveries[['SKU', 'SupplierDelivery', 'Date', 'Status']]
+
+def changed_skus(original, edited):
+    """SKUs, deren Lieferzeilen sich zwischen beiden Ständen unterscheiden (auch neue und gelöschte Zeilen)."""
+    rows = pd.concat([_clean_deliveries(original).assign(Side=1), _clean_deliveries(edited).assign(Side=-1)])
+    counts = rows.groupby(['SKU', 'SupplierDelivery', 'Date', 'Status'], dropna=False)['Side'].sum()
+    return sorted(counts[counts != 0].index.get_level_values('SKU').unique())
+
+def _by_status(deliveries, skus, statuses):
+    selected = deliveries[deliveries['Status'].isin(statuses)]
+    return selected.groupby('SKU')['SupplierDelivery'].sum().reindex(skus).fillna(0).to_numpy()
+
+def _evaluate(baseline, deliveries, skus, stock):
+    planned = _by_status(deliveries, skus, PLANNED_STATUSES)
+    velocity = baseline.summary['AvgDailyQuantity'].reindex(skus).fillna(0).to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        days = np.where(velocity > 0, (stock + planned) / velocity, np.inf)
+
+    # SKUs ohne Verkäufe im Historienzeitraum verkaufen auch in der Simulation nichts
+    rows = baseline.history_skus.get_indexer(skus)
+    history = np.zeros((len(skus), max(baseline.history.shape[1], 1)))
+    found = rows >= 0
+    history[found, :baseline.history.shape[1]] = baseline.history[rows[found]]
+    schedule = delivery_schedule(deliveries, skus, baseline.start_date, HORIZON_DAYS)
+    _, median_day, _ = simulate_stockouts(history, np.clip(stock, 0, None), schedule,
+                                          n_paths=WHAT_IF_PATHS, seed=WHAT_IF_SEED)
+    stockout_date = pd.Timestamp(baseline.start_date) + pd.to_timedelta(median_day, unit='D')
+    return planned, days, stockout_date
+
+def what_if(baseline, original, edited, skus=None):
+    """Rechnet geplante Lieferungen, Reichweite mit Lieferungen und Stock-out-Datum nur für geänderte SKUs neu.
+
+    Der Bestand wird um geänderte angelieferte Mengen angepasst; Geschwindigkeit und
+    Verkaufshistorie stammen aus der Grundlage und werden nicht neu geladen.
+    """
+    original, edited = _clean_deliveries(original), _clean_deliveries(edited)
+    skus = list(skus if skus is not None else changed_skus(original, edited))
+    if not skus:
+        return pd.DataFrame(columns=WHAT_IF_COLUMNS)
+
+    stock = baseline.summary['CurrentQuantity'].reindex(skus).fillna(0).to_numpy()
+    new_stock = stock - _by_status(original, skus, [DELIVERED_STATUS]) + _by_status(edited, skus, [DELIVERED_STATUS])
+    planned, days, stockout = _evaluate(baseline, original, skus, stock)
+    new_planned, new_days, new_stockout = _evaluate(baseline, edited, skus, new_stock)
+    return pd.DataFrame({
+        'SKU': skus,
+        'PlannedDeliveries': planned,
+        'PlannedDeliveries_new': new_planned,
+        'AdjustedInventoryDaysWithDeliveries': days,
+        'AdjustedInventoryDaysWithDeliveries_new': new_days,
+        'ExpectedStockoutDate': stockout,
+        'ExpectedStockoutDate_new': new_stockout,
+    }, columns=WHAT_IF_COLUMNS)
@@ -1,41 +1,41 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
 from src.s3_operations import get_summary_data, get_daily_sales_data
-from src.sku_names import SKU_NAMES
+from src.sku_hierarchy import SKU_LEVEL
 
-def winners_tab():
+def winners_tab(platforms=None, level=SKU_LEVEL):
     st.subheader("Top 20 Produkte (Winners)")
 
     # Get summary data
-    summary_data = get_summary_data()
+    summary_data = get_summary_data(level=level)
 
     if summary_data.empty:
         st.warning("Keine Daten verfügbar.")
         return
 
-    # Sort by Last30DaysQuantity and get top 20
-    top_20 = summary_data.nlargest(20, 'Last30DaysQuantity')
-
     # Get daily sales data for the last 30 days
-    daily_sales = get_daily_sales_data(days=30)
+    daily_sales = get_daily_sales_data(days=30, platforms=platforms, level=level)
 
-    # Ensure 'SKU' column exists in daily_sales
-    if 'SKU' not in daily_sales.columns:
-        st.warning("SKU column not found in daily sales data. Using index as SKU.")
-        daily_sales = daily_sales.reset_index()
-        daily_sales = daily_sales.rename(columns={'index': 'SKU'})
+    # With a platform filter, rank by the sales on the selected platforms
+    if platforms:
+        platform_quantity = summary_data['SKU'].astype(str).map(daily_sales.sum()).fillna(0)
+        summary_data = summary_data.assign(Last30DaysQuantity=platform_quantity)
+        st.caption("Verkaufsmengen der gewählten Plattformen; Bestand und Reichweite über alle Plattformen.")
+
+    # Sort by Last30DaysQuantity and get top 20
+    top_20 = summary_data.nlargest(20, 'Last30DaysQuantity')
 
-    # Filter daily sales data for top 20 SKUs
-    top_20_daily = daily_sales[daily_sales['SKU'].isin(top_20['SKU'])]
+    # Daily sales come as a matrix (rows: days, columns: SKUs); keep the top 20 SKUs
+    top_20_skus = top_20['SKU'].astype(str)
+    top_20_daily = daily_sales.reindex(columns=top_20_skus, fill_value=0).rename_axis('Date').reset_index()
 
     # Melt the dataframe to create a format suitable for line plot
-    melted_data = top_20_daily.melt(id_vars=['Date', 'SKU'], var_name='Metric', value_name='Quantity')
+    melted_data = top_20_daily.melt(id_vars=['Date'], var_name='SKU', value_name='Quantity')
 
     # Add SKU names
-    melted_data['SKU_Name'] = melted_data['SKU'].map(SKU_NAMES)
+    melted_data['SKU_Name'] = melted_data['SKU'].map(dict(zip(top_20_skus, top_20['SKU_Name'])))
 
     # Create a line chart
+    import plotly.express as px
     fig = px.line(
         melted_data,
         x='Date',